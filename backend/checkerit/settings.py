@@ -156,3 +156,60 @@ CHATBOT_REFUSAL_MESSAGE = os.getenv(
     'CHATBOT_REFUSAL_MESSAGE',
     'Solo puedo ayudarte con CheckerIT (reglas del juego e interfaz).',
 )
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'suggestions': {
+        'BACKEND': os.getenv('SUGGESTION_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('SUGGESTION_CACHE_LOCATION', 'checkerit-suggestions'),
+        'TIMEOUT': int(os.getenv('SUGGESTION_CACHE_TIMEOUT', '600')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('SUGGESTION_CACHE_MAX_ENTRIES', '2000')),
+        },
+    },
+}
+SUGGESTION_CACHE_ALIAS = 'suggestions'
+
+AI_PRECOMPUTE_ENABLED = os.getenv('AI_PRECOMPUTE_ENABLED', 'True') == 'True'
+AI_PRECOMPUTE_WORKERS = int(os.getenv('AI_PRECOMPUTE_WORKERS', '2'))
+AI_PRECOMPUTE_WAIT_SECONDS = float(os.getenv('AI_PRECOMPUTE_WAIT_SECONDS', '30'))
+
+# Búsqueda anticipada (ponder) del agente MCTS durante la ronda del humano (opcional)
+MCTS_PONDERING_ENABLED = os.getenv('MCTS_PONDERING_ENABLED', 'False') == 'True'
+MCTS_PONDER_SECONDS = float(os.getenv('MCTS_PONDER_SECONDS', '20'))
+MCTS_PONDER_MAX_NODES = int(os.getenv('MCTS_PONDER_MAX_NODES', '20000'))
+MCTS_PONDER_MAX_REPLIES = int(os.getenv('MCTS_PONDER_MAX_REPLIES', '6'))
+# Hilos dedicados a la búsqueda anticipada (aparte de AI_PRECOMPUTE_WORKERS) y segundos tras
+# los que se descarta una sesión que nadie ha recogido
+MCTS_PONDER_WORKERS = int(os.getenv('MCTS_PONDER_WORKERS', '1'))
+MCTS_PONDER_SESSION_TTL = float(os.getenv('MCTS_PONDER_SESSION_TTL', '600'))
+
+# Límite de turnos y de segundos de una simulación en el servidor (partidas demo / entre agentes)
+SIMULATION_MAX_TURNS = int(os.getenv('SIMULATION_MAX_TURNS', '2000'))
+SIMULATION_TIME_BUDGET = float(os.getenv('SIMULATION_TIME_BUDGET', '30'))
+
+# Long-poll de eventos de partida: espera máxima y cada cuánto se consulta la versión en BD
+# (para cambios hechos por otro proceso)
+EVENTOS_LONG_POLL_TIMEOUT = float(os.getenv('EVENTOS_LONG_POLL_TIMEOUT', '25'))
+EVENTOS_INTERVALO_DB = float(os.getenv('EVENTOS_INTERVALO_DB', '1'))
+# Esperas simultáneas por proceso (cada una ocupa un hilo del worker); por encima se responde al momento
+EVENTOS_MAX_ESPERAS = int(os.getenv('EVENTOS_MAX_ESPERAS', '32'))
+
+# Retención de partidas para `manage.py purge_games` (días desde el inicio)
+GAME_RETENTION_DAYS = int(os.getenv('GAME_RETENTION_DAYS', '30'))
+
+# Archivar automáticamente (game/archive.py) las partidas al terminar con `end_game`
+ARCHIVE_ON_END_GAME = os.getenv('ARCHIVE_ON_END_GAME', 'False') == 'True'
+
+# Cada cuántos movimientos (ply) se guarda una instantánea del tablero para reconstruir
+# posiciones intermedias (`GET partidas/{id}/posicion?ply=N`)
+TABLERO_INSTANTANEA_PLIES = int(os.getenv('TABLERO_INSTANTANEA_PLIES', '32'))
+
+# Heurística Max: puntuar todas las jugadas candidatas a la vez con NumPy (game/ai/vectorized.py)
+MAX_AGENT_VECTORIZED = os.getenv('MAX_AGENT_VECTORIZED', 'True') == 'True'
+
+# MCTS: hojas que se expanden por ronda con pérdida virtual y se evalúan juntas con NumPy
+# (0 = una a una, como la librería)
+MCTS_LEAF_BATCH = int(os.getenv('MCTS_LEAF_BATCH', '0'))
@@ -28,6 +28,14 @@ def make_jugador(db):
     return _make_jugador
 
 
+@pytest.fixture()
+def version_de(db):
+    """Versión actual de una partida: las escrituras sobre ella la exigen (ver `views.version_de_peticion`)."""
+    from game.models import Partida
+
+    return lambda partida_id: Partida.objects.filter(pk=partida_id).values_list("version", flat=True).get()
+
+
 @pytest.fixture(autouse=True)
 def _disable_gemini_in_tests(settings):
     """Evita llamadas externas a Gemini en tests.
@@ -38,6 +46,27 @@ def _disable_gemini_in_tests(settings):
     settings.GEMINI_API_KEY = None
 
 
+@pytest.fixture(autouse=True)
+def _clear_suggestion_cache():
+    """Las sugerencias cacheadas no deben filtrarse entre tests."""
+    from django.core.cache import caches
+    from django.conf import settings
+
+    caches[settings.SUGGESTION_CACHE_ALIAS].clear()
+    yield
+    caches[settings.SUGGESTION_CACHE_ALIAS].clear()
+
+
+@pytest.fixture(autouse=True)
+def _reset_game_events():
+    """Los buffers de eventos son por proceso y los ids de partida se repiten entre tests."""
+    from game import events
+
+    events.reset()
+    yield
+    events.reset()
+
+
 @pytest.fixture()
 def make_partida(db):
     from game.models import Partida
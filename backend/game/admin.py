@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Jugador, Partida, Pieza, Ronda, Movimiento, AgenteInteligente, Chatbot, JugadorPartida
+from .board import sync_board
+from .models import Jugador, Partida, Pieza, Ronda, Movimiento, AgenteInteligente, Chatbot, JugadorPartida, PartidaArchivada
 
 
 @admin.register(Jugador)
@@ -23,6 +24,15 @@ class PiezaAdmin(admin.ModelAdmin):
     list_filter = ['tipo', 'jugador']
     search_fields = ['id_pieza', 'posicion']
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        sync_board(obj.partida_id)
+
+    def delete_model(self, request, obj):
+        partida_id = obj.partida_id
+        super().delete_model(request, obj)
+        sync_board(partida_id)
+
 
 @admin.register(Ronda)
 class RondaAdmin(admin.ModelAdmin):
@@ -56,3 +66,11 @@ class JugadorPartidaAdmin(admin.ModelAdmin):
     list_filter = ['partida']
     search_fields = ['jugador__nombre']
     date_hierarchy = 'fecha_union'
+
+
+@admin.register(PartidaArchivada)
+class PartidaArchivadaAdmin(admin.ModelAdmin):
+    list_display = ['id_partida', 'fecha_inicio', 'fecha_fin', 'numero_jugadores', 'ganador', 'fecha_archivo']
+    list_filter = ['is_demo', 'numero_jugadores']
+    search_fields = ['id_partida']
+    exclude = ['datos']
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from functools import lru_cache
-from typing import Dict, Iterable, List, Optional, Set, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
 
 from ..models import Movimiento, Pieza
 
@@ -44,6 +46,51 @@ W_HOME_PROGRESS_BONUS = 180.0          # Bono por avanzar dentro de casa hacia l
 
 HOME_GOAL_SUPPRESSION_FACTOR = 0.25  # Factor para reducir recompensas de meta mientras queden piezas en casa
 
+# Descomposición lineal de la puntuación de `choose_move`: (peso, clave del detalle, signo).
+# Cada término del detalle es `peso * unidad` (ya escalado por el factor de supresión cuando
+# aplica); las unidades sin pesar las calcula `MaxHeuristicAgent.move_units`.
+SCORE_TERMS: Tuple[Tuple[str, str, float], ...] = (
+    ("W_FAR_DESTINATION", "penalizacion_lejania", -1.0),
+    ("W_GOAL_MOVE_PENALTY", "penalizacion_meta", -1.0),
+    ("W_GOAL_RELOC_PENALTY", "penalizacion_reubicacion_meta", -1.0),
+    ("W_GOAL_STAY_PENALTY", "penalizacion_permanencia_meta", -1.0),
+    ("W_GOAL_ENTRY_BONUS", "bonus_entrada_meta", 1.0),
+    ("W_GOAL_REARRANGE_BONUS", "bonus_reacomodo_meta", 1.0),
+    ("W_GOAL_PRIORITY_BASE", "bonus_prioridad_meta", 1.0),
+    ("W_GOAL_PRIORITY_FILL_BONUS", "bonus_relleno_prioridad", 1.0),
+    ("W_WIN_MOVE_BONUS", "bonus_victoria", 1.0),
+    ("W_LONE_PIECE_BONUS", "bonus_pieza_sola", 1.0),
+    ("W_GOAL_DEPTH_BONUS", "bonus_profundidad_meta", 1.0),
+    ("W_GOAL_CHAIN_BONUS", "bonus_cadena_meta", 1.0),
+    ("W_OUTSIDE_MOVE_BONUS", "bonus_fuera_meta", 1.0),
+    ("W_HOME_EXIT_BONUS", "bonus_salida_casa", 1.0),
+    ("W_HOME_STAY_PENALTY", "penalizacion_permanecer_casa", -1.0),
+    ("W_HOME_RETURN_PENALTY", "penalizacion_retorno_casa", -1.0),
+    ("W_HOME_IGNORE_PENALTY", "penalizacion_ignorar_casa", -1.0),
+    ("W_HOME_PROGRESS_BONUS", "bonus_progreso_casa", 1.0),
+    ("W_HOME_OUTSIDE_IGNORE_PENALTY", "penalizacion_distraccion_casa", -1.0),
+    ("W_HOME_PRIORITY_LEAVE_BONUS", "bonus_salida_prioridad_casa", 1.0),
+    ("W_HOME_PRIORITY_STAY_PENALTY", "penalizacion_permanecer_prioridad_casa", -1.0),
+    ("W_HOME_PRIORITY_RETURN_PENALTY", "penalizacion_retorno_prioridad_casa", -1.0),
+    ("W_JUMP_BONUS", "bonus_salto", 1.0),
+    ("W_CHAIN_LEN_BONUS", "bonus_cadena", 1.0),
+    ("W_NOJUMP_PENALTY", "penalizacion_no_salto", -1.0),
+    ("W_REVERSE_PENALTY", "penalizacion_reverse", -1.0),
+    ("W_SAME_PIECE_PENALTY", "penalizacion_misma_pieza", -1.0),
+)
+# Términos cuya unidad sale directamente de los recuentos del detalle
+STATE_WEIGHTS: Tuple[str, ...] = (
+    "W_TOTAL_DIST", "W_FRONT_DIST", "W_BLOCKED", "W_HOME_PENALTY", "W_PROGRESS_ADV", "W_PROGRESS_BACK",
+    "W_GOAL_PRIORITY_GAP_PENALTY", "W_GOAL_PRIORITY_BLOCK_PENALTY",
+)
+WEIGHT_NAMES: Tuple[str, ...] = STATE_WEIGHTS + tuple(nombre for nombre, _clave, _signo in SCORE_TERMS)
+
+
+def weight_vector() -> List[float]:
+    """Valores actuales de los pesos, en el orden de `WEIGHT_NAMES`."""
+    return [float(globals()[nombre]) for nombre in WEIGHT_NAMES]
+
+
 CARTESIAN_COORD_ROWS: List[List[Dict[str, int]]] = [
     [{"q": 0, "r": 0}],
     [{"q": -1, "r": 1}, {"q": 0, "r": 1}],
@@ -237,6 +284,14 @@ def _parse_punta(tipo: str) -> Optional[int]:
         return None
 
 
+def _piece_punta(pieza) -> Optional[int]:
+    # Columna `Pieza.punta` (o la de la tupla del simulador); `tipo` solo para filas antiguas
+    punta = getattr(pieza, "punta", None)
+    if punta is not None:
+        return int(punta)
+    return _parse_punta(pieza.tipo)
+
+
 def _target_punta(punta: Optional[int]) -> Optional[int]:
     # Mapea punta inicial a su punta objetivo
     if punta is None:
@@ -250,8 +305,19 @@ class MaxHeuristicAgent:
     - Recorre todos los movimientos legales del jugador.
     - Evalúa cada movimiento con una función de evaluación heurística.
     - Se queda con el movimiento de mayor puntuación.
+
+    Con `vectorized` (por defecto `settings.MAX_AGENT_VECTORIZED`) todas las candidatas se
+    puntúan a la vez con NumPy (`game/ai/vectorized.py`) y solo se calcula el detalle de la
+    elegida; la jugada y la puntuación son las mismas que en la evaluación una a una.
     """
 
+    def __init__(self, vectorized: Optional[bool] = None):
+        if vectorized is None:
+            from django.conf import settings
+
+            vectorized = bool(getattr(settings, "MAX_AGENT_VECTORIZED", True))
+        self.vectorized = vectorized
+
     def suggest_move(
         self,
         partida_id: str,
@@ -266,18 +332,256 @@ class MaxHeuristicAgent:
         if not piezas:
             raise ValueError("No hay piezas registradas para la partida")
 
+        # Último movimiento del jugador (para evitar oscilaciones A->B->A)
+        last_move = (
+            Movimiento.objects.filter(partida_id=partida_id, jugador_id=jugador_id)
+            .order_by("-ply")
+            .first()
+        )
+        last = (last_move.pieza_id, last_move.origen, last_move.destino) if last_move else None
+
+        return self.choose_move(piezas, jugador_id, allow_simple=allow_simple, last_move=last, partida_id=partida_id)
+
+    def choose_move(
+        self,
+        piezas: Sequence,
+        jugador_id: str,
+        allow_simple: bool = True,
+        last_move: Optional[Tuple[str, str, str]] = None,
+        partida_id: str = "",
+    ) -> Dict[str, object]:
+        """Elige la jugada sobre un tablero en memoria (sin consultas a la base de datos).
+
+        `piezas` son objetos con `id_pieza`, `jugador_id`, `tipo` y `posicion` (modelos
+        `Pieza` o tuplas del simulador) y `last_move` es (pieza_id, origen, destino) del
+        último movimiento del jugador, si lo hay.
+        """
         # 2) Filtrar piezas del jugador y determinar punta objetivo
         piezas_jugador = [p for p in piezas if str(p.jugador_id) == str(jugador_id)]
         if not piezas_jugador:
             raise ValueError("El jugador no tiene piezas en la partida")
 
-        punta = _parse_punta(piezas_jugador[0].tipo)
+        punta = _piece_punta(piezas_jugador[0])
         target = _target_punta(punta)
         if target is None:
             raise ValueError("No se pudo determinar la punta objetivo para el jugador")
 
         # 3) Estado ocupado y detección de si hay algún salto posible
         occupied = {p.posicion for p in piezas if p.posicion}
+        precomputed_moves, has_any_jump, outside_progress_possible = self._move_context(
+            piezas_jugador, occupied, target, allow_simple
+        )
+
+        # 4) Puntuar el estado actual como referencia (base_score)
+        base_score = self._base_score(piezas, jugador_id, target, punta)
+
+        # 5) Candidatos: movimientos simples de cada pieza + (si existe) su mejor salto en cadena
+        candidates: List[Tuple[str, str, str, Optional[List[str]]]] = []
+        for pieza in piezas_jugador:
+            if not pieza.posicion:
+                continue
+            simple_moves, jump_sequences = precomputed_moves.get(pieza.id_pieza, (set(), []))
+            jump_best = self._pick_best_jump_sequence(pieza.posicion, jump_sequences, target)
+            for destino in sorted(simple_moves):
+                candidates.append((pieza.id_pieza, pieza.posicion, destino, None))
+            if jump_best is not None:
+                candidates.append((pieza.id_pieza, pieza.posicion, jump_best[-1], jump_best))
+
+        # 6) Estilo machine_move: evaluar cada movimiento y escoger el mejor
+        score_args = dict(
+            piezas=piezas,
+            jugador_id=jugador_id,
+            target_punta=target,
+            home_punta=punta,
+            has_any_jump=has_any_jump,
+            outside_progress_available=outside_progress_possible,
+            last_move=last_move,
+            base_score=base_score,
+            partida_id=partida_id,
+        )
+        if self.vectorized and candidates:
+            best = self._best_candidate_vectorized(candidates, score_args)
+        else:
+            best = None
+            for pieza_id, origen, destino, seq in candidates:
+                adjusted_score, detail = self._score_candidate(
+                    pieza_id=pieza_id, origen=origen, destino=destino, sequence=seq, **score_args
+                )
+                is_jump = seq is not None
+
+                # Guardar el mejor movimiento (preferir salto en empate)
+                if best is None or adjusted_score > best.score or (
+                    adjusted_score == best.score and is_jump and not best.detail.get("salto", False)
+                ):
+                    best = MoveCandidate(
+                        pieza_id=pieza_id,
+                        origen=origen,
+                        destino=destino,
+                        score=adjusted_score,
+                        detail=detail,
+                        sequence=seq,
+                    )
+
+        if best is None:
+            raise ValueError("No hay movimientos validos disponibles")
+
+        payload: Dict[str, object] = {
+            "pieza_id": best.pieza_id,
+            "origen": best.origen,
+            "destino": best.destino,
+            "heuristica": "max",
+            "puntuacion": best.score,
+            "detalle": {**best.detail, "base": base_score},
+        }
+
+        # Si es un salto en cadena, devolver también la secuencia paso a paso
+        if best.sequence and len(best.sequence) >= 2:
+            payload["secuencia"] = [
+                {"origen": best.sequence[i], "destino": best.sequence[i + 1]}
+                for i in range(len(best.sequence) - 1)
+            ]
+
+        return payload
+
+    def move_features(
+        self,
+        piezas: Sequence,
+        jugador_id: str,
+        pieza_id: str,
+        sequence: Sequence[str],
+        allow_simple: bool = True,
+        last_move: Optional[Tuple[str, str, str]] = None,
+    ) -> Dict[str, float]:
+        """Detalle de una jugada concreta con los mismos términos que `choose_move`.
+
+        Sirve para puntuar jugadas que no eligió el agente (partidas guardadas, jugadas
+        aleatorias del autojuego). `sequence` es (origen, ..., destino); incluye `puntuacion`.
+        """
+        piezas_jugador = [p for p in piezas if str(p.jugador_id) == str(jugador_id)]
+        if not piezas_jugador:
+            raise ValueError("El jugador no tiene piezas en la partida")
+        punta = _piece_punta(piezas_jugador[0])
+        target = _target_punta(punta)
+        if target is None:
+            raise ValueError("No se pudo determinar la punta objetivo para el jugador")
+
+        occupied = {p.posicion for p in piezas if p.posicion}
+        _precomputed, has_any_jump, outside_progress_possible = self._move_context(
+            piezas_jugador, occupied, target, allow_simple
+        )
+        base_score = self._base_score(piezas, jugador_id, target, punta)
+        seq = list(sequence)
+        is_jump = len(seq) > 2 or (
+            len(seq) == 2 and seq[1] not in self._compute_simple_moves(seq[0], occupied)
+        )
+        score, detail = self._score_candidate(
+            piezas=piezas,
+            jugador_id=jugador_id,
+            pieza_id=pieza_id,
+            origen=seq[0],
+            destino=seq[-1],
+            sequence=seq if is_jump else None,
+            target_punta=target,
+            home_punta=punta,
+            has_any_jump=has_any_jump,
+            outside_progress_available=outside_progress_possible,
+            last_move=last_move,
+            base_score=base_score,
+        )
+        return {**detail, "base": base_score, "puntuacion": score}
+
+    def score_moves(
+        self,
+        piezas: Sequence,
+        jugador_id: str,
+        moves: Sequence[Tuple[str, Sequence[str]]],
+        allow_simple: bool = True,
+        last_move: Optional[Tuple[str, str, str]] = None,
+    ) -> np.ndarray:
+        """Puntuación de muchas jugadas (pieza_id, (origen, ..., destino)) en una sola pasada.
+
+        Equivale a la `puntuacion` de `move_features` para cada jugada, pero con una matriz
+        de términos y un único producto por los pesos (p. ej. para priorizar jugadas en MCTS).
+        """
+        unidades = self.move_units(piezas, jugador_id, moves, allow_simple=allow_simple, last_move=last_move)
+        return unidades @ np.asarray(weight_vector(), dtype=np.float64)
+
+    def move_units(
+        self,
+        piezas: Sequence,
+        jugador_id: str,
+        moves: Sequence[Tuple[str, Sequence[str]]],
+        allow_simple: bool = True,
+        last_move: Optional[Tuple[str, str, str]] = None,
+    ) -> np.ndarray:
+        """Matriz (jugadas × `WEIGHT_NAMES`) de unidades sin pesar de cada término.
+
+        No depende del valor de los pesos (un peso a 0 conserva su columna), así que sirve
+        como `X` de los datos de entrenamiento; `score_moves` es su producto por los pesos.
+        """
+        from .vectorized import candidate_units
+
+        piezas_jugador = [p for p in piezas if str(p.jugador_id) == str(jugador_id)]
+        if not piezas_jugador:
+            raise ValueError("El jugador no tiene piezas en la partida")
+        punta = _piece_punta(piezas_jugador[0])
+        target = _target_punta(punta)
+        if target is None:
+            raise ValueError("No se pudo determinar la punta objetivo para el jugador")
+        if not moves:
+            return np.zeros((0, len(WEIGHT_NAMES)), dtype=np.float64)
+
+        occupied = {p.posicion for p in piezas if p.posicion}
+        _precomputed, has_any_jump, outside_progress_possible = self._move_context(
+            piezas_jugador, occupied, target, allow_simple
+        )
+        candidates = []
+        for pieza_id, sequence in moves:
+            seq = list(sequence)
+            is_jump = len(seq) > 2 or (
+                len(seq) == 2 and seq[1] not in self._compute_simple_moves(seq[0], occupied)
+            )
+            candidates.append((pieza_id, seq[0], seq[-1], seq if is_jump else None))
+        return candidate_units(
+            piezas, jugador_id, candidates, target, punta, has_any_jump, outside_progress_possible, last_move
+        )
+
+    def _best_candidate_vectorized(
+        self,
+        candidates: List[Tuple[str, str, str, Optional[List[str]]]],
+        score_args: Dict[str, object],
+    ) -> MoveCandidate:
+        """Mejor candidata puntuando todas a la vez; mismo desempate que el bucle (salto en empate)."""
+        from .vectorized import candidate_scores
+
+        scores = candidate_scores(
+            score_args["piezas"],
+            score_args["jugador_id"],
+            candidates,
+            score_args["target_punta"],
+            score_args["home_punta"],
+            score_args["has_any_jump"],
+            score_args["outside_progress_available"],
+            score_args["last_move"],
+        )
+        # El producto suma los términos en otro orden que el bucle: redondear para conservar empates
+        scores = np.round(scores, 9)
+        empatadas = np.flatnonzero(scores == scores.max())
+        saltos = [i for i in empatadas if candidates[i][3] is not None]
+        pieza_id, origen, destino, seq = candidates[saltos[0] if saltos else empatadas[0]]
+        score, detail = self._score_candidate(
+            pieza_id=pieza_id, origen=origen, destino=destino, sequence=seq, **score_args
+        )
+        return MoveCandidate(pieza_id=pieza_id, origen=origen, destino=destino, score=score, detail=detail, sequence=seq)
+
+    def _move_context(
+        self,
+        piezas_jugador: Sequence,
+        occupied: Set[str],
+        target: int,
+        allow_simple: bool,
+    ) -> Tuple[Dict[str, Tuple[Set[str], List[List[str]]]], bool, bool]:
+        """Movimientos de cada pieza, si hay algún salto y si alguna pieza de fuera puede progresar."""
         goal_positions = set(GOAL_POSITIONS.get(target, []))
 
         precomputed_moves: Dict[str, Tuple[Set[str], List[List[str]]]] = {}
@@ -327,124 +631,83 @@ class MaxHeuristicAgent:
                             break
                     if outside_progress_possible:
                         break
-        # Último movimiento del jugador (para evitar oscilaciones A->B->A)
-        last_move = (
-            Movimiento.objects.filter(partida_id=partida_id, jugador_id=jugador_id)
-            .select_related("ronda", "pieza")
-            .order_by("-ronda__numero", "-id_movimiento")
-            .first()
-        )
-        last_from = getattr(last_move, "origen", None)
-        last_to = getattr(last_move, "destino", None)
-        last_piece_id = getattr(last_move, "pieza_id", None)
+        return precomputed_moves, has_any_jump, outside_progress_possible
 
-        # 4) Puntuar el estado actual como referencia (base_score)
+    def _base_score(self, piezas: Sequence, jugador_id: str, target: int, punta: Optional[int]) -> float:
+        """Puntuación del estado actual (referencia para el `delta` de cada jugada)."""
         base_score, _, _, _, _ = self._evaluate_state(
             ((p.id_pieza, str(p.jugador_id), p.tipo, p.posicion) for p in piezas),
             jugador_id,
             target,
             return_detail=True,
+            home_punta=punta,
         )
         player_positions_current = [
             p.posicion for p in piezas if str(p.jugador_id) == str(jugador_id) and p.posicion
         ]
         base_priority_penalty, _, _ = _goal_priority_penalty(player_positions_current, target)
-        base_score += base_priority_penalty
-
-        # 5) Estilo machine_move: evaluar cada movimiento y escoger el mejor
-        best: Optional[MoveCandidate] = None
-
-        for pieza in piezas_jugador:
-            if not pieza.posicion:
-                continue
-            # 5.a) Obtener todos los movimientos válidos de la pieza
-            simple_moves, jump_sequences = precomputed_moves.get(pieza.id_pieza, (set(), []))
-            jump_best = self._pick_best_jump_sequence(pieza.posicion, jump_sequences, target)
-
-            # Candidatos: movimientos simples + (si existe) mejor salto en cadena
-            candidates: List[Tuple[str, Optional[List[str]]]] = []
-            for destino in sorted(simple_moves):
-                candidates.append((destino, None))
-            if jump_best is not None:
-                candidates.append((jump_best[-1], jump_best))
-
-            for destino, seq in candidates:
-                # 5.b) Calcular score heurístico para este movimiento
-                score, detail = self._score_after_move(
-                    partida_id=partida_id,
-                    jugador_id=jugador_id,
-                    pieza_id=pieza.id_pieza,
-                    origen=pieza.posicion,
-                    destino=destino,
-                    piezas=piezas,
-                    target_punta=target,
-                    outside_progress_available=outside_progress_possible,
-                    sequence=seq,
-                )
-                is_jump = seq is not None
-                jump_bonus = W_JUMP_BONUS if is_jump else 0.0
-                chain_len = (len(seq) - 1) if seq else 0
-                chain_bonus = float(chain_len) * W_CHAIN_LEN_BONUS
-                entered_goal = detail.get("entro_meta", 0.0) > 0.0
-                rearranging_goal = detail.get("reacomodo_meta", 0.0) > 0.0
-                priority_fill = detail.get("relleno_prioridad", 0.0) > 0.0
-                non_jump_penalty = 0.0
-                if has_any_jump and not is_jump and not (entered_goal or rearranging_goal or priority_fill):
-                    non_jump_penalty = W_NOJUMP_PENALTY
-
-                reverse_penalty = 0.0
-                if last_from and last_to and last_from == destino and last_to == pieza.posicion:
-                    reverse_penalty = W_REVERSE_PENALTY
-
-                same_piece_penalty = W_SAME_PIECE_PENALTY if (last_piece_id and str(last_piece_id) == str(pieza.id_pieza)) else 0.0
-
-                adjusted_score = score + jump_bonus + chain_bonus - non_jump_penalty - reverse_penalty - same_piece_penalty
-                delta = adjusted_score - base_score
-
-                detail.update({
-                    "delta": delta,
-                    "salto": is_jump,
-                    "bonus_salto": jump_bonus,
-                    "saltos_en_cadena": chain_len,
-                    "bonus_cadena": chain_bonus,
-                    "penalizacion_no_salto": non_jump_penalty,
-                    "penalizacion_reverse": reverse_penalty,
-                    "penalizacion_misma_pieza": same_piece_penalty,
-                })
-
-                # 5.c) Guardar el mejor movimiento (preferir salto en empate)
-                if best is None or adjusted_score > best.score or (
-                    adjusted_score == best.score and is_jump and not best.detail.get("salto", False)
-                ):
-                    best = MoveCandidate(
-                        pieza_id=pieza.id_pieza,
-                        origen=pieza.posicion,
-                        destino=destino,
-                        score=adjusted_score,
-                        detail=detail,
-                        sequence=seq,
-                    )
-
-        if best is None:
-            raise ValueError("No hay movimientos validos disponibles")
+        return base_score + base_priority_penalty
 
-        payload: Dict[str, object] = {
-            "pieza_id": best.pieza_id,
-            "origen": best.origen,
-            "destino": best.destino,
-            "heuristica": "max",
-            "puntuacion": best.score,
-            "detalle": {**best.detail, "base": base_score},
-        }
-
-        # Si es un salto en cadena, devolver también la secuencia paso a paso
-        if best.sequence and len(best.sequence) >= 2:
-            payload["secuencia"] = [
-                {"origen": best.sequence[i], "destino": best.sequence[i + 1]}
-                for i in range(len(best.sequence) - 1)
-            ]
-
-        return payload
+    def _score_candidate(
+        self,
+        *,
+        piezas: Sequence,
+        jugador_id: str,
+        pieza_id: str,
+        origen: str,
+        destino: str,
+        sequence: Optional[List[str]],
+        target_punta: int,
+        home_punta: Optional[int],
+        has_any_jump: bool,
+        outside_progress_available: bool,
+        last_move: Optional[Tuple[str, str, str]],
+        base_score: float,
+        partida_id: str = "",
+    ) -> Tuple[float, Dict[str, float]]:
+        """Puntuación final de una jugada: `_score_after_move` más bonos de salto y penalizaciones de repetición."""
+        score, detail = self._score_after_move(
+            partida_id=partida_id,
+            jugador_id=jugador_id,
+            pieza_id=pieza_id,
+            origen=origen,
+            destino=destino,
+            piezas=piezas,
+            target_punta=target_punta,
+            outside_progress_available=outside_progress_available,
+            sequence=sequence,
+            home_punta=home_punta,
+        )
+        last_piece_id, last_from, last_to = last_move if last_move else (None, None, None)
+        is_jump = sequence is not None
+        jump_bonus = W_JUMP_BONUS if is_jump else 0.0
+        chain_len = (len(sequence) - 1) if sequence else 0
+        chain_bonus = float(chain_len) * W_CHAIN_LEN_BONUS
+        entered_goal = detail.get("entro_meta", 0.0) > 0.0
+        rearranging_goal = detail.get("reacomodo_meta", 0.0) > 0.0
+        priority_fill = detail.get("relleno_prioridad", 0.0) > 0.0
+        non_jump_penalty = 0.0
+        if has_any_jump and not is_jump and not (entered_goal or rearranging_goal or priority_fill):
+            non_jump_penalty = W_NOJUMP_PENALTY
+
+        reverse_penalty = 0.0
+        if last_from and last_to and last_from == destino and last_to == origen:
+            reverse_penalty = W_REVERSE_PENALTY
+
+        same_piece_penalty = W_SAME_PIECE_PENALTY if (last_piece_id and str(last_piece_id) == str(pieza_id)) else 0.0
+
+        adjusted_score = score + jump_bonus + chain_bonus - non_jump_penalty - reverse_penalty - same_piece_penalty
+        detail.update({
+            "delta": adjusted_score - base_score,
+            "salto": is_jump,
+            "bonus_salto": jump_bonus,
+            "saltos_en_cadena": chain_len,
+            "bonus_cadena": chain_bonus,
+            "penalizacion_no_salto": non_jump_penalty,
+            "penalizacion_reverse": reverse_penalty,
+            "penalizacion_misma_pieza": same_piece_penalty,
+        })
+        return adjusted_score, detail
 
     def _pick_best_jump_sequence(
         self,
@@ -509,6 +772,7 @@ class MaxHeuristicAgent:
         target_punta: int,
         sequence: Optional[List[str]] = None,
         outside_progress_available: bool = True,
+        home_punta: Optional[int] = None,
     ) -> Tuple[float, Dict[str, float]]:
         """Evalúa el estado tras mover una pieza"""
         goal_positions: Set[str] = set()
@@ -517,12 +781,12 @@ class MaxHeuristicAgent:
         priority_list = GOAL_PRIORITY_POSITIONS.get(target_punta, []) if target_punta is not None else []
         priority_set = set(priority_list)
 
-        home_punta = None
-        for p in piezas:
-            if str(p.jugador_id) == str(jugador_id):
-                home_punta = _parse_punta(p.tipo)
-                if home_punta is not None:
-                    break
+        if home_punta is None:
+            for p in piezas:
+                if str(p.jugador_id) == str(jugador_id):
+                    home_punta = _piece_punta(p)
+                    if home_punta is not None:
+                        break
 
         home_positions = set(GOAL_POSITIONS.get(home_punta, [])) if home_punta is not None else set()
         home_priority_set = set(GOAL_PRIORITY_POSITIONS.get(home_punta, [])) if home_punta is not None else set()
@@ -566,6 +830,7 @@ class MaxHeuristicAgent:
             jugador_id,
             target_punta,
             return_detail=True,
+            home_punta=home_punta,
         )
 
         # 3) Añadir progreso de la pieza movida (acercar vs alejar)
@@ -797,6 +1062,7 @@ class MaxHeuristicAgent:
         jugador_id: str,
         target_punta: int,
         return_detail: bool = False,
+        home_punta: Optional[int] = None,
     ) -> float | Tuple[float, float, float, int]:
         """
         Heurística Max: menor distancia total y punta más adelantada, penaliza bloqueos, sólo evalúa el estado actual.
@@ -821,7 +1087,8 @@ class MaxHeuristicAgent:
             # Saltar piezas de otros jugadores
             if str(jug_id) != str(jugador_id):
                 continue
-            punta = _parse_punta(tipo)
+            # Todas las piezas del jugador comparten punta: solo se parsea `tipo` si no se indicó
+            punta = home_punta if home_punta is not None else _parse_punta(tipo)
             if punta is None or not pos:
                 continue
             axial = _axial_from_key(pos)
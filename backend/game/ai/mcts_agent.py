@@ -1,14 +1,18 @@
 from __future__ import annotations
 
 import random
-from dataclasses import dataclass
+import threading
+import time
+from dataclasses import dataclass, field
 from typing import Dict, Iterable, List, Optional, Tuple
 
 from montecarlo.montecarlo import MonteCarlo
 from montecarlo.node import Node
 
+from ..board import COLORES_POR_PUNTA, POSICIONES_POR_PUNTA, PUNTAS_ACTIVAS
 from ..models import JugadorPartida, Movimiento, Pieza, Ronda
-from .max_agent import (AXIAL_DIRECTIONS,GOAL_POSITIONS,POSITION_TO_CARTESIAN,_axial_from_key,_distance_to_goal,_key_from_axial,_parse_punta,_target_punta)
+from .max_agent import (AXIAL_DIRECTIONS,GOAL_POSITIONS,POSITION_TO_CARTESIAN,_axial_from_key,_distance_to_goal,_key_from_axial,_piece_punta,_target_punta)
+from .vectorized import StateBatchEvaluator
 
 
 
@@ -42,6 +46,12 @@ class _PieceTuple:
     jugador_id: str
     tipo: str
     posicion: str
+    punta: Optional[int] = None
+
+    @property
+    def id_pieza(self) -> str:
+        # Mismo nombre que `Pieza`, para poder pasar el estado al agente Max
+        return self.pieza_id
 
 
 @dataclass(frozen=True)
@@ -139,6 +149,7 @@ class GameState:
                     jugador_id=p.jugador_id,
                     tipo=p.tipo,
                     posicion=move.destino,
+                    punta=p.punta,
                 )
                 break
 
@@ -282,6 +293,339 @@ def legal_turn_moves(
     return ranked[:max_moves]
 
 
+def load_game_state(partida_id: str, jugador_id: str) -> GameState:
+    """Construye el `GameState` de la partida con `jugador_id` como jugador que mueve."""
+    piezas = list(Pieza.objects.filter(partida_id=partida_id))
+    if not piezas:
+        raise ValueError("No hay piezas registradas para la partida")
+
+    piezas_jugador = [p for p in piezas if str(p.jugador_id) == str(jugador_id) and p.posicion]
+    if not piezas_jugador:
+        raise ValueError("El jugador no tiene piezas en la partida")
+
+    participaciones = list(
+        JugadorPartida.objects.filter(partida_id=partida_id).order_by("orden_participacion")
+    )
+    player_order = tuple(str(p.jugador_id) for p in participaciones)
+    if not player_order:
+        player_order = tuple(sorted({str(p.jugador_id) for p in piezas if p.jugador_id}))
+
+    try:
+        current_index = player_order.index(str(jugador_id))
+    except ValueError:
+        current_index = 0
+
+    targets: List[Tuple[str, int]] = []
+    seen: set[str] = set()
+    for p in piezas:
+        jid = str(p.jugador_id)
+        if jid in seen:
+            continue
+        seen.add(jid)
+        target = _target_punta(_piece_punta(p))
+        if target is not None:
+            targets.append((jid, int(target)))
+
+    piece_tuples = tuple(
+        _PieceTuple(
+            pieza_id=str(p.id_pieza),
+            jugador_id=str(p.jugador_id),
+            tipo=str(p.tipo),
+            posicion=str(p.posicion),
+            punta=_piece_punta(p),
+        )
+        for p in piezas
+        if p.posicion
+    )
+
+    return GameState(
+        player_order=player_order,
+        current_player_index=current_index,
+        player_targets=tuple(targets),
+        pieces=piece_tuples,
+    )
+
+
+def new_game_state(numero_jugadores: int) -> GameState:
+    """`GameState` de una partida nueva sin base de datos (jugadores "1".."n" por orden de participación)."""
+    puntas = PUNTAS_ACTIVAS.get(numero_jugadores)
+    if not puntas:
+        raise ValueError("numero_jugadores debe ser 2, 3, 4 o 6")
+    pieces = tuple(
+        _PieceTuple(
+            pieza_id=f"P_{orden}_{i}",
+            jugador_id=str(orden),
+            tipo=f"{punta}-{COLORES_POR_PUNTA[punta]}",
+            posicion=posicion,
+            punta=punta,
+        )
+        for orden, punta in enumerate(puntas, start=1)
+        for i, posicion in enumerate(POSICIONES_POR_PUNTA[punta])
+    )
+    return GameState(
+        player_order=tuple(str(orden) for orden in range(1, len(puntas) + 1)),
+        current_player_index=0,
+        player_targets=tuple((str(orden), int(_target_punta(punta))) for orden, punta in enumerate(puntas, start=1)),
+        pieces=pieces,
+    )
+
+
+def _leaf_batch_setting() -> int:
+    from django.conf import settings
+
+    return max(0, int(getattr(settings, "MCTS_LEAF_BATCH", 0)))
+
+
+class _BatchedMonteCarlo(MonteCarlo):
+    """`MonteCarlo` que expande varias hojas por ronda y evalúa todos sus hijos de una vez.
+
+    Cada selección aplica una pérdida virtual (una visita y una derrota) a los nodos del
+    camino para que las siguientes selecciones de la ronda vayan a otras ramas; los valores
+    se restauran antes de retropropagar las evaluaciones reales. Cada hoja expandida cuenta
+    como una simulación.
+    """
+
+    def __init__(self, root_node: Node, batch_size: int, batch_evaluator):
+        super().__init__(root_node)
+        self.batch_size = max(1, int(batch_size))
+        self.batch_evaluator = batch_evaluator
+
+    def _select_leaf(self) -> Node:
+        node = self.root_node
+        while node.expanded:
+            node = node.get_preferred_child(self.root_node)
+        return node
+
+    def _select_leaves(self, count: int) -> List[Node]:
+        leaves: List[Node] = []
+        saved: Dict[int, Tuple[Node, int, float]] = {}
+        for _ in range(count):
+            leaf = self._select_leaf()
+            if any(leaf is other for other in leaves):
+                break
+            leaves.append(leaf)
+            node = leaf
+            while node is not None:
+                saved.setdefault(id(node), (node, node.visits, node.win_value))
+                node.visits += 1
+                if node.parent is not None:
+                    # Derrota desde el punto de vista de quien elige este hijo
+                    node.win_value += -1.0 if node.parent.player_number == self.root_node.player_number else 1.0
+                node = node.parent
+        for node, visits, win_value in saved.values():
+            node.visits = visits
+            node.win_value = win_value
+        return leaves
+
+    def simulate(self, expansion_count: int = 1) -> None:
+        remaining = int(expansion_count)
+        while remaining > 0:
+            leaves = self._select_leaves(min(self.batch_size, remaining))
+            children: List[Node] = []
+            for leaf in leaves:
+                self.child_finder(leaf, self)
+                children.extend(leaf.children)
+            for child, value in zip(children, self.batch_evaluator(children)):
+                child.update_win_value(float(value))
+            for leaf in leaves:
+                if leaf.children:
+                    leaf.expanded = True
+            remaining -= len(leaves)
+
+
+def _build_search(
+    root_state: GameState,
+    root_player_id: str,
+    allow_simple: bool,
+    exploration: float,
+    node_counter: Optional[List[int]] = None,
+    leaf_batch: int = 0,
+) -> MonteCarlo:
+    """Prepara el árbol MCTS (raíz + callbacks de la librería) para `root_state`.
+
+    `node_counter`, si se indica, acumula el número de nodos creados (límite de memoria
+    del modo ponder). Con `leaf_batch` > 0 se expanden hasta `leaf_batch` hojas por ronda
+    y sus hijos se evalúan juntos con `StateBatchEvaluator` (ver `_BatchedMonteCarlo`).
+    """
+    root_lib_state = _LibState(game=root_state, last_move=None)
+    root_node = Node(root_lib_state)
+    root_node.player_number = root_state.current_player_id
+
+    if hasattr(root_node, "discovery_factor"):
+        setattr(root_node, "discovery_factor", float(exploration))
+
+    if leaf_batch > 0:
+        evaluator = StateBatchEvaluator(root_state, str(root_player_id))
+        montecarlo: MonteCarlo = _BatchedMonteCarlo(
+            root_node,
+            leaf_batch,
+            lambda nodes: evaluator.evaluate([n.state.game for n in nodes]),
+        )
+    else:
+        montecarlo = MonteCarlo(root_node)
+
+    def child_finder(node: Node, _mc: MonteCarlo) -> None:
+        state: _LibState = node.state
+        current_player = state.game.current_player_id
+        allow_simple_local = allow_simple if node is montecarlo.root_node else True
+
+        moves = legal_turn_moves(state.game, current_player, allow_simple=allow_simple_local)
+        for move in moves:
+            child_state = state.apply(move)
+            child = Node(child_state)
+            child.player_number = child_state.game.current_player_id
+            if hasattr(child, "discovery_factor"):
+                setattr(child, "discovery_factor", float(exploration))
+            node.add_child(child)
+        if node_counter is not None:
+            node_counter[0] += len(moves)
+
+    def node_evaluator(node: Node, _mc: MonteCarlo) -> float:
+        state: _LibState = node.state
+        return float(state.game.evaluate(root_player_id=str(root_player_id)))
+
+    montecarlo.child_finder = child_finder
+    montecarlo.node_evaluator = node_evaluator
+    return montecarlo
+
+
+def _board_key(state: GameState) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """Identifica una posición (jugador que mueve + colocación) con independencia del orden de piezas."""
+    return (
+        state.current_player_id,
+        tuple(sorted((p.pieza_id, p.posicion) for p in state.pieces)),
+    )
+
+
+@dataclass
+class _PonderSession:
+    """Búsquedas anticipadas del agente, una por cada respuesta probable del humano."""
+
+    stop: threading.Event = field(default_factory=threading.Event)
+    finished: threading.Event = field(default_factory=threading.Event)
+    searches: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], MonteCarlo] = field(default_factory=dict)
+    iterations: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int] = field(default_factory=dict)
+    started: float = field(default_factory=time.monotonic)
+
+
+_ponder_sessions: Dict[Tuple[str, str], _PonderSession] = {}
+_ponder_lock = threading.Lock()
+
+
+def _evict_stale_sessions() -> None:
+    """Descarta (con `_ponder_lock` tomado) las sesiones de más de `MCTS_PONDER_SESSION_TTL` segundos.
+
+    Cubre las partidas abandonadas o en las que el humano nunca mueve, cuyo árbol no recoge nadie.
+    """
+    from django.conf import settings
+
+    limite = time.monotonic() - float(getattr(settings, "MCTS_PONDER_SESSION_TTL", 600))
+    for clave, session in list(_ponder_sessions.items()):
+        if session.started < limite:
+            session.stop.set()
+            del _ponder_sessions[clave]
+
+
+def ponder(
+    partida_id: str,
+    agent_id: str,
+    *,
+    seconds: float = 20.0,
+    max_nodes: int = 20000,
+    max_replies: int = 6,
+    exploration: float = 1.35,
+) -> int:
+    """Modo ponder: busca la jugada del agente durante la ronda del humano.
+
+    Expande un árbol MCTS del agente bajo cada una de las `max_replies` respuestas más
+    probables del humano (según `legal_turn_moves`) repartiendo iteraciones entre ellos
+    hasta agotar `seconds`, `max_nodes` o hasta que se llame a `stop_pondering`. Cuando el
+    humano registra su jugada, `MCTSAgent.suggest_move` reutiliza el árbol correspondiente
+    como raíz. Devuelve el número de iteraciones realizadas.
+    """
+    ronda_actual = (
+        Ronda.objects.filter(partida_id=partida_id, fin__isnull=True)
+        .order_by("numero")
+        .first()
+    )
+    if not ronda_actual or str(ronda_actual.jugador_id) == str(agent_id):
+        return 0
+
+    state = load_game_state(partida_id, str(ronda_actual.jugador_id))
+    session = _PonderSession()
+    with _ponder_lock:
+        _evict_stale_sessions()
+        previous = _ponder_sessions.get((str(partida_id), str(agent_id)))
+        if previous is not None:
+            previous.stop.set()
+        _ponder_sessions[(str(partida_id), str(agent_id))] = session
+
+    node_counter = [0]
+    total = 0
+    leaf_batch = _leaf_batch_setting()
+    step = max(1, leaf_batch)
+    try:
+        replies = legal_turn_moves(state, state.current_player_id, allow_simple=True)[: max(1, int(max_replies))]
+        for reply in replies:
+            child_state = state.apply(reply)
+            if child_state.current_player_id != str(agent_id):
+                continue
+            key = _board_key(child_state)
+            session.searches[key] = _build_search(
+                child_state, str(agent_id), True, exploration, node_counter, leaf_batch=leaf_batch
+            )
+            session.iterations[key] = 0
+
+        deadline = time.monotonic() + max(0.0, float(seconds))
+        while session.searches and not session.stop.is_set():
+            for key, montecarlo in session.searches.items():
+                if session.stop.is_set() or time.monotonic() >= deadline or node_counter[0] >= max_nodes:
+                    session.stop.set()
+                    break
+                montecarlo.simulate(step)
+                session.iterations[key] += step
+                total += step
+    finally:
+        session.finished.set()
+    return total
+
+
+def stop_pondering(partida_id: str, discard: bool = True) -> None:
+    """Detiene las búsquedas anticipadas de la partida y las descarta.
+
+    Con `discard=False` (el humano acaba de mover) los árboles se conservan para que
+    `take_pondered_search` los recoja en la ronda del agente.
+    """
+    with _ponder_lock:
+        claves = [clave for clave in _ponder_sessions if clave[0] == str(partida_id)]
+        sessions = [
+            _ponder_sessions.pop(clave) if discard else _ponder_sessions[clave]
+            for clave in claves
+        ]
+        _evict_stale_sessions()
+    for session in sessions:
+        session.stop.set()
+
+
+def take_pondered_search(
+    partida_id: str,
+    agent_id: str,
+    state: GameState,
+) -> Optional[Tuple[MonteCarlo, int]]:
+    """Devuelve (árbol, iteraciones) anticipados para `state` si el humano jugó una respuesta prevista."""
+    with _ponder_lock:
+        session = _ponder_sessions.pop((str(partida_id), str(agent_id)), None)
+    if session is None:
+        return None
+    session.stop.set()
+    session.finished.wait(timeout=5.0)
+    key = _board_key(state)
+    montecarlo = session.searches.get(key)
+    if montecarlo is None:
+        return None
+    return montecarlo, session.iterations.get(key, 0)
+
+
 class MCTSAgent:
     """Agente Inteligente 'Difícil' basado en MCTS.
 
@@ -313,6 +657,8 @@ class MCTSAgent:
                     atributo existe en `Node`).
                 - `rollout_depth` se conserva como parámetro público (útil si más adelante se
                     decide limitar la profundidad de evaluación/rollouts).
+                - Si hubo búsqueda anticipada (`ponder`) para la posición actual, continúa ese
+                    árbol y solo ejecuta las simulaciones que falten.
             """
         if not partida_id or not jugador_id:
             raise ValueError("partida_id y jugador_id son requeridos")
@@ -327,94 +673,62 @@ class MCTSAgent:
         if str(ronda_actual.jugador_id) != str(jugador_id):
             raise ValueError("No es la ronda de este jugador")
 
-        piezas = list(Pieza.objects.filter(partida_id=partida_id))
-        if not piezas:
-            raise ValueError("No hay piezas registradas para la partida")
+        root_state = load_game_state(partida_id, jugador_id)
 
-        piezas_jugador = [p for p in piezas if str(p.jugador_id) == str(jugador_id) and p.posicion]
-        if not piezas_jugador:
-            raise ValueError("El jugador no tiene piezas en la partida")
+        if seed is not None:
+            random.seed(seed)
 
-        participaciones = list(
-            JugadorPartida.objects.filter(partida_id=partida_id).order_by("orden_participacion")
-        )
-        player_order = tuple(str(p.jugador_id) for p in participaciones)
-        if not player_order:
-            player_order = tuple(sorted({str(p.jugador_id) for p in piezas if p.jugador_id}))
-
-        try:
-            current_index = player_order.index(str(jugador_id))
-        except ValueError:
-            current_index = 0
-
-        targets: List[Tuple[str, int]] = []
-        seen: set[str] = set()
-        for p in piezas:
-            jid = str(p.jugador_id)
-            if jid in seen:
-                continue
-            seen.add(jid)
-            punta = _parse_punta(p.tipo)
-            target = _target_punta(punta)
-            if target is not None:
-                targets.append((jid, int(target)))
-
-        piece_tuples = tuple(
-            _PieceTuple(
-                pieza_id=str(p.id_pieza),
-                jugador_id=str(p.jugador_id),
-                tipo=str(p.tipo),
-                posicion=str(p.posicion),
-            )
-            for p in piezas
-            if p.posicion
+        last_move = (
+            Movimiento.objects.filter(partida_id=partida_id, jugador_id=jugador_id)
+            .order_by("-ply")
+            .first()
         )
+        last = (last_move.pieza_id, str(last_move.origen), str(last_move.destino)) if last_move else None
+
+        pondered = take_pondered_search(partida_id, jugador_id, root_state) if allow_simple else None
 
-        root_state = GameState(
-            player_order=player_order,
-            current_player_index=current_index,
-            player_targets=tuple(targets),
-            pieces=piece_tuples,
+        return self.choose_move(
+            root_state,
+            allow_simple=allow_simple,
+            iterations=iterations,
+            exploration=exploration,
+            last_move=last,
+            pondered=pondered,
         )
 
-        if seed is not None:
-            random.seed(seed)
+    def choose_move(
+        self,
+        root_state: GameState,
+        allow_simple: bool = True,
+        iterations: int = 250,
+        exploration: float = 1.35,
+        last_move: Optional[Tuple[str, str, str]] = None,
+        pondered: Optional[Tuple[MonteCarlo, int]] = None,
+        leaf_batch: Optional[int] = None,
+    ) -> Dict[str, object]:
+        """Busca la jugada del jugador que mueve en `root_state` (sin consultas a la base de datos).
 
-        root_moves = legal_turn_moves(root_state, root_state.current_player_id, allow_simple=allow_simple)
+        `last_move` es (pieza_id, origen, destino) del último movimiento del jugador y
+        `pondered` un árbol anticipado con sus iteraciones (ver `take_pondered_search`).
+        `leaf_batch` (por defecto `settings.MCTS_LEAF_BATCH`; 0 desactiva) es el número de
+        hojas que se expanden y evalúan juntas por ronda.
+        """
+        jugador_id = root_state.current_player_id
+        root_moves = legal_turn_moves(root_state, jugador_id, allow_simple=allow_simple)
         if not root_moves:
             raise ValueError("No hay movimientos válidos disponibles")
 
-        root_lib_state = _LibState(game=root_state, last_move=None)
-        root_node = Node(root_lib_state)
-        root_node.player_number = root_state.current_player_id
-
-        if hasattr(root_node, "discovery_factor"):
-            setattr(root_node, "discovery_factor", float(exploration))
-
-        montecarlo = MonteCarlo(root_node)
-
-        def child_finder(node: Node, _mc: MonteCarlo) -> None:
-            state: _LibState = node.state
-            current_player = state.game.current_player_id
-            allow_simple_local = allow_simple if node is montecarlo.root_node else True
-
-            moves = legal_turn_moves(state.game, current_player, allow_simple=allow_simple_local)
-            for move in moves:
-                child_state = state.apply(move)
-                child = Node(child_state)
-                child.player_number = child_state.game.current_player_id
-                if hasattr(child, "discovery_factor"):
-                    setattr(child, "discovery_factor", float(exploration))
-                node.add_child(child)
-
-        def node_evaluator(node: Node, _mc: MonteCarlo) -> float:
-            state: _LibState = node.state
-            return float(state.game.evaluate(root_player_id=str(jugador_id)))
+        pondered_iterations = 0
+        if pondered is not None:
+            montecarlo, pondered_iterations = pondered
+        else:
+            if leaf_batch is None:
+                leaf_batch = _leaf_batch_setting()
+            montecarlo = _build_search(root_state, str(jugador_id), allow_simple, exploration, leaf_batch=leaf_batch)
 
-        montecarlo.child_finder = child_finder
-        montecarlo.node_evaluator = node_evaluator
-
-        montecarlo.simulate(max(1, int(iterations)))
+        remaining = max(0, int(iterations) - pondered_iterations)
+        if remaining or not montecarlo.root_node.children:
+            montecarlo.simulate(max(1, remaining))
 
         chosen_child = montecarlo.make_choice()
         chosen_move = getattr(chosen_child.state, "last_move", None)
@@ -428,6 +742,8 @@ class MCTSAgent:
             "heuristica": "mcts",
             "simulaciones": int(iterations),
         }
+        if pondered_iterations:
+            payload["simulaciones_anticipadas"] = int(pondered_iterations)
         if len(chosen_move.sequence) >= 2:
             payload["secuencia"] = [
                 {"origen": chosen_move.sequence[i], "destino": chosen_move.sequence[i + 1]}
@@ -437,22 +753,18 @@ class MCTSAgent:
         if getattr(chosen_child, "visits", 0):
             payload["puntuacion"] = float(chosen_child.win_value / float(chosen_child.visits))
 
-        last_move = (
-            Movimiento.objects.filter(partida_id=partida_id, jugador_id=jugador_id)
-            .select_related("ronda", "pieza")
-            .order_by("-ronda__numero", "-id_movimiento")
-            .first()
-        )
-        if last_move and chosen_move.sequence == (str(last_move.destino), str(last_move.origen)):
-            for alt in root_moves[1:]:
-                if alt.sequence != (str(last_move.destino), str(last_move.origen)):
-                    payload["pieza_id"] = alt.pieza_id
-                    payload["origen"] = alt.origen
-                    payload["destino"] = alt.destino
-                    payload["secuencia"] = [
-                        {"origen": alt.sequence[i], "destino": alt.sequence[i + 1]}
-                        for i in range(len(alt.sequence) - 1)
-                    ]
-                    break
+        if last_move:
+            reverse = (str(last_move[2]), str(last_move[1]))
+            if chosen_move.sequence == reverse:
+                for alt in root_moves[1:]:
+                    if alt.sequence != reverse:
+                        payload["pieza_id"] = alt.pieza_id
+                        payload["origen"] = alt.origen
+                        payload["destino"] = alt.destino
+                        payload["secuencia"] = [
+                            {"origen": alt.sequence[i], "destino": alt.sequence[i + 1]}
+                            for i in range(len(alt.sequence) - 1)
+                        ]
+                        break
 
         return payload
@@ -0,0 +1,254 @@
+import random
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..board import encode_board, save_checkpoints, update_piece_positions
+from ..events import movimiento_datos, publish_on_commit, ronda_datos
+from ..models import AgenteInteligente, JugadorPartida, Movimiento, Partida, Pieza, Ronda
+from .max_agent import MaxHeuristicAgent
+from .mcts_agent import MCTSAgent, TurnMove, load_game_state
+from .suggestions import DEFAULT_MCTS_ITERATIONS
+
+
+def simulate_game(
+    partida_id: str,
+    *,
+    max_turnos: Optional[int] = None,
+    iterations: int = DEFAULT_MCTS_ITERATIONS,
+    allow_simple: bool = True,
+    seed: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    before_persist: Optional[Callable[[], int]] = None,
+) -> Dict[str, object]:
+    """Juega en memoria `max_turnos` turnos (o la partida completa) con los agentes.
+
+    Pensado para partidas demo y partidas solo entre agentes Inteligentes: cada turno se
+    calcula sobre un `GameState` en memoria y al final se guardan de una vez los
+    `Movimiento` y `Ronda` generados y la posición final de las piezas. En partidas demo,
+    los jugadores humanos los juega la heurística Max.
+
+    La simulación no abre transacción: solo el guardado final es atómico, y `before_persist`
+    se llama dentro de él antes de escribir (la vista reclama ahí la versión de la partida y
+    la devuelve; si lanza una excepción no se guarda nada). Sin `before_persist` la versión se
+    avanza sin comprobarla. Como en una jugada normal, tras el commit se publican los eventos
+    `movimiento_registrado` y `ronda_avanzada` con esa versión.
+
+    La simulación se corta también al agotar `time_budget` segundos (por defecto
+    `SIMULATION_TIME_BUDGET`); siempre se juega al menos un turno.
+
+    Devuelve la lista de turnos jugados (para que el frontend los anime), la ronda que
+    queda activa, el ganador, si lo hay (en ese caso la partida queda finalizada), y si se
+    cortó por tiempo.
+    """
+    partida = Partida.objects.get(id_partida=partida_id)
+    if partida.estado == 'FINALIZADA':
+        raise ValueError("La partida ya está finalizada")
+
+    participaciones = list(
+        JugadorPartida.objects.filter(partida=partida).select_related('jugador').order_by('orden_participacion')
+    )
+    if not participaciones:
+        raise ValueError("La partida no tiene jugadores asociados")
+
+    niveles = {
+        str(jugador_id): int(nivel or 1)
+        for jugador_id, nivel in AgenteInteligente.objects.filter(
+            jugador_id__in=[jp.jugador_id for jp in participaciones]
+        ).values_list('jugador_id', 'nivel')
+    }
+    for jp in participaciones:
+        if str(jp.jugador_id) not in niveles:
+            if not partida.is_demo:
+                raise ValueError("Solo se pueden simular partidas demo o entre agentes Inteligentes")
+            niveles[str(jp.jugador_id)] = 1
+
+    ronda_actual = partida.rondas.filter(fin__isnull=True).order_by('numero').first()
+    if not ronda_actual:
+        raise ValueError("No hay ronda activa para la partida")
+    if ronda_actual.movimientos.exists():
+        raise ValueError("La ronda activa ya tiene movimientos registrados")
+
+    limite = int(getattr(settings, 'SIMULATION_MAX_TURNS', 2000))
+    if max_turnos is not None:
+        limite = max(1, min(int(max_turnos), limite))
+
+    if time_budget is None:
+        time_budget = float(getattr(settings, 'SIMULATION_TIME_BUDGET', 30))
+    plazo = time.monotonic() + time_budget
+
+    if seed is not None:
+        random.seed(seed)
+
+    state = load_game_state(partida.id_partida, str(ronda_actual.jugador_id))
+    orden = [str(jp.jugador_id) for jp in participaciones]
+    idx = orden.index(state.current_player_id)
+    numero = int(ronda_actual.numero)
+
+    last_moves: Dict[str, Tuple[str, str, str]] = {}
+    for jugador_id, pieza_id, origen, destino in (
+        Movimiento.objects.filter(partida=partida)
+        .order_by('ply')
+        .values_list('jugador_id', 'pieza_id', 'origen', 'destino')
+    ):
+        last_moves[str(jugador_id)] = (str(pieza_id), str(origen), str(destino))
+
+    max_agent = MaxHeuristicAgent()
+    mcts_agent = MCTSAgent()
+    turnos: List[Dict[str, object]] = []
+    ganador: Optional[str] = None
+    tiempo_agotado = False
+    # marcas[k] es el instante en que terminó el turno k (marcas[0], el inicio de la simulación)
+    marcas = [timestamp_after(ronda_actual.inicio)]
+
+    while len(turnos) < limite:
+        jugador_id = state.current_player_id
+        if niveles.get(jugador_id, 1) >= 2:
+            jugada = mcts_agent.choose_move(
+                state,
+                allow_simple=allow_simple,
+                iterations=iterations,
+                last_move=last_moves.get(jugador_id),
+            )
+        else:
+            jugada = max_agent.choose_move(
+                state.pieces,
+                jugador_id,
+                allow_simple=allow_simple,
+                last_move=last_moves.get(jugador_id),
+                partida_id=partida.id_partida,
+            )
+
+        pasos = jugada.get('secuencia') or [{'origen': jugada['origen'], 'destino': jugada['destino']}]
+        secuencia = tuple([pasos[0]['origen']] + [p['destino'] for p in pasos])
+        state = state.apply(TurnMove(pieza_id=str(jugada['pieza_id']), sequence=secuencia))
+        last_moves[jugador_id] = (str(jugada['pieza_id']), secuencia[0], secuencia[-1])
+
+        turnos.append({
+            'jugador_id': jugador_id,
+            'orden': idx + 1,
+            'numero_ronda': numero,
+            'pieza_id': str(jugada['pieza_id']),
+            'origen': secuencia[0],
+            'destino': secuencia[-1],
+            'secuencia': pasos,
+        })
+        marcas.append(timestamp_after(marcas[-1]))
+
+        if state.is_win(jugador_id):
+            ganador = jugador_id
+            break
+
+        idx = (idx + 1) % len(orden)
+        if idx == 0:
+            numero += 1
+
+        if len(turnos) < limite and time.monotonic() >= plazo:
+            tiempo_agotado = True
+            break
+
+    _persist_simulation(partida, ronda_actual, turnos, marcas, state, orden, idx, numero, ganador, before_persist)
+
+    return {
+        'turnos': turnos,
+        'ganador': ganador,
+        'ronda_activa': None if ganador else f"R{numero}_J{idx + 1}_{partida.id_partida}",
+        'tiempo_agotado': tiempo_agotado,
+    }
+
+
+def timestamp_after(anterior=None):
+    """`timezone.now()`, estrictamente posterior a `anterior` aunque el reloj no haya avanzado."""
+    ahora = timezone.now()
+    if anterior is not None and ahora <= anterior:
+        return anterior + timedelta(microseconds=1)
+    return ahora
+
+
+def _persist_simulation(partida, ronda_actual, turnos, marcas, state, orden, idx, numero, ganador, before_persist=None) -> None:
+    """Guarda el resultado de la simulación con inserciones y actualizaciones en bloque."""
+    if not turnos:
+        return
+
+    participantes = {str(jp.jugador_id): jp.jugador for jp in JugadorPartida.objects.filter(partida=partida).select_related('jugador')}
+    with transaction.atomic():
+        if before_persist is not None:
+            version = before_persist()
+        else:
+            Partida.objects.filter(pk=partida.pk).update(version=F('version') + 1)
+            version = Partida.objects.filter(pk=partida.pk).values_list('version', flat=True).get()
+        # El primer turno se juega en la ronda activa; cada turno siguiente abre la suya
+        rondas = [ronda_actual]
+        rondas += [
+            Ronda(
+                id_ronda=f"R{t['numero_ronda']}_J{t['orden']}_{partida.id_partida}",
+                jugador=participantes[t['jugador_id']],
+                numero=t['numero_ronda'],
+                partida=partida,
+            )
+            for t in turnos[1:]
+        ]
+        if ganador is None:
+            rondas.append(Ronda(
+                id_ronda=f"R{numero}_J{idx + 1}_{partida.id_partida}",
+                jugador=participantes[orden[idx]],
+                numero=numero,
+                partida=partida,
+            ))
+        Ronda.objects.bulk_create(rondas[1:])
+
+        # `inicio` es auto_now_add: tras insertarlas se fijan los instantes medidos en la
+        # simulación (la ronda k empieza cuando termina el turno k - 1)
+        cerradas = rondas[:len(turnos)]
+        for k, ronda in enumerate(rondas[1:], start=1):
+            ronda.inicio = marcas[k]
+        for k, ronda in enumerate(cerradas, start=1):
+            ronda.fin = marcas[k]
+        Ronda.objects.bulk_update(rondas, ['inicio', 'fin'])
+
+        movimientos = [
+            Movimiento(
+                id_movimiento=f"M_{ronda.id_ronda}_{i}",
+                jugador=participantes[t['jugador_id']],
+                pieza_id=t['pieza_id'],
+                ronda=ronda,
+                partida=partida,
+                origen=paso['origen'],
+                destino=paso['destino'],
+            )
+            for ronda, t in zip(cerradas, turnos)
+            for i, paso in enumerate(t['secuencia'], start=1)
+        ]
+        primer_ply = Movimiento.next_ply(partida.id_partida)
+        for ply, movimiento in enumerate(movimientos, start=primer_ply):
+            movimiento.ply = ply
+        Movimiento.objects.bulk_create(movimientos)
+
+        posiciones = {p.pieza_id: p.posicion for p in state.pieces}
+        piezas = [p for p in Pieza.objects.filter(partida=partida) if p.id_pieza in posiciones and p.posicion != posiciones[p.id_pieza]]
+        for pieza in piezas:
+            pieza.posicion = posiciones[pieza.id_pieza]
+        update_piece_positions(piezas)
+        slots = {jugador_id: i + 1 for i, jugador_id in enumerate(orden)}
+        tablero = encode_board((p.posicion, slots.get(p.jugador_id)) for p in state.pieces)
+        Partida.objects.filter(pk=partida.pk).update(tablero=tablero)
+        save_checkpoints(partida.id_partida, tablero, movimientos)
+
+        if ganador is not None:
+            partida.estado = 'FINALIZADA'
+            partida.fecha_fin = marcas[-1]
+            partida.save(update_fields=['estado', 'fecha_fin'])
+
+        publish_on_commit(partida.id_partida, version, 'movimiento_registrado', {
+            'movimientos': [movimiento_datos(m) for m in movimientos],
+        })
+        if ganador is None:
+            publish_on_commit(partida.id_partida, version, 'ronda_avanzada', {
+                'ronda_actualizada': cerradas[-1].id_ronda,
+                'nueva_ronda': ronda_datos(rondas[-1]),
+            })
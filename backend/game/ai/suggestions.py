@@ -0,0 +1,264 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+from ..models import Partida
+from .max_agent import MaxHeuristicAgent
+from .mcts_agent import MCTSAgent, ponder
+
+DEFAULT_MCTS_ITERATIONS = 250
+DEFAULT_MCTS_ROLLOUT_DEPTH = 10
+
+logger = logging.getLogger(__name__)
+
+# Precálculo especulativo: cálculos en curso indexados por clave de caché
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# La búsqueda anticipada ocupa un hilo hasta `MCTS_PONDER_SECONDS`: pool propio para no
+# retrasar los precálculos
+_ponder_executor: Optional[ThreadPoolExecutor] = None
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _suggestion_cache():
+    return caches[getattr(settings, 'SUGGESTION_CACHE_ALIAS', 'default')]
+
+
+def position_version(partida_id: str) -> Optional[int]:
+    """Versión de la partida: avanza con cada cambio de estado (ver `views.reclamar_version`).
+
+    Identifica la posición tal y como la ven los agentes (colocación, ronda activa y últimos
+    movimientos) con una única lectura por clave primaria. None si la partida no existe.
+    """
+    return Partida.objects.filter(pk=partida_id).values_list('version', flat=True).first()
+
+
+def suggestion_cache_key(
+    partida_id: str,
+    jugador_id: str,
+    *,
+    nivel: int,
+    allow_simple: bool,
+    iterations: Optional[int] = None,
+    rollout_depth: Optional[int] = None,
+    version: Optional[int] = None,
+) -> str:
+    """Clave (partida, versión, jugador, nivel, allow_simple, presupuesto de búsqueda).
+
+    `version` permite reutilizar la versión que el llamador ya tiene leída; si no se indica
+    se consulta.
+    """
+    if int(nivel) < 2:
+        iterations = None
+        rollout_depth = None
+    if version is None:
+        version = position_version(partida_id)
+    parts = (
+        str(partida_id),
+        str(version),
+        str(jugador_id),
+        str(int(nivel)),
+        '1' if allow_simple else '0',
+        str(iterations),
+        str(rollout_depth),
+    )
+    digest = hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()
+    return f"sugerencia:{digest}"
+
+
+def compute_suggestion(
+    partida_id: str,
+    jugador_id: str,
+    *,
+    nivel: int,
+    allow_simple: bool = True,
+    iterations: int = DEFAULT_MCTS_ITERATIONS,
+    rollout_depth: int = DEFAULT_MCTS_ROLLOUT_DEPTH,
+) -> Dict[str, object]:
+    """Calcula la jugada sin caché. Nivel 1: heurística Max. Nivel 2: MCTS (DIFICIL)."""
+    if int(nivel) >= 2:
+        return MCTSAgent().suggest_move(
+            partida_id=partida_id,
+            jugador_id=jugador_id,
+            allow_simple=allow_simple,
+            iterations=iterations,
+            rollout_depth=rollout_depth,
+        )
+    return MaxHeuristicAgent().suggest_move(
+        partida_id=partida_id,
+        jugador_id=jugador_id,
+        allow_simple=allow_simple,
+    )
+
+
+def suggest_move_cached(
+    partida_id: str,
+    jugador_id: str,
+    *,
+    nivel: int,
+    allow_simple: bool = True,
+    iterations: int = DEFAULT_MCTS_ITERATIONS,
+    rollout_depth: int = DEFAULT_MCTS_ROLLOUT_DEPTH,
+    version: Optional[int] = None,
+) -> Dict[str, object]:
+    """Devuelve la sugerencia cacheada para la posición actual o la calcula y la guarda.
+
+    Las peticiones repetidas sobre el mismo tablero (frontend o "mejor jugada" del chatbot)
+    no vuelven a ejecutar la búsqueda, y si hay un precálculo en curso (`schedule_suggestion`)
+    se espera a su resultado. Los errores (`ValueError`) no se cachean. La posición se
+    identifica por la versión de la partida (`version`, si el llamador ya la tiene).
+    """
+    key = suggestion_cache_key(
+        partida_id,
+        jugador_id,
+        nivel=nivel,
+        allow_simple=allow_simple,
+        iterations=iterations,
+        rollout_depth=rollout_depth,
+        version=version,
+    )
+    # Primero el cálculo en curso: el precálculo escribe en caché antes de darse por terminado
+    with _inflight_lock:
+        future = _inflight.get(key)
+    if future is not None:
+        try:
+            return future.result(timeout=float(getattr(settings, 'AI_PRECOMPUTE_WAIT_SECONDS', 30)))
+        except FutureTimeoutError:
+            pass
+        except Exception:
+            # Si el precálculo falló se recalcula aquí para devolver el error real al cliente
+            pass
+
+    cache = _suggestion_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    sugerencia = compute_suggestion(
+        partida_id,
+        jugador_id,
+        nivel=nivel,
+        allow_simple=allow_simple,
+        iterations=iterations,
+        rollout_depth=rollout_depth,
+    )
+    cache.set(key, sugerencia)
+    return sugerencia
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, int(getattr(settings, 'AI_PRECOMPUTE_WORKERS', 2))),
+                thread_name_prefix='ai-precompute',
+            )
+        return _executor
+
+
+def _get_ponder_executor() -> ThreadPoolExecutor:
+    global _ponder_executor
+    with _executor_lock:
+        if _ponder_executor is None:
+            _ponder_executor = ThreadPoolExecutor(
+                max_workers=max(1, int(getattr(settings, 'MCTS_PONDER_WORKERS', 1))),
+                thread_name_prefix='ai-ponder',
+            )
+        return _ponder_executor
+
+
+def _run_precompute(key: str, partida_id: str, jugador_id: str, kwargs: Dict[str, object]) -> Dict[str, object]:
+    try:
+        sugerencia = compute_suggestion(partida_id, jugador_id, **kwargs)
+        _suggestion_cache().set(key, sugerencia)
+        return sugerencia
+    except Exception:
+        logger.info("Precálculo de la jugada de %s en %s fallido", jugador_id, partida_id, exc_info=True)
+        raise
+    finally:
+        # Cada hilo del pool abre su propia conexión: no dejarla colgando
+        connections.close_all()
+
+
+def schedule_suggestion(
+    partida_id: str,
+    jugador_id: str,
+    *,
+    nivel: int,
+    allow_simple: bool = True,
+    iterations: int = DEFAULT_MCTS_ITERATIONS,
+    rollout_depth: int = DEFAULT_MCTS_ROLLOUT_DEPTH,
+) -> Optional[Future]:
+    """Lanza en segundo plano el cálculo de la jugada y la deja en la caché de sugerencias.
+
+    Pensado para llamarse tras el commit que abre la ronda de un agente Inteligente: la
+    siguiente llamada a `suggest_move_cached` recoge el resultado o espera al cálculo en curso.
+    Devuelve None si la sugerencia ya estaba cacheada.
+    """
+    key = suggestion_cache_key(
+        partida_id,
+        jugador_id,
+        nivel=nivel,
+        allow_simple=allow_simple,
+        iterations=iterations,
+        rollout_depth=rollout_depth,
+    )
+    if _suggestion_cache().get(key) is not None:
+        return None
+
+    kwargs: Dict[str, object] = {
+        'nivel': nivel,
+        'allow_simple': allow_simple,
+        'iterations': iterations,
+        'rollout_depth': rollout_depth,
+    }
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future
+        future = _get_executor().submit(_run_precompute, key, str(partida_id), str(jugador_id), kwargs)
+        _inflight[key] = future
+
+    def _forget(_done: Future) -> None:
+        with _inflight_lock:
+            if _inflight.get(key) is _done:
+                del _inflight[key]
+
+    future.add_done_callback(_forget)
+    return future
+
+
+def _run_ponder(partida_id: str, agent_id: str) -> int:
+    try:
+        return ponder(
+            partida_id,
+            agent_id,
+            seconds=float(getattr(settings, 'MCTS_PONDER_SECONDS', 20)),
+            max_nodes=int(getattr(settings, 'MCTS_PONDER_MAX_NODES', 20000)),
+            max_replies=int(getattr(settings, 'MCTS_PONDER_MAX_REPLIES', 6)),
+        )
+    except Exception:
+        logger.info("Búsqueda anticipada de %s en %s fallida", agent_id, partida_id, exc_info=True)
+        raise
+    finally:
+        connections.close_all()
+
+
+def schedule_pondering(partida_id: str, agent_id: str) -> Optional[Future]:
+    """Lanza en segundo plano la búsqueda anticipada del agente MCTS durante la ronda del humano.
+
+    Solo actúa con `MCTS_PONDERING_ENABLED`. El árbol resultante lo recoge `MCTSAgent.suggest_move`
+    cuando llega el turno del agente; `stop_pondering` la corta al registrarse la jugada humana.
+    """
+    if not getattr(settings, 'MCTS_PONDERING_ENABLED', False):
+        return None
+    return _get_ponder_executor().submit(_run_ponder, str(partida_id), str(agent_id))
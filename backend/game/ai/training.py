@@ -0,0 +1,220 @@
+"""Datos de entrenamiento para ajustar los pesos `W_*` de la heurística Max.
+
+Cada fila es una jugada de una partida (autojuego en memoria o partida guardada):
+
+- `X`: unidades sin pesar de cada término (`MaxHeuristicAgent.move_units`, columnas en
+  `nombres_pesos`); la puntuación que Max da a la jugada es `X @ pesos`.
+- `contexto`: recuentos del detalle de la jugada (`CONTEXT_FEATURES`; NaN si no aplica).
+- `resultado`: 1 si ganó el jugador que movió, -1 si ganó otro y 0 si la partida no terminó.
+- `jugador` (orden de participación), `turno` (1..n dentro de la partida) y `partida`
+  (índice de la partida en la ejecución).
+
+Las filas se escriben en shards `.npz` de `filas_por_shard` filas a medida que se generan,
+así que la memoria no depende del número de partidas; el ajuste de pesos trabaja solo con
+los shards, sin el ORM.
+"""
+import os
+import random
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ..models import JugadorPartida, Movimiento
+from .max_agent import WEIGHT_NAMES, MaxHeuristicAgent, weight_vector
+from .mcts_agent import GameState, TurnMove, _PieceTuple, legal_turn_moves, load_game_state, new_game_state
+
+CONTEXT_FEATURES: Tuple[str, ...] = (
+    "dist_before",
+    "dist_after",
+    "piezas_fuera_antes",
+    "piezas_fuera_despues",
+    "piezas_casa_antes",
+    "piezas_casa_despues",
+    "piezas_prioridad_casa_antes",
+    "piezas_prioridad_casa_despues",
+    "prioridades_vacias_antes",
+    "prioridades_vacias_despues",
+    "piezas_barrera_meta_antes",
+    "piezas_barrera_meta",
+    "saltos_en_cadena",
+    "progreso_externo_disponible",
+    "factor_supresion_meta",
+    "delta",
+)
+
+# Una partida: lista de (orden del jugador que mueve, detalle de la jugada) y orden del ganador
+# (orden del jugador, detalle de la jugada, unidades de cada peso) por turno y ganador
+Fila = Tuple[int, Dict[str, float], np.ndarray]
+PartidaJugada = Tuple[List[Fila], Optional[int]]
+
+
+def _turno(movimiento: Dict[str, object]) -> Tuple[str, ...]:
+    pasos = movimiento.get("secuencia") or [{"origen": movimiento["origen"], "destino": movimiento["destino"]}]
+    return tuple([pasos[0]["origen"]] + [p["destino"] for p in pasos])
+
+
+def _ganador(state: GameState) -> Optional[int]:
+    ganadores = state.any_winners()
+    return state.player_order.index(ganadores[0]) + 1 if ganadores else None
+
+
+def self_play_games(
+    numero_jugadores: int = 2,
+    partidas: int = 1,
+    max_turnos: int = 400,
+    epsilon: float = 0.1,
+    seed: Optional[int] = None,
+) -> Iterator[PartidaJugada]:
+    """Partidas en memoria de la heurística Max contra sí misma.
+
+    Con probabilidad `epsilon` el jugador hace una jugada legal al azar en lugar de la de
+    Max, para que las partidas no se repitan; esas jugadas también se registran.
+    """
+    rng = random.Random(seed)
+    agent = MaxHeuristicAgent()
+    for _ in range(partidas):
+        state = new_game_state(numero_jugadores)
+        filas: List[Fila] = []
+        last_moves: Dict[str, Tuple[str, str, str]] = {}
+        for _ in range(max_turnos):
+            jugador_id = state.current_player_id
+            last = last_moves.get(jugador_id)
+            if rng.random() < epsilon:
+                jugada = rng.choice(legal_turn_moves(state, jugador_id, allow_simple=True))
+                detalle = agent.move_features(state.pieces, jugador_id, jugada.pieza_id, jugada.sequence, last_move=last)
+            else:
+                elegida = agent.choose_move(state.pieces, jugador_id, last_move=last)
+                jugada = TurnMove(pieza_id=str(elegida["pieza_id"]), sequence=_turno(elegida))
+                detalle = {**elegida["detalle"], "puntuacion": elegida["puntuacion"]}
+
+            unidades = agent.move_units(state.pieces, jugador_id, [(jugada.pieza_id, jugada.sequence)], last_move=last)[0]
+            filas.append((state.current_player_index + 1, detalle, unidades))
+            last_moves[jugador_id] = (jugada.pieza_id, jugada.origen, jugada.destino)
+            state = state.apply(jugada)
+            if state.is_win(jugador_id):
+                break
+        yield filas, _ganador(state)
+
+
+def db_games(partida_ids: Iterable[str]) -> Iterator[PartidaJugada]:
+    """Repite en memoria partidas guardadas y puntúa cada turno jugado con los términos de Max."""
+    agent = MaxHeuristicAgent()
+    for partida_id in partida_ids:
+        primero = (
+            JugadorPartida.objects.filter(partida_id=partida_id)
+            .order_by("orden_participacion")
+            .values_list("jugador_id", flat=True)
+            .first()
+        )
+        if primero is None:
+            continue
+
+        # Un turno por ronda: casillas recorridas por la pieza en orden de `ply`
+        turnos: List[Tuple[str, str, str, List[str]]] = []
+        for ronda_id, jugador_id, pieza_id, origen, destino in (
+            Movimiento.objects.filter(partida_id=partida_id)
+            .order_by("ply")
+            .values_list("ronda_id", "jugador_id", "pieza_id", "origen", "destino")
+        ):
+            if turnos and turnos[-1][0] == ronda_id and turnos[-1][3][-1] == origen:
+                turnos[-1][3].append(destino)
+            else:
+                turnos.append((ronda_id, str(jugador_id), str(pieza_id), [origen, destino]))
+
+        final = load_game_state(partida_id, str(primero))
+        # Posición inicial: deshacer los turnos sobre las posiciones finales de las piezas
+        posiciones = {p.pieza_id: p.posicion for p in final.pieces}
+        for _ronda_id, _jugador_id, pieza_id, casillas in reversed(turnos):
+            posiciones[pieza_id] = casillas[0]
+        state = GameState(
+            player_order=final.player_order,
+            current_player_index=final.current_player_index,
+            player_targets=final.player_targets,
+            pieces=tuple(
+                _PieceTuple(p.pieza_id, p.jugador_id, p.tipo, posiciones[p.pieza_id], p.punta) for p in final.pieces
+            ),
+        )
+
+        filas: List[Fila] = []
+        last_moves: Dict[str, Tuple[str, str, str]] = {}
+        for _ronda_id, jugador_id, pieza_id, casillas in turnos:
+            last = last_moves.get(jugador_id)
+            detalle = agent.move_features(state.pieces, jugador_id, pieza_id, casillas, last_move=last)
+            unidades = agent.move_units(state.pieces, jugador_id, [(pieza_id, casillas)], last_move=last)[0]
+            filas.append((state.player_order.index(jugador_id) + 1, detalle, unidades))
+            last_moves[jugador_id] = (pieza_id, casillas[0], casillas[-1])
+            state = state.apply(TurnMove(pieza_id=pieza_id, sequence=tuple(casillas)))
+        yield filas, _ganador(state)
+
+
+class ShardWriter:
+    """Acumula filas y las escribe en `<directorio>/<prefijo>-NNNNN.npz` cada `filas_por_shard`."""
+
+    def __init__(self, directorio: str, filas_por_shard: int = 100_000, prefijo: str = "posiciones"):
+        if filas_por_shard < 1:
+            raise ValueError("filas_por_shard debe ser >= 1")
+        os.makedirs(directorio, exist_ok=True)
+        self.directorio = directorio
+        self.filas_por_shard = int(filas_por_shard)
+        self.prefijo = prefijo
+        self.rutas: List[str] = []
+        self.filas = 0
+        self.partidas = 0
+        self._pesos = np.asarray(weight_vector(), dtype=np.float64)
+        self._vaciar()
+
+    def _vaciar(self) -> None:
+        self._x: List[np.ndarray] = []
+        self._contexto: List[List[float]] = []
+        self._resultado: List[int] = []
+        self._jugador: List[int] = []
+        self._turno: List[int] = []
+        self._partida: List[int] = []
+
+    def add_game(self, filas: List[Fila], ganador: Optional[int]) -> None:
+        partida = self.partidas
+        self.partidas += 1
+        for turno, (orden, detalle, unidades) in enumerate(filas, start=1):
+            self._x.append(unidades)
+            self._contexto.append([
+                float(detalle[c]) if detalle.get(c) is not None else float("nan") for c in CONTEXT_FEATURES
+            ])
+            self._resultado.append(0 if ganador is None else (1 if orden == ganador else -1))
+            self._jugador.append(orden)
+            self._turno.append(turno)
+            self._partida.append(partida)
+            self.filas += 1
+            if len(self._x) >= self.filas_por_shard:
+                self.flush()
+
+    def flush(self) -> None:
+        if not self._x:
+            return
+        ruta = os.path.join(self.directorio, f"{self.prefijo}-{len(self.rutas):05d}.npz")
+        np.savez_compressed(
+            ruta,
+            X=np.asarray(self._x, dtype=np.float32),
+            contexto=np.asarray(self._contexto, dtype=np.float32),
+            resultado=np.asarray(self._resultado, dtype=np.int8),
+            jugador=np.asarray(self._jugador, dtype=np.int8),
+            turno=np.asarray(self._turno, dtype=np.int32),
+            partida=np.asarray(self._partida, dtype=np.int32),
+            pesos=self._pesos,
+            nombres_pesos=np.asarray(WEIGHT_NAMES),
+            nombres_contexto=np.asarray(CONTEXT_FEATURES),
+        )
+        self.rutas.append(ruta)
+        self._vaciar()
+
+    def close(self) -> List[str]:
+        self.flush()
+        return self.rutas
+
+
+def write_shards(partidas: Iterable[PartidaJugada], directorio: str, filas_por_shard: int = 100_000, prefijo: str = "posiciones") -> ShardWriter:
+    """Escribe en shards las partidas según se generan. Devuelve el escritor (rutas y recuentos)."""
+    writer = ShardWriter(directorio, filas_por_shard=filas_por_shard, prefijo=prefijo)
+    for filas, ganador in partidas:
+        writer.add_game(filas, ganador)
+    writer.close()
+    return writer
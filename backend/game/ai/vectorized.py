@@ -0,0 +1,295 @@
+"""Evaluación vectorizada (NumPy) de las jugadas candidatas de la heurística Max.
+
+Para todas las candidatas de un turno se construye una matriz candidatas × términos con las
+unidades sin pesar de cada término (columnas en el orden de `WEIGHT_NAMES`), a
+partir de tablas por casilla: distancia a la meta, pertenencia a casa y meta, casillas
+prioritarias, profundidad y vecinos para detectar piezas bloqueadas. Las ramas de
+`_score_after_move` se expresan como máscaras booleanas y la puntuación de todas las
+candidatas es un único producto `unidades @ weight_vector()`.
+
+`StateBatchEvaluator` hace lo mismo con la evaluación de hojas del MCTS
+(`GameState.evaluate`): apila las posiciones de muchos estados en una matriz
+hojas × piezas de índices de casilla y obtiene distancias y victorias por jugador con
+lecturas de tablas.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..board import CELL_INDEX, CELL_KEYS
+from . import max_agent
+
+N_CELLS = len(CELL_KEYS)
+# Índice de relleno para casillas fuera del tablero: en la ocupación vale siempre True
+FUERA = N_CELLS
+
+_COLUMNAS = {nombre: i for i, nombre in enumerate(max_agent.WEIGHT_NAMES)}
+
+
+def _solo_lectura(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+@lru_cache(maxsize=None)
+def neighbour_tables() -> Tuple[np.ndarray, np.ndarray]:
+    """(vecinos, aterrizajes): índice de la casilla adyacente y de la de salto en cada dirección.
+
+    Forma (121, 6); `FUERA` si la casilla no existe. Si no hay vecino tampoco hay salto.
+    """
+    vecinos = np.full((N_CELLS, len(max_agent.AXIAL_DIRECTIONS)), FUERA, dtype=np.int16)
+    aterrizajes = np.full_like(vecinos, FUERA)
+    for idx, key in enumerate(CELL_KEYS):
+        q, r = max_agent._axial_from_key(key)
+        for j, d in enumerate(max_agent.AXIAL_DIRECTIONS):
+            vecino = max_agent._key_from_axial(q + d["dq"], r + d["dr"])
+            if vecino is None:
+                continue
+            vecinos[idx, j] = CELL_INDEX[vecino]
+            aterrizaje = max_agent._key_from_axial(q + 2 * d["dq"], r + 2 * d["dr"])
+            if aterrizaje is not None:
+                aterrizajes[idx, j] = CELL_INDEX[aterrizaje]
+    return _solo_lectura(vecinos), _solo_lectura(aterrizajes)
+
+
+@dataclass(frozen=True)
+class GoalTables:
+    """Tablas por casilla (longitud 121) para una punta objetivo y una punta de salida."""
+
+    distancia: np.ndarray
+    meta: np.ndarray
+    prioridad: np.ndarray
+    escala_prioridad: np.ndarray
+    profundidad: np.ndarray
+    casa: np.ndarray
+    casa_prioridad: np.ndarray
+    n_prioridades: int
+
+
+def _mascara(posiciones) -> np.ndarray:
+    mascara = np.zeros(N_CELLS, dtype=bool)
+    mascara[[CELL_INDEX[p] for p in posiciones if p in CELL_INDEX]] = True
+    return _solo_lectura(mascara)
+
+
+@lru_cache(maxsize=None)
+def goal_tables(target_punta: int, home_punta: Optional[int]) -> GoalTables:
+    prioridades = max_agent.GOAL_PRIORITY_POSITIONS.get(target_punta, [])
+    escala = np.zeros(N_CELLS, dtype=np.float64)
+    for i, pos in enumerate(prioridades):
+        if pos in CELL_INDEX:
+            escala[CELL_INDEX[pos]] = float(max(len(prioridades) - i, 1))
+    profundidad = np.zeros(N_CELLS, dtype=np.float64)
+    for pos, valor in max_agent._goal_depth_map(target_punta).items():
+        profundidad[CELL_INDEX[pos]] = valor
+    casa = max_agent.GOAL_POSITIONS.get(home_punta, []) if home_punta is not None else []
+    casa_prioridad = max_agent.GOAL_PRIORITY_POSITIONS.get(home_punta, []) if home_punta is not None else []
+    return GoalTables(
+        distancia=_solo_lectura(np.array(
+            [float(max_agent._distance_to_goal(key, target_punta)) for key in CELL_KEYS], dtype=np.float64
+        )),
+        meta=_mascara(max_agent.GOAL_POSITIONS.get(target_punta, [])),
+        prioridad=_mascara(prioridades),
+        escala_prioridad=_solo_lectura(escala),
+        profundidad=_solo_lectura(profundidad),
+        casa=_mascara(casa),
+        casa_prioridad=_mascara(casa_prioridad),
+        n_prioridades=len(set(prioridades)),
+    )
+
+
+def candidate_units(
+    piezas: Sequence,
+    jugador_id: str,
+    candidatas: Sequence[Tuple[str, str, str, Optional[Sequence[str]]]],
+    target_punta: int,
+    home_punta: Optional[int],
+    has_any_jump: bool,
+    outside_progress_available: bool,
+    last_move: Optional[Tuple[str, str, str]] = None,
+) -> np.ndarray:
+    """Matriz (candidatas × `WEIGHT_NAMES`) de unidades de cada peso.
+
+    `candidatas` son tuplas (pieza_id, origen, destino, secuencia de salto o None), como las
+    que puntúa `MaxHeuristicAgent._score_candidate`.
+    """
+    t = goal_tables(target_punta, home_punta)
+    vecinos, aterrizajes = neighbour_tables()
+
+    propias = [p for p in piezas if str(p.jugador_id) == str(jugador_id) and p.posicion]
+    columna = {str(p.id_pieza): i for i, p in enumerate(propias)}
+    propias_idx = np.array([CELL_INDEX[p.posicion] for p in propias], dtype=np.int64)
+    ocupadas = np.zeros(N_CELLS + 1, dtype=bool)
+    ocupadas[[CELL_INDEX[p.posicion] for p in piezas if p.posicion]] = True
+    ocupadas[FUERA] = True
+
+    n = len(candidatas)
+    filas = np.arange(n)
+    o = np.array([CELL_INDEX[c[1]] for c in candidatas], dtype=np.int64)
+    d = np.array([CELL_INDEX[c[2]] for c in candidatas], dtype=np.int64)
+    movida = np.array([columna[str(c[0])] for c in candidatas], dtype=np.int64)
+    cadena = np.array([len(c[3]) - 1 if c[3] else 0 for c in candidatas], dtype=np.float64)
+    es_salto = np.array([c[3] is not None for c in candidatas], dtype=bool)
+
+    # Estado tras cada candidata: posiciones propias y ocupación
+    despues = np.repeat(propias_idx[None, :], n, axis=0)
+    despues[filas, movida] = d
+    ocupadas_despues = np.repeat(ocupadas[None, :], n, axis=0)
+    ocupadas_despues[filas, o] = False
+    ocupadas_despues[filas, d] = True
+
+    # Bloqueada: sin vecino libre ni salto (vecino ocupado y aterrizaje libre) en ninguna dirección
+    sel = filas[:, None, None]
+    bloqueadas = (
+        ocupadas_despues[sel, vecinos[despues]].all(axis=2)
+        & ocupadas_despues[sel, aterrizajes[despues]].all(axis=2)
+    ).sum(axis=1)
+
+    dist_despues = t.distancia[despues]
+    faltan = t.n_prioridades - t.prioridad[despues].sum(axis=1)
+    barrera = np.where(faltan > 0, (t.meta & ~t.prioridad)[despues].sum(axis=1), 0)
+
+    progreso = t.distancia[o] - t.distancia[d]
+    meta_o, meta_d = t.meta[o], t.meta[d]
+    fuera_antes = int((~t.meta[propias_idx]).sum())
+    fuera_despues = fuera_antes - (~meta_o).astype(int) + (~meta_d).astype(int)
+    entra = meta_d & ~meta_o
+    gana = fuera_despues == 0
+    entrada = ~gana & entra & (fuera_despues < fuera_antes)
+
+    rama_meta = meta_o & (fuera_despues > 0)
+    rellena = rama_meta & meta_d & ~t.prioridad[o] & t.prioridad[d]
+    reacomodo = rama_meta & meta_d & ~rellena & (not outside_progress_available)
+    penaliza_meta = rama_meta & ~rellena & ~reacomodo
+    ganancia = t.profundidad[d] - np.where(meta_o, t.profundidad[o], 0.0)
+    profundidad = np.where(meta_d & (ganancia > 0), ganancia, 0.0)
+    prioridad_meta = np.where(meta_d, t.escala_prioridad[d], 0.0)
+    cadena_meta = (cadena > 0) & entra & (fuera_despues < fuera_antes)
+
+    casa_o, casa_d = t.casa[o], t.casa[d]
+    casa_antes = int(t.casa[propias_idx].sum())
+    casa_despues = casa_antes - casa_o.astype(int) + casa_d.astype(int)
+    sigue_en_casa = casa_o & casa_d
+    progreso_casa = sigue_en_casa & (progreso > 0)
+    cp_o, cp_d = t.casa_prioridad[o], t.casa_prioridad[d]
+    cp_antes = int(t.casa_prioridad[propias_idx].sum())
+    cp_despues = cp_antes - cp_o.astype(int) + cp_d.astype(int)
+    cp_extra = (cp_antes > 0) & (cp_despues == cp_antes)
+
+    escala = np.where((casa_despues == 0) | (casa_antes > casa_despues), 1.0, max_agent.HOME_GOAL_SUPPRESSION_FACTOR)
+
+    last_piece, last_from, last_to = last_move if last_move else (None, None, None)
+    reverse = np.zeros(n, dtype=bool)
+    if last_from and last_to:
+        reverse = (d == CELL_INDEX[last_from]) & (o == CELL_INDEX[last_to])
+    misma = np.array([bool(last_piece) and str(last_piece) == str(c[0]) for c in candidatas], dtype=bool)
+
+    u = np.zeros((n, len(_COLUMNAS)), dtype=np.float64)
+
+    def col(nombre, valores, signo=1.0):
+        u[:, _COLUMNAS[nombre]] = signo * np.asarray(valores, dtype=np.float64)
+
+    col("W_TOTAL_DIST", dist_despues.sum(axis=1), -1.0)
+    col("W_FRONT_DIST", dist_despues.min(axis=1), -1.0)
+    col("W_BLOCKED", bloqueadas, -1.0)
+    col("W_HOME_PENALTY", t.casa[despues].sum(axis=1), -1.0)
+    col("W_PROGRESS_ADV", np.maximum(progreso, 0.0))
+    col("W_PROGRESS_BACK", np.minimum(progreso, 0.0))
+    col("W_GOAL_PRIORITY_GAP_PENALTY", faltan, -1.0)
+    col("W_GOAL_PRIORITY_BLOCK_PENALTY", barrera, -1.0)
+    col("W_FAR_DESTINATION", t.distancia[d], -1.0)
+    col("W_GOAL_MOVE_PENALTY", penaliza_meta, -1.0)
+    col("W_GOAL_RELOC_PENALTY", penaliza_meta & (fuera_antes > 1), -1.0)
+    col("W_GOAL_STAY_PENALTY", penaliza_meta & meta_d, -1.0)
+    col("W_GOAL_ENTRY_BONUS", entrada * escala)
+    col("W_GOAL_REARRANGE_BONUS", reacomodo * escala)
+    col("W_GOAL_PRIORITY_BASE", prioridad_meta * escala)
+    col("W_GOAL_PRIORITY_FILL_BONUS", rellena * escala)
+    col("W_WIN_MOVE_BONUS", gana)
+    col("W_LONE_PIECE_BONUS", ((fuera_antes == 1) & ~meta_o) * escala)
+    col("W_GOAL_DEPTH_BONUS", profundidad * escala)
+    col("W_GOAL_CHAIN_BONUS", cadena_meta * escala)
+    col("W_OUTSIDE_MOVE_BONUS", ~meta_o * escala)
+    col("W_HOME_EXIT_BONUS", np.maximum(casa_antes - casa_despues, 0))
+    col("W_HOME_STAY_PENALTY", sigue_en_casa, -1.0)
+    col("W_HOME_RETURN_PENALTY", ~casa_o & casa_d, -1.0)
+    col("W_HOME_IGNORE_PENALTY", sigue_en_casa & ~progreso_casa & (casa_antes > 0), -1.0)
+    col("W_HOME_PROGRESS_BONUS", np.where(progreso_casa, progreso, 0.0))
+    col("W_HOME_OUTSIDE_IGNORE_PENALTY", (casa_antes > 0) & ~casa_o & ~casa_d, -1.0)
+    col("W_HOME_PRIORITY_LEAVE_BONUS", cp_o & ~cp_d)
+    col("W_HOME_PRIORITY_STAY_PENALTY", (cp_o & cp_d) + 0.5 * cp_extra, -1.0)
+    col("W_HOME_PRIORITY_RETURN_PENALTY", ~cp_o & cp_d, -1.0)
+    col("W_JUMP_BONUS", es_salto)
+    col("W_CHAIN_LEN_BONUS", cadena)
+    col("W_NOJUMP_PENALTY", has_any_jump & ~es_salto & ~(entra | reacomodo | rellena), -1.0)
+    col("W_REVERSE_PENALTY", reverse, -1.0)
+    col("W_SAME_PIECE_PENALTY", misma, -1.0)
+    return u
+
+
+def candidate_scores(*args, **kwargs) -> np.ndarray:
+    """Puntuación de cada candidata (mismos argumentos que `candidate_units`)."""
+    return candidate_units(*args, **kwargs) @ np.asarray(max_agent.weight_vector(), dtype=np.float64)
+
+
+class StateBatchEvaluator:
+    """`GameState.evaluate(root_player_id)` para muchos estados de una misma búsqueda a la vez.
+
+    Los estados deben tener las piezas en el mismo orden que `root_state` (lo conserva
+    `GameState.apply`); si no, se evalúan uno a uno. Devuelve los mismos valores que
+    `evaluate`.
+    """
+
+    def __init__(self, root_state, root_player_id: str):
+        jugadores = [jid for jid in root_state.player_order if root_state._target_for(jid) is not None]
+        columna = {jid: i for i, jid in enumerate(jugadores)}
+        self.root_player_id = str(root_player_id)
+        self._root = columna.get(self.root_player_id)
+        self._rivales = len(jugadores) - (0 if self._root is None else 1)
+        self._n_piezas = len(root_state.pieces)
+
+        # Tablas de todos los jugadores concatenadas: índice = columna del dueño * 121 + casilla
+        objetivos = [goal_tables(root_state._target_for(jid), None) for jid in jugadores]
+        self._distancia = np.concatenate([t.distancia for t in objetivos] + [np.zeros(1)])
+        self._meta = np.concatenate([t.meta for t in objetivos] + [np.zeros(1, dtype=bool)])
+        duenos = [columna.get(p.jugador_id) for p in root_state.pieces]
+        # Piezas sin jugador con objetivo: se leen en la posición de relleno (distancia 0)
+        self._desplazamiento = np.array(
+            [N_CELLS * c if c is not None else -1 for c in duenos], dtype=np.int64
+        )
+        self._ignorada = self._desplazamiento < 0
+        self._pertenencia = np.zeros((len(duenos), len(jugadores)), dtype=np.float64)
+        for k, c in enumerate(duenos):
+            if c is not None:
+                self._pertenencia[k, c] = 1.0
+        self._piezas_por_jugador = self._pertenencia.sum(axis=0)
+
+    def positions(self, states: Sequence) -> np.ndarray:
+        """Matriz (estados × piezas) con el índice de casilla de cada pieza."""
+        return np.array(
+            [[CELL_INDEX[p.posicion] for p in state.pieces] for state in states], dtype=np.int64
+        ).reshape(len(states), self._n_piezas)
+
+    def evaluate(self, states: Sequence) -> np.ndarray:
+        if not states:
+            return np.zeros(0, dtype=np.float64)
+        if any(len(state.pieces) != self._n_piezas for state in states):
+            return np.array([state.evaluate(self.root_player_id) for state in states], dtype=np.float64)
+
+        indices = self.positions(states) + self._desplazamiento
+        indices[:, self._ignorada] = len(self._distancia) - 1
+        totales = self._distancia[indices] @ self._pertenencia
+        en_meta = self._meta[indices].astype(np.float64) @ self._pertenencia
+        ganadores = (self._piezas_por_jugador > 0) & (en_meta == self._piezas_por_jugador)
+
+        propio = totales[:, self._root] if self._root is not None else np.zeros(len(states))
+        if self._rivales:
+            media = (totales.sum(axis=1) - propio) / float(self._rivales)
+            valores = np.clip((media - propio) / (media + propio + 1e-6), -1.0, 1.0)
+        else:
+            valores = np.zeros(len(states))
+
+        gana_raiz = ganadores[:, self._root] if self._root is not None else np.zeros(len(states), dtype=bool)
+        return np.where(ganadores.any(axis=1), np.where(gana_raiz, 1.0, -1.0), valores)
@@ -0,0 +1,212 @@
+"""Archivo en frío de partidas finalizadas.
+
+Una partida archivada se guarda en una sola fila `PartidaArchivada` con un JSON comprimido
+(zlib) y sus filas de `Partida`, `Pieza`, `Ronda`, `Movimiento`, participaciones y jugadores
+se borran de las tablas de juego. Los movimientos se guardan en forma compacta:
+`[ply, índice de ronda, índice de pieza, casilla origen, casilla destino]`, con las casillas
+como índices de `board.CELL_KEYS`.
+
+`rehydrate` devuelve el registro con la misma forma que `PartidaSerializer`, para que el
+detalle de la partida siga funcionando; los ids de movimiento se regeneran
+(`M_<ronda>_<ply>`), el resto de ids se conservan.
+"""
+import json
+import zlib
+from typing import Dict, Optional
+
+from django.db import transaction
+from rest_framework import serializers
+
+from .board import CELL_INDEX, CELL_KEYS
+from .models import AgenteInteligente, JugadorPartida, Movimiento, Partida, PartidaArchivada, Pieza, Ronda
+from .retention import delete_games
+
+FORMATO = 1
+
+_fecha = serializers.DateTimeField()
+
+
+class RegistroIncompleto(ValueError):
+    """La partida tiene movimientos que el registro compacto no puede representar.
+
+    Movimientos cuya pieza o ronda no pertenecen a la partida, o con casillas fuera del
+    tablero: archivarla perdería esas filas, así que la partida se deja sin archivar.
+    """
+
+
+def _iso(valor) -> Optional[str]:
+    return _fecha.to_representation(valor) if valor else None
+
+
+def find_winner(partida_id: str, orden) -> Optional[str]:
+    """Id del jugador que tiene todas sus piezas en la punta objetivo, si lo hay."""
+    from .ai.mcts_agent import load_game_state
+
+    if not orden:
+        return None
+    try:
+        ganadores = load_game_state(partida_id, orden[0]).any_winners()
+    except ValueError:
+        return None
+    return ganadores[0] if ganadores else None
+
+
+def build_record(partida: Partida) -> Dict[str, object]:
+    """Serializa la partida y sus filas dependientes en el registro compacto (un SELECT por tabla)."""
+    participaciones = list(
+        JugadorPartida.objects.filter(partida=partida).select_related('jugador').order_by('orden_participacion')
+    )
+    niveles = dict(
+        AgenteInteligente.objects.filter(jugador_id__in=[jp.jugador_id for jp in participaciones])
+        .values_list('jugador_id', 'nivel')
+    )
+    jugador_idx = {jp.jugador_id: i for i, jp in enumerate(participaciones)}
+
+    piezas = list(
+        Pieza.objects.filter(partida=partida).order_by('id_pieza').values_list('id_pieza', 'jugador_id', 'tipo', 'posicion')
+    )
+    pieza_idx = {id_pieza: i for i, (id_pieza, *_resto) in enumerate(piezas)}
+
+    rondas = list(
+        Ronda.objects.filter(partida=partida).order_by('numero', 'inicio').values_list('id_ronda', 'numero', 'jugador_id', 'inicio', 'fin')
+    )
+    ronda_idx = {id_ronda: i for i, (id_ronda, *_resto) in enumerate(rondas)}
+
+    movimientos, huerfanos = [], []
+    for id_movimiento, ply, ronda_id, pieza_id, origen, destino in (
+        Movimiento.objects.filter(partida=partida)
+        .order_by('ply')
+        .values_list('id_movimiento', 'ply', 'ronda_id', 'pieza_id', 'origen', 'destino')
+    ):
+        fila = [ply, ronda_idx.get(ronda_id), pieza_idx.get(pieza_id), CELL_INDEX.get(origen), CELL_INDEX.get(destino)]
+        if None in fila:
+            huerfanos.append(id_movimiento)
+        else:
+            movimientos.append(fila)
+    if huerfanos:
+        raise RegistroIncompleto(
+            f"Partida {partida.id_partida}: {len(huerfanos)} movimientos con pieza, ronda o casillas "
+            f"ajenas a la partida ({', '.join(huerfanos[:10])})"
+        )
+
+    orden = [jp.jugador_id for jp in participaciones]
+    return {
+        'formato': FORMATO,
+        'partida': {
+            'id_partida': partida.id_partida,
+            'fecha_inicio': _iso(partida.fecha_inicio),
+            'fecha_fin': _iso(partida.fecha_fin),
+            'estado': partida.estado,
+            'numero_jugadores': partida.numero_jugadores,
+            'tiempo_sobrante': partida.tiempo_sobrante,
+            'is_demo': partida.is_demo,
+            'version': partida.version,
+        },
+        'jugadores': [
+            [jp.jugador_id, jp.jugador.nombre, jp.jugador.humano, jp.jugador.numero, jp.orden_participacion,
+             niveles.get(jp.jugador_id), _iso(jp.fecha_union), jp.id]
+            for jp in participaciones
+        ],
+        'piezas': [[id_pieza, jugador_idx.get(jugador_id), tipo, posicion] for id_pieza, jugador_id, tipo, posicion in piezas],
+        'rondas': [
+            [id_ronda, numero, jugador_idx.get(jugador_id), _iso(inicio), _iso(fin)]
+            for id_ronda, numero, jugador_id, inicio, fin in rondas
+        ],
+        'movimientos': movimientos,
+        'tablero': partida.tablero,
+        'ganador': find_winner(partida.id_partida, orden),
+    }
+
+
+def compress_record(registro: Dict[str, object]) -> bytes:
+    return zlib.compress(json.dumps(registro, separators=(',', ':'), ensure_ascii=False).encode('utf-8'), 9)
+
+
+def load_record(archivada: PartidaArchivada) -> Dict[str, object]:
+    return json.loads(zlib.decompress(bytes(archivada.datos)).decode('utf-8'))
+
+
+def archive_game(partida_id: str) -> PartidaArchivada:
+    """Archiva una partida FINALIZADA y borra sus filas de las tablas de juego (todo o nada).
+
+    Lanza `RegistroIncompleto` (sin borrar nada) si la partida no se puede archivar entera.
+    """
+    with transaction.atomic():
+        partida = Partida.objects.select_for_update().get(pk=partida_id)
+        if partida.estado != 'FINALIZADA':
+            raise ValueError("Solo se pueden archivar partidas finalizadas")
+        registro = build_record(partida)
+        archivada = PartidaArchivada.objects.create(
+            id_partida=partida.id_partida,
+            fecha_inicio=partida.fecha_inicio,
+            fecha_fin=partida.fecha_fin,
+            numero_jugadores=partida.numero_jugadores,
+            is_demo=partida.is_demo,
+            ganador=registro['ganador'] or '',
+            datos=compress_record(registro),
+        )
+        delete_games([partida.id_partida])
+    return archivada
+
+
+def rehydrate(registro: Dict[str, object]) -> Dict[str, object]:
+    """Reconstruye la respuesta de `PartidaSerializer` a partir de un registro archivado."""
+    partida = registro['partida']
+    partida_id = partida['id_partida']
+    jugadores = registro['jugadores']
+    piezas = registro['piezas']
+
+    def jugador(idx):
+        return (jugadores[idx][0], jugadores[idx][1]) if idx is not None else (None, None)
+
+    rondas = [
+        {
+            'id_ronda': id_ronda,
+            'jugador': jugador(j_idx)[0],
+            'jugador_nombre': jugador(j_idx)[1],
+            'numero': numero,
+            'inicio': inicio,
+            'fin': fin,
+            'partida': partida_id,
+            'movimientos': [],
+        }
+        for id_ronda, numero, j_idx, inicio, fin in registro['rondas']
+    ]
+    movimientos = []
+    for ply, r_idx, p_idx, origen, destino in registro['movimientos']:
+        id_pieza, j_idx, tipo, _posicion = piezas[p_idx]
+        ronda = rondas[r_idx]
+        movimiento = {
+            'id_movimiento': f"M_{ronda['id_ronda']}_{ply}",
+            'jugador': jugador(j_idx)[0],
+            'jugador_nombre': jugador(j_idx)[1],
+            'pieza': id_pieza,
+            'pieza_tipo': tipo,
+            'ronda': ronda['id_ronda'],
+            'partida': partida_id,
+            'origen': CELL_KEYS[origen],
+            'destino': CELL_KEYS[destino],
+            'ply': ply,
+        }
+        ronda['movimientos'].append(movimiento)
+        movimientos.append(movimiento)
+
+    return {
+        **partida,
+        'rondas': rondas,
+        'movimientos': movimientos,
+        'participantes': [
+            {
+                'id': jp_id,
+                'jugador': id_jugador,
+                'jugador_nombre': nombre,
+                'partida': partida_id,
+                'fecha_union': fecha_union,
+                'orden_participacion': orden,
+            }
+            for id_jugador, nombre, _humano, _numero, orden, _nivel, fecha_union, jp_id in jugadores
+        ],
+        'tablero': registro['tablero'],
+        'ganador': registro['ganador'],
+        'archivada': True,
+    }
@@ -0,0 +1,198 @@
+"""Codificación compacta del tablero (columna `Partida.tablero`).
+
+Un carácter por casilla, en el orden de `CELL_KEYS` (fila a fila, columna a columna):
+'0' casilla vacía, '1'..'6' orden de participación del dueño de la pieza y '9' pieza de
+un jugador que no participa en la partida. `Pieza` sigue siendo la fuente relacional
+(admin, historial); esta columna es la copia que leen validaciones y agentes.
+"""
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+ROW_LENGTHS = (1, 2, 3, 4, 13, 12, 11, 10, 9, 10, 11, 12, 13, 4, 3, 2, 1)
+
+CELL_KEYS: Tuple[str, ...] = tuple(
+    f"{col}-{row}" for row, length in enumerate(ROW_LENGTHS) for col in range(length)
+)
+CELL_INDEX: Dict[str, int] = {key: idx for idx, key in enumerate(CELL_KEYS)}
+
+EMPTY_CELL = '0'
+UNKNOWN_OWNER = '9'
+EMPTY_BOARD = EMPTY_CELL * len(CELL_KEYS)
+
+
+# Puntas del tablero y casillas de salida de cada una:
+# - Punta 0 (Arriba): filas 0-3
+# - Punta 1 (Izquierda-Arriba): filas 4-7
+# - Punta 2 (Derecha-Arriba): filas 4-7
+# - Punta 3 (Abajo): filas 13-16
+# - Punta 4 (Izquierda-Abajo): filas 9-12
+# - Punta 5 (Derecha-Abajo): filas 9-12
+POSICIONES_POR_PUNTA = {
+    0: ['0-0', '0-1', '1-1', '0-2', '1-2', '2-2', '0-3', '1-3', '2-3', '3-3'],
+    1: ['0-4', '0-5', '1-4', '1-5', '1-6', '2-4', '2-5', '3-4', '0-6', '0-7'],
+    2: ['12-4', '9-6', '11-4', '11-5', '10-6', '10-4', '10-5', '9-5', '9-4', '9-7'],
+    3: ['3-13', '2-13', '2-14', '1-13', '1-14', '1-15', '0-13', '0-14', '0-15', '0-16'],
+    4: ['0-9', '0-10', '2-12', '1-10', '1-11', '3-12', '2-11', '1-12', '0-11', '0-12'],
+    5: ['9-9', '9-10', '11-11', '10-10', '10-11', '10-12', '12-12', '11-12', '9-11', '9-12'],
+}
+
+COLORES_POR_PUNTA = {
+    0: 'Blanco',
+    1: 'Azul',
+    2: 'Verde',
+    3: 'Negro',
+    4: 'Rojo',
+    5: 'Amarillo',
+}
+
+# Puntas que ocupan los jugadores, por orden de participación, según el número de jugadores
+PUNTAS_ACTIVAS = {
+    2: [0, 3],
+    3: [0, 4, 5],
+    4: [1, 2, 4, 5],
+    6: [0, 1, 2, 3, 4, 5],
+}
+
+
+def punta_asignada(numero_jugadores, orden_participacion):
+    return PUNTAS_ACTIVAS.get(numero_jugadores, [0, 3])[orden_participacion - 1]
+
+
+def start_board(numero_jugadores: int) -> str:
+    """Codificación de la colocación inicial de una partida de `numero_jugadores` jugadores."""
+    puntas = PUNTAS_ACTIVAS.get(numero_jugadores, [0, 3])
+    return encode_board(
+        (posicion, orden)
+        for orden, punta in enumerate(puntas, start=1)
+        for posicion in POSICIONES_POR_PUNTA[punta]
+    )
+
+
+def encode_board(ocupacion: Iterable[Tuple[str, Optional[int]]]) -> str:
+    """Codifica pares (posicion, orden_participacion) en la cadena de 121 caracteres."""
+    cells = list(EMPTY_BOARD)
+    for posicion, slot in ocupacion:
+        idx = CELL_INDEX.get(str(posicion))
+        if idx is None:
+            continue
+        cells[idx] = str(slot) if slot and 1 <= int(slot) <= 6 else UNKNOWN_OWNER
+    return ''.join(cells)
+
+
+def decode_board(tablero: str) -> Dict[str, int]:
+    """Devuelve {posicion: orden_participacion} de las casillas ocupadas (9 = dueño desconocido)."""
+    return {CELL_KEYS[idx]: int(c) for idx, c in enumerate(tablero) if c != EMPTY_CELL}
+
+
+def occupied_cells(tablero: str) -> Set[str]:
+    return {CELL_KEYS[idx] for idx, c in enumerate(tablero) if c != EMPTY_CELL}
+
+
+def move_on_board(tablero: str, origen: str, destino: str) -> str:
+    """Mueve el contenido de `origen` a `destino` (los saltos intermedios no cambian el tablero).
+
+    Una cadena de saltos que termina en su casilla de partida deja el tablero igual.
+    """
+    o = CELL_INDEX[str(origen)]
+    d = CELL_INDEX[str(destino)]
+    if o == d:
+        return tablero
+    cells = list(tablero)
+    cells[d], cells[o] = cells[o], EMPTY_CELL
+    return ''.join(cells)
+
+
+def build_board(partida_id: str) -> str:
+    """Reconstruye la codificación a partir de las filas `Pieza` de la partida."""
+    from .models import JugadorPartida, Pieza
+
+    slots = dict(
+        JugadorPartida.objects.filter(partida_id=partida_id).values_list('jugador_id', 'orden_participacion')
+    )
+    return encode_board(
+        (posicion, slots.get(jugador_id))
+        for jugador_id, posicion in Pieza.objects.filter(partida_id=partida_id).values_list('jugador_id', 'posicion')
+        if posicion
+    )
+
+
+def sync_board(partida_id: str) -> str:
+    """Recalcula y guarda `Partida.tablero` (tras ediciones directas de piezas)."""
+    from .models import Partida
+
+    tablero = build_board(partida_id)
+    Partida.objects.filter(pk=partida_id).update(tablero=tablero)
+    return tablero
+
+
+def update_piece_positions(piezas) -> None:
+    """Guarda `posicion` de varias piezas con `bulk_update` respetando la restricción única.
+
+    La restricción (partida, posicion) se comprueba fila a fila, así que una permutación
+    (A ocupa la casilla que deja B) fallaría en un solo UPDATE: primero se llevan las piezas
+    a marcadores temporales únicos y después a su casilla final. Debe llamarse dentro de
+    una transacción.
+    """
+    from .models import Pieza
+
+    piezas = list(piezas)
+    if not piezas:
+        return
+    finales = [p.posicion for p in piezas]
+    for i, pieza in enumerate(piezas):
+        pieza.posicion = f"~{i}"
+    Pieza.objects.bulk_update(piezas, ['posicion'])
+    for pieza, posicion in zip(piezas, finales):
+        pieza.posicion = posicion
+    Pieza.objects.bulk_update(piezas, ['posicion'])
+
+
+def _intervalo_instantaneas() -> int:
+    from django.conf import settings
+
+    return max(1, int(getattr(settings, 'TABLERO_INSTANTANEA_PLIES', 32)))
+
+
+def save_checkpoints(partida_id: str, tablero: str, movimientos: Iterable) -> int:
+    """Guarda las instantáneas que caen dentro de `movimientos`.
+
+    `movimientos` son los pasos recién guardados (con `ply`, `origen` y `destino`) y
+    `tablero` la codificación después del último. Se recorre hacia atrás deshaciendo pasos,
+    así que no hace falta leer nada más. Devuelve el número de instantáneas creadas.
+    """
+    from .models import InstantaneaTablero
+
+    cada = _intervalo_instantaneas()
+    instantaneas = []
+    for movimiento in sorted(movimientos, key=lambda m: m.ply, reverse=True):
+        if movimiento.ply % cada == 0:
+            instantaneas.append(InstantaneaTablero(partida_id=partida_id, ply=movimiento.ply, tablero=tablero))
+        tablero = move_on_board(tablero, movimiento.destino, movimiento.origen)
+    InstantaneaTablero.objects.bulk_create(instantaneas, ignore_conflicts=True)
+    return len(instantaneas)
+
+
+def position_at_ply(partida_id: str, ply: int, tablero_actual: str, ultimo_ply: int) -> Tuple[str, int]:
+    """Tablero de la partida tras el movimiento `ply` (0 = colocación inicial).
+
+    Parte de la posición conocida más cercana (instantánea anterior, instantánea posterior
+    o el tablero actual, que corresponde a `ultimo_ply`) y aplica o deshace como mucho
+    `TABLERO_INSTANTANEA_PLIES` movimientos. Devuelve (tablero, movimientos aplicados).
+    """
+    from .models import InstantaneaTablero, Movimiento
+
+    instantaneas = InstantaneaTablero.objects.filter(partida_id=partida_id).values_list('ply', 'tablero')
+    candidatas = [(ultimo_ply, tablero_actual)]
+    candidatas += list(instantaneas.filter(ply__lte=ply).order_by('-ply')[:1])
+    candidatas += list(instantaneas.filter(ply__gte=ply, ply__lt=ultimo_ply).order_by('ply')[:1])
+    base_ply, tablero = min(candidatas, key=lambda c: abs(c[0] - ply))
+
+    movimientos = Movimiento.objects.filter(partida_id=partida_id).values_list('origen', 'destino')
+    if base_ply <= ply:
+        pasos = movimientos.filter(ply__gt=base_ply, ply__lte=ply).order_by('ply')
+        for origen, destino in pasos:
+            tablero = move_on_board(tablero, origen, destino)
+    else:
+        pasos = movimientos.filter(ply__gt=ply, ply__lte=base_ply).order_by('-ply')
+        for origen, destino in pasos:
+            tablero = move_on_board(tablero, destino, origen)
+    return tablero, abs(base_ply - ply)
@@ -0,0 +1,166 @@
+"""Eventos de partida (movimientos registrados y cambios de ronda) para clientes en espera.
+
+Cada proceso guarda un buffer corto de eventos por partida y despierta a los clientes que
+esperan (long-poll) cuando se publica uno. Con varios procesos, lo publicado en otro worker
+no llega al buffer local: mientras espera, el cliente consulta también `Partida.version`
+cada `EVENTOS_INTERVALO_DB` segundos y, si la versión avanzó sin eventos locales que lo
+cubran, recibe un único evento `sincronizacion` construido desde la base de datos.
+
+Cada espera ocupa un hilo del servidor durante hasta `EVENTOS_LONG_POLL_TIMEOUT` segundos,
+así que conviene un worker con hilos (p. ej. gunicorn `--worker-class gthread --threads N`).
+Como mucho `EVENTOS_MAX_ESPERAS` peticiones esperan a la vez en cada proceso; por encima del
+límite se responde al momento, como con `timeout=0`, y el cliente vuelve a consultar.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Movimiento, Partida, Ronda
+
+_MAX_EVENTOS = 64
+_MAX_PARTIDAS = 256
+
+_lock = threading.Lock()
+_buffers: "OrderedDict[str, deque]" = OrderedDict()
+_conditions: Dict[str, threading.Condition] = {}
+_esperando: Dict[str, int] = {}
+
+
+def _condition(partida_id: str) -> threading.Condition:
+    cond = _conditions.get(partida_id)
+    if cond is None:
+        cond = _conditions[partida_id] = threading.Condition(_lock)
+    return cond
+
+
+def publish(partida_id: str, version: int, tipo: str, datos: Dict[str, object]) -> None:
+    """Añade un evento al buffer de la partida y despierta a quien espera en este proceso."""
+    evento = {'tipo': tipo, 'version': int(version), **datos}
+    with _lock:
+        buf = _buffers.pop(partida_id, None) or deque(maxlen=_MAX_EVENTOS)
+        buf.append(evento)
+        _buffers[partida_id] = buf
+        while len(_buffers) > _MAX_PARTIDAS:
+            viejo, _ = _buffers.popitem(last=False)
+            _conditions.pop(viejo, None)
+        _condition(partida_id).notify_all()
+
+
+def publish_on_commit(partida_id: str, version: int, tipo: str, datos: Dict[str, object]) -> None:
+    """Publica el evento solo si la transacción en curso se confirma."""
+    transaction.on_commit(lambda: publish(partida_id, version, tipo, datos))
+
+
+def reset() -> None:
+    with _lock:
+        _buffers.clear()
+        _conditions.clear()
+        _esperando.clear()
+
+
+def _entrar(partida_id: str) -> bool:
+    """Registra una espera de la partida; False si ya hay `EVENTOS_MAX_ESPERAS` en el proceso."""
+    maximo = int(getattr(settings, 'EVENTOS_MAX_ESPERAS', 32))
+    with _lock:
+        if sum(_esperando.values()) >= maximo:
+            return False
+        _esperando[partida_id] = _esperando.get(partida_id, 0) + 1
+        return True
+
+
+def _salir(partida_id: str) -> None:
+    """Quita una espera; con la última se libera la condición si la partida no tiene buffer."""
+    with _lock:
+        restantes = _esperando.pop(partida_id, 1) - 1
+        if restantes > 0:
+            _esperando[partida_id] = restantes
+        elif partida_id not in _buffers:
+            _conditions.pop(partida_id, None)
+
+
+def _eventos_locales(partida_id: str, version: int, actual: int) -> Optional[List[dict]]:
+    """Eventos del buffer posteriores a `version`, o None si no cubren todas las versiones hasta `actual`."""
+    eventos = [e for e in _buffers.get(partida_id, ()) if e['version'] > version]
+    if {e['version'] for e in eventos} != set(range(version + 1, actual + 1)):
+        return None
+    return eventos
+
+
+def movimiento_datos(movimiento) -> Dict[str, object]:
+    return {
+        'ply': movimiento.ply,
+        'id_movimiento': movimiento.id_movimiento,
+        'jugador': movimiento.jugador_id,
+        'pieza': movimiento.pieza_id,
+        'ronda': movimiento.ronda_id,
+        'origen': movimiento.origen,
+        'destino': movimiento.destino,
+    }
+
+
+def ronda_datos(ronda) -> Dict[str, object]:
+    return {
+        'id_ronda': ronda.id_ronda,
+        'numero': ronda.numero,
+        'jugador': ronda.jugador_id,
+        'inicio': ronda.inicio,
+    }
+
+
+def game_delta(partida_id: str, desde_ply: int) -> Dict[str, object]:
+    """Ronda activa y movimientos con `ply` mayor que `desde_ply` (recorridos por índice)."""
+    ronda = (
+        Ronda.objects.filter(partida_id=partida_id, fin__isnull=True)
+        .order_by('numero')
+        .only('id_ronda', 'numero', 'jugador_id', 'inicio')
+        .first()
+    )
+    movimientos = [
+        movimiento_datos(m)
+        for m in Movimiento.objects.filter(partida_id=partida_id, ply__gt=desde_ply)
+        .order_by('ply')
+        .only('ply', 'id_movimiento', 'jugador_id', 'pieza_id', 'ronda_id', 'origen', 'destino')
+    ]
+    return {
+        'ronda_actual': ronda_datos(ronda) if ronda else None,
+        'movimientos': movimientos,
+        'ultimo_ply': movimientos[-1]['ply'] if movimientos else desde_ply,
+    }
+
+
+def wait_for_events(partida_id: str, version: int, desde_ply: int = 0, timeout: float = 0) -> Tuple[int, List[dict]]:
+    """Espera hasta `timeout` segundos a que la partida pase de `version`.
+
+    Devuelve (version_actual, eventos); la lista está vacía si no hubo cambios. Si ya hay
+    `EVENTOS_MAX_ESPERAS` esperas en el proceso no espera. Lanza `Partida.DoesNotExist` si
+    la partida no existe.
+    """
+    intervalo = float(getattr(settings, 'EVENTOS_INTERVALO_DB', 1.0))
+    limite = time.monotonic() + max(0.0, float(timeout))
+    registrada = timeout > 0 and _entrar(partida_id)
+    if not registrada:
+        limite = time.monotonic()
+    try:
+        while True:
+            actual = Partida.objects.filter(pk=partida_id).values_list('version', flat=True).get()
+            if actual > version:
+                with _lock:
+                    eventos = _eventos_locales(partida_id, version, actual)
+                if eventos is None:
+                    eventos = [{'tipo': 'sincronizacion', 'version': actual, **game_delta(partida_id, desde_ply)}]
+                return actual, eventos
+
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return actual, []
+            with _lock:
+                buf = _buffers.get(partida_id)
+                if not buf or buf[-1]['version'] <= version:
+                    _condition(partida_id).wait(min(restante, intervalo))
+    finally:
+        if registrada:
+            _salir(partida_id)
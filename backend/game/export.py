@@ -0,0 +1,115 @@
+"""Exportación en streaming de muchas partidas (NDJSON: una línea JSON por partida).
+
+Las partidas se recorren con `iterator(chunk_size=...)` ordenadas por `id_partida` y, para
+cada bloque, los movimientos se leen por páginas de clave (`partida_id`, `ply`) con un
+índice ya existente (`movimiento_partida_ply_unico`). Cada partida se escribe en cuanto
+llega su último movimiento, así que la memoria depende del tamaño de bloque y de página,
+no del número de partidas exportadas.
+"""
+import json
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AgenteInteligente, JugadorPartida, Movimiento, Partida
+
+CAMPOS_PARTIDA = (
+    'id_partida', 'fecha_inicio', 'fecha_fin', 'estado', 'numero_jugadores', 'tiempo_sobrante', 'is_demo',
+    'version', 'tablero',
+)
+
+
+def parse_fecha(valor: Optional[str]):
+    """Fecha u hora ISO 8601 (con zona horaria de la configuración si no la trae). Lanza ValueError."""
+    if not valor:
+        return None
+    fecha = parse_datetime(valor) or parse_datetime(f"{valor}T00:00:00")
+    if fecha is None:
+        raise ValueError(f"Fecha no válida: {valor}")
+    return timezone.make_aware(fecha) if timezone.is_naive(fecha) else fecha
+
+
+def filter_games(estados: Optional[Iterable[str]] = None, desde=None, hasta=None, is_demo: Optional[bool] = None):
+    """Partidas a exportar, filtradas por estado, fecha de inicio y tipo (demo o no)."""
+    partidas = Partida.objects.all()
+    if estados:
+        partidas = partidas.filter(estado__in=list(estados))
+    if desde is not None:
+        partidas = partidas.filter(fecha_inicio__gte=desde)
+    if hasta is not None:
+        partidas = partidas.filter(fecha_inicio__lt=hasta)
+    if is_demo is not None:
+        partidas = partidas.filter(is_demo=is_demo)
+    return partidas
+
+
+def _movimientos(ids: List[str], pagina: int) -> Iterator[tuple]:
+    """Movimientos de las partidas `ids` en orden (partida_id, ply), por páginas de clave."""
+    ultimo = None
+    while True:
+        consulta = Movimiento.objects.filter(partida_id__in=ids)
+        if ultimo is not None:
+            consulta = consulta.filter(Q(partida_id__gt=ultimo[0]) | Q(partida_id=ultimo[0], ply__gt=ultimo[1]))
+        filas = list(
+            consulta.order_by('partida_id', 'ply')
+            .values_list('partida_id', 'ply', 'ronda__numero', 'jugador_id', 'pieza_id', 'origen', 'destino')[:pagina]
+        )
+        yield from filas
+        if len(filas) < pagina:
+            return
+        ultimo = (filas[-1][0], filas[-1][1])
+
+
+def _bloque(partidas: List[Dict[str, object]], pagina: int) -> Iterator[Dict[str, object]]:
+    ids = [p['id_partida'] for p in partidas]
+    jugadores: Dict[str, list] = {}
+    participaciones = (
+        JugadorPartida.objects.filter(partida_id__in=ids)
+        .order_by('partida_id', 'orden_participacion')
+        .values_list('partida_id', 'jugador_id', 'jugador__nombre', 'jugador__humano', 'orden_participacion')
+    )
+    for partida_id, jugador_id, nombre, humano, orden in participaciones:
+        jugadores.setdefault(partida_id, []).append(
+            {'id_jugador': jugador_id, 'nombre': nombre, 'humano': humano, 'orden': orden}
+        )
+    niveles = dict(
+        AgenteInteligente.objects.filter(jugador_id__in=[j['id_jugador'] for js in jugadores.values() for j in js])
+        .values_list('jugador_id', 'nivel')
+    )
+
+    movimientos = _movimientos(ids, pagina)
+    siguiente = next(movimientos, None)
+    for partida in partidas:
+        pasos = []
+        while siguiente is not None and siguiente[0] == partida['id_partida']:
+            pasos.append(list(siguiente[1:]))
+            siguiente = next(movimientos, None)
+        yield {
+            **partida,
+            'jugadores': [
+                {**j, 'nivel': niveles.get(j['id_jugador'])} for j in jugadores.get(partida['id_partida'], [])
+            ],
+            # [ply, numero de ronda, jugador, pieza, origen, destino]
+            'movimientos': pasos,
+        }
+
+
+def iter_games(partidas, chunk_size: int = 100, pagina: int = 2000) -> Iterator[Dict[str, object]]:
+    """Genera un diccionario por partida con sus jugadores y movimientos."""
+    bloque: List[Dict[str, object]] = []
+    for partida in partidas.order_by('id_partida').values(*CAMPOS_PARTIDA).iterator(chunk_size=chunk_size):
+        bloque.append(partida)
+        if len(bloque) >= chunk_size:
+            yield from _bloque(bloque, pagina)
+            bloque = []
+    if bloque:
+        yield from _bloque(bloque, pagina)
+
+
+def iter_ndjson(partidas, chunk_size: int = 100, pagina: int = 2000) -> Iterator[str]:
+    """Líneas NDJSON (terminadas en salto de línea) de `iter_games`."""
+    for partida in iter_games(partidas, chunk_size=chunk_size, pagina=pagina):
+        yield json.dumps(partida, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')) + '\n'
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from game.archive import RegistroIncompleto, archive_game
+from game.models import Partida
+
+
+class Command(BaseCommand):
+    help = (
+        "Archiva las partidas FINALIZADAS en una fila comprimida (PartidaArchivada) y borra "
+        "sus rondas, movimientos, piezas y jugadores de las tablas de juego."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=0, help='Solo partidas terminadas hace al menos estos días.')
+        parser.add_argument('--limite', type=int, default=None, help='Máximo de partidas a archivar en esta ejecución.')
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa de lo que se archivaría.')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 0:
+            raise CommandError('--dias debe ser >= 0')
+
+        limite = timezone.now() - timedelta(days=options['dias'])
+        candidatas = Partida.objects.filter(estado='FINALIZADA', fecha_fin__lte=limite).order_by('fecha_fin')
+        ids = candidatas.values_list('pk', flat=True)
+        if options['limite'] is not None:
+            ids = ids[:options['limite']]
+        ids = list(ids)
+
+        if options['dry_run']:
+            self.stdout.write(f"[dry-run] Se archivarían {len(ids)} partidas")
+            return
+
+        # Una transacción por partida: un fallo no deshace las ya archivadas
+        omitidas = 0
+        for i, partida_id in enumerate(ids, start=1):
+            try:
+                archive_game(partida_id)
+            except RegistroIncompleto as exc:
+                omitidas += 1
+                self.stderr.write(f"{i}/{len(ids)} {partida_id} omitida: {exc}")
+                continue
+            self.stdout.write(f"{i}/{len(ids)} {partida_id}")
+        self.stdout.write(self.style.SUCCESS(f"{len(ids) - omitidas} partidas archivadas"))
+        if omitidas:
+            self.stdout.write(self.style.WARNING(f"{omitidas} partidas omitidas (ver errores)"))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from game.export import filter_games, iter_ndjson, parse_fecha
+from game.models import Partida
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta partidas en NDJSON (una línea JSON por partida, con jugadores y movimientos) "
+        "recorriéndolas por bloques, sin cargarlas todas en memoria."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salida', default='-', help='Fichero de salida. Por defecto la salida estándar.')
+        parser.add_argument(
+            '--estado', action='append', choices=[e for e, _ in Partida.ESTADOS],
+            help='Estados a exportar (repetible). Por defecto todos.',
+        )
+        parser.add_argument('--desde', help='Solo partidas iniciadas desde esta fecha (ISO 8601).')
+        parser.add_argument('--hasta', help='Solo partidas iniciadas antes de esta fecha (ISO 8601).')
+        demos = parser.add_mutually_exclusive_group()
+        demos.add_argument('--solo-demos', action='store_true', help='Solo partidas demo.')
+        demos.add_argument('--sin-demos', action='store_true', help='Excluye las partidas demo.')
+        parser.add_argument('--lote', type=int, default=100, help='Partidas leídas por bloque.')
+        parser.add_argument('--pagina', type=int, default=2000, help='Movimientos leídos por consulta.')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1 or options['pagina'] < 1:
+            raise CommandError('--lote y --pagina deben ser >= 1')
+
+        try:
+            desde, hasta = parse_fecha(options['desde']), parse_fecha(options['hasta'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        is_demo = True if options['solo_demos'] else False if options['sin_demos'] else None
+        partidas = filter_games(options['estado'], desde, hasta, is_demo)
+        lineas = iter_ndjson(partidas, chunk_size=options['lote'], pagina=options['pagina'])
+
+        total = 0
+        if options['salida'] == '-':
+            for linea in lineas:
+                self.stdout.write(linea, ending='')
+                total += 1
+        else:
+            with open(options['salida'], 'w', encoding='utf-8') as salida:
+                for linea in lineas:
+                    salida.write(linea)
+                    total += 1
+        self.stderr.write(f"{total} partidas exportadas")
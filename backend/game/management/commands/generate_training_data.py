@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from game.ai.training import db_games, self_play_games, write_shards
+from game.models import Partida
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos para ajustar los pesos de la heurística Max: una fila por jugada (unidades "
+        "de cada peso, contexto y resultado) en shards .npz, a partir de autojuego en memoria "
+        "y/o de las partidas FINALIZADAS guardadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salida', required=True, help='Directorio de los shards.')
+        parser.add_argument('--autojuego', type=int, default=0, help='Partidas de autojuego a generar.')
+        parser.add_argument('--jugadores', type=int, default=2, choices=[2, 3, 4, 6], help='Jugadores por partida de autojuego.')
+        parser.add_argument('--max-turnos', type=int, default=400, help='Turnos máximos por partida de autojuego.')
+        parser.add_argument('--epsilon', type=float, default=0.1, help='Probabilidad de jugada aleatoria en el autojuego.')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--desde-bd', action='store_true', help='Incluye las partidas FINALIZADAS de la base de datos.')
+        parser.add_argument('--filas-por-shard', type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        if options['autojuego'] < 0 or options['max_turnos'] < 1 or options['filas_por_shard'] < 1:
+            raise CommandError('--autojuego debe ser >= 0 y --max-turnos y --filas-por-shard >= 1')
+        if not options['autojuego'] and not options['desde_bd']:
+            raise CommandError('Indica --autojuego N y/o --desde-bd')
+
+        def partidas():
+            if options['autojuego']:
+                yield from self_play_games(
+                    numero_jugadores=options['jugadores'],
+                    partidas=options['autojuego'],
+                    max_turnos=options['max_turnos'],
+                    epsilon=options['epsilon'],
+                    seed=options['seed'],
+                )
+            if options['desde_bd']:
+                ids = Partida.objects.filter(estado='FINALIZADA').order_by('id_partida').values_list('pk', flat=True)
+                yield from db_games(ids.iterator(chunk_size=500))
+
+        writer = write_shards(partidas(), options['salida'], filas_por_shard=options['filas_por_shard'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{writer.filas} posiciones de {writer.partidas} partidas en {len(writer.rutas)} shards"
+        ))
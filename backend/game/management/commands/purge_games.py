@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from game.models import Partida
+from game.retention import delete_games
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra por lotes las partidas antiguas según la política de retención "
+        "(antigüedad, estado y partidas demo), con sus rondas, movimientos, piezas y jugadores."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=getattr(settings, 'GAME_RETENTION_DAYS', 30),
+            help='Antigüedad mínima (días desde el inicio de la partida). Por defecto GAME_RETENTION_DAYS.',
+        )
+        parser.add_argument(
+            '--estado', action='append', choices=[e for e, _ in Partida.ESTADOS],
+            help='Estados a purgar (repetible). Por defecto FINALIZADA.',
+        )
+        parser.add_argument(
+            '--incluir-demos', action='store_true',
+            help='Purga también las partidas demo antiguas en cualquier estado (demos abandonadas).',
+        )
+        parser.add_argument('--solo-demos', action='store_true', help='Limita la purga a partidas demo.')
+        parser.add_argument('--lote', type=int, default=500, help='Partidas borradas por transacción.')
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa de lo que se borraría.')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 0 or options['lote'] < 1:
+            raise CommandError('--dias debe ser >= 0 y --lote >= 1')
+
+        limite = timezone.now() - timedelta(days=options['dias'])
+        estados = options['estado'] or ['FINALIZADA']
+
+        politica = Q(estado__in=estados)
+        if options['incluir_demos']:
+            politica |= Q(is_demo=True)
+        candidatas = Partida.objects.filter(politica, fecha_inicio__lt=limite)
+        if options['solo_demos']:
+            candidatas = candidatas.filter(is_demo=True)
+
+        total = candidatas.count()
+        if options['dry_run']:
+            self.stdout.write(f"[dry-run] Se borrarían {total} partidas iniciadas antes de {limite:%Y-%m-%d %H:%M}")
+            return
+
+        borradas = 0
+        totales = {}
+        while True:
+            ids = list(candidatas.order_by('fecha_inicio').values_list('pk', flat=True)[:options['lote']])
+            if not ids:
+                break
+            for etiqueta, n in delete_games(ids).items():
+                totales[etiqueta] = totales.get(etiqueta, 0) + n
+            borradas += len(ids)
+            self.stdout.write(f"{borradas}/{total} partidas borradas")
+
+        resumen = ', '.join(f"{etiqueta}: {n}" for etiqueta, n in sorted(totales.items())) or 'nada que borrar'
+        self.stdout.write(self.style.SUCCESS(f"Purga completada ({resumen})"))
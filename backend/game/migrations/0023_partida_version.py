@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-19 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0022_alter_partida_is_demo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partida',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
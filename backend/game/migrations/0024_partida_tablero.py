@@ -0,0 +1,53 @@
+from django.db import migrations, models
+
+# Copia congelada de la codificación de `game.board` en esta migración: un cambio posterior
+# de ese módulo no debe alterar lo que rellenó (ni romper su ejecución en una base antigua).
+ROW_LENGTHS = (1, 2, 3, 4, 13, 12, 11, 10, 9, 10, 11, 12, 13, 4, 3, 2, 1)
+CELL_INDEX = {
+    key: idx
+    for idx, key in enumerate(f"{col}-{row}" for row, length in enumerate(ROW_LENGTHS) for col in range(length))
+}
+
+
+def encode_board(ocupacion):
+    """Pares (posicion, orden_participacion) → cadena de 121 caracteres ('0' vacía, '9' dueño desconocido)."""
+    cells = ["0"] * len(CELL_INDEX)
+    for posicion, slot in ocupacion:
+        idx = CELL_INDEX.get(str(posicion))
+        if idx is None:
+            continue
+        cells[idx] = str(slot) if slot and 1 <= int(slot) <= 6 else "9"
+    return "".join(cells)
+
+
+def backfill_tablero(apps, schema_editor):
+    Partida = apps.get_model("game", "Partida")
+    Pieza = apps.get_model("game", "Pieza")
+    JugadorPartida = apps.get_model("game", "JugadorPartida")
+
+    for partida_id in Partida.objects.values_list("id_partida", flat=True).iterator():
+        slots = dict(
+            JugadorPartida.objects.filter(partida_id=partida_id).values_list("jugador_id", "orden_participacion")
+        )
+        tablero = encode_board(
+            (posicion, slots.get(jugador_id))
+            for jugador_id, posicion in Pieza.objects.filter(partida_id=partida_id).values_list("jugador_id", "posicion")
+            if posicion
+        )
+        Partida.objects.filter(pk=partida_id).update(tablero=tablero)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("game", "0023_partida_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="partida",
+            name="tablero",
+            field=models.CharField(blank=True, default="", max_length=121),
+        ),
+        migrations.RunPython(backfill_tablero, migrations.RunPython.noop),
+    ]
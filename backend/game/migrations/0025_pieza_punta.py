@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+def backfill_punta(apps, schema_editor):
+    Pieza = apps.get_model("game", "Pieza")
+
+    # Una actualización por punta (0-5) en lugar de una por pieza
+    puntas = {}
+    for pk, tipo in Pieza.objects.filter(punta__isnull=True).values_list("pk", "tipo").iterator():
+        try:
+            punta = int(str(tipo).split("-")[0])
+        except Exception:
+            continue
+        puntas.setdefault(punta, []).append(pk)
+
+    for punta, pks in puntas.items():
+        for i in range(0, len(pks), 500):
+            Pieza.objects.filter(pk__in=pks[i:i + 500]).update(punta=punta)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("game", "0024_partida_tablero"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pieza",
+            name="punta",
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_punta, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.0 on 2026-10-19 12:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def _casillas_repetidas(Pieza):
+    return list(
+        Pieza.objects.filter(partida__isnull=False)
+        .values("partida_id", "posicion")
+        .annotate(total=Count("pk"))
+        .filter(total__gt=1)
+        .values_list("partida_id", "posicion")
+    )
+
+
+def resolve_duplicate_positions(apps, schema_editor):
+    """Deja una pieza por casilla antes de añadir `pieza_partida_posicion_unica`.
+
+    Las piezas que comparten casilla se recolocan en el destino de su último movimiento
+    (mismo orden histórico que el backfill de `ply`). Si aun así quedan casillas repetidas,
+    la migración se detiene indicando qué partidas hay que corregir a mano.
+    """
+    Pieza = apps.get_model("game", "Pieza")
+    Movimiento = apps.get_model("game", "Movimiento")
+
+    for partida_id, posicion in _casillas_repetidas(Pieza):
+        for pieza in Pieza.objects.filter(partida_id=partida_id, posicion=posicion):
+            destino = (
+                Movimiento.objects.filter(partida_id=partida_id, pieza_id=pieza.pk)
+                .order_by("-ronda__numero", "-ronda__inicio", "-id_movimiento")
+                .values_list("destino", flat=True)
+                .first()
+            )
+            if destino and destino != posicion:
+                Pieza.objects.filter(pk=pieza.pk).update(posicion=destino)
+
+    repetidas = _casillas_repetidas(Pieza)
+    if repetidas:
+        detalle = ", ".join(f"{partida_id} ({posicion})" for partida_id, posicion in repetidas[:20])
+        raise RuntimeError(
+            f"Hay {len(repetidas)} casillas con más de una pieza que no se pueden reconstruir desde "
+            f"los movimientos: {detalle}. Corrige `posicion` de esas piezas (o borra las partidas) "
+            "y vuelve a ejecutar la migración."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0025_pieza_punta'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(fields=['partida', 'jugador'], name='mov_partida_jugador_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ronda',
+            index=models.Index(fields=['partida', 'numero'], name='ronda_partida_numero_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ronda',
+            index=models.Index(condition=models.Q(('fin__isnull', True)), fields=['partida', 'numero'], name='ronda_activa_idx'),
+        ),
+        migrations.RunPython(resolve_duplicate_positions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pieza',
+            constraint=models.UniqueConstraint(fields=('partida', 'posicion'), name='pieza_partida_posicion_unica'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+
+
+def backfill_ply(apps, schema_editor):
+    Movimiento = apps.get_model("game", "Movimiento")
+    Partida = apps.get_model("game", "Partida")
+
+    # Orden histórico: número de ronda, inicio de la ronda y orden de inserción del paso
+    for partida_id in Partida.objects.values_list("id_partida", flat=True).iterator():
+        movimientos = list(
+            Movimiento.objects.filter(partida_id=partida_id)
+            .order_by("ronda__numero", "ronda__inicio", "id_movimiento")
+            .only("pk")
+        )
+        for ply, movimiento in enumerate(movimientos, start=1):
+            movimiento.ply = ply
+        Movimiento.objects.bulk_update(movimientos, ["ply"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("game", "0026_hot_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movimiento",
+            name="ply",
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_ply, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="movimiento",
+            name="ply",
+            field=models.PositiveIntegerField(editable=False),
+        ),
+        migrations.RemoveIndex(
+            model_name="movimiento",
+            name="mov_partida_jugador_idx",
+        ),
+        migrations.AddIndex(
+            model_name="movimiento",
+            index=models.Index(fields=["partida", "jugador", "ply"], name="mov_partida_jugador_ply_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="movimiento",
+            constraint=models.UniqueConstraint(fields=("partida", "ply"), name="movimiento_partida_ply_unico"),
+        ),
+    ]
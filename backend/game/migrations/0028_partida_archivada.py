@@ -0,0 +1,29 @@
+# Generated by Django 5.0 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0027_movimiento_ply'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartidaArchivada',
+            fields=[
+                ('id_partida', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('fecha_inicio', models.DateTimeField()),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('numero_jugadores', models.IntegerField()),
+                ('is_demo', models.BooleanField(default=False)),
+                ('ganador', models.CharField(blank=True, default='', max_length=50)),
+                ('fecha_archivo', models.DateTimeField(auto_now_add=True)),
+                ('datos', models.BinaryField()),
+            ],
+            options={
+                'verbose_name_plural': 'Partidas archivadas',
+            },
+        ),
+    ]
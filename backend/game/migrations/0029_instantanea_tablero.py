@@ -0,0 +1,68 @@
+# Generated by Django 5.0 on 2026-10-19 12:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Copia congelada de la codificación de `game.board` en esta migración: un cambio posterior
+# de ese módulo no debe alterar las instantáneas que rellenó.
+ROW_LENGTHS = (1, 2, 3, 4, 13, 12, 11, 10, 9, 10, 11, 12, 13, 4, 3, 2, 1)
+CELL_INDEX = {
+    key: idx
+    for idx, key in enumerate(f"{col}-{row}" for row, length in enumerate(ROW_LENGTHS) for col in range(length))
+}
+
+
+def move_on_board(tablero, origen, destino):
+    """Mueve el contenido de `origen` a `destino`; casillas desconocidas dejan el tablero igual."""
+    o = CELL_INDEX.get(str(origen))
+    d = CELL_INDEX.get(str(destino))
+    if o is None or d is None or o == d:
+        return tablero
+    cells = list(tablero)
+    cells[d], cells[o] = cells[o], '0'
+    return ''.join(cells)
+
+
+def backfill_instantaneas(apps, schema_editor):
+    InstantaneaTablero = apps.get_model('game', 'InstantaneaTablero')
+    Movimiento = apps.get_model('game', 'Movimiento')
+    Partida = apps.get_model('game', 'Partida')
+    cada = max(1, int(getattr(settings, 'TABLERO_INSTANTANEA_PLIES', 32)))
+
+    # Hacia atrás desde el tablero actual, deshaciendo movimientos
+    for partida_id, tablero in Partida.objects.exclude(tablero='').values_list('id_partida', 'tablero').iterator():
+        instantaneas = []
+        pasos = Movimiento.objects.filter(partida_id=partida_id).order_by('-ply').values_list('ply', 'origen', 'destino')
+        for ply, origen, destino in pasos.iterator():
+            if ply % cada == 0:
+                instantaneas.append(InstantaneaTablero(partida_id=partida_id, ply=ply, tablero=tablero))
+            tablero = move_on_board(tablero, destino, origen)
+        InstantaneaTablero.objects.bulk_create(instantaneas, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0028_partida_archivada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstantaneaTablero',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ply', models.PositiveIntegerField()),
+                ('tablero', models.CharField(max_length=121)),
+                ('partida', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='instantaneas', to='game.partida')),
+            ],
+            options={
+                'verbose_name_plural': 'Instantáneas de tablero',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='instantaneatablero',
+            constraint=models.UniqueConstraint(fields=('partida', 'ply'), name='instantanea_partida_ply_unica'),
+        ),
+        migrations.RunPython(backfill_instantaneas, migrations.RunPython.noop),
+    ]
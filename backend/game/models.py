@@ -1,6 +1,6 @@
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
 
 ROW_LENGTHS = (1,2,3,4,13,12,11,10,9,10,11,12,13,4,3,2,1,)
 
@@ -30,6 +30,14 @@ def validate_position_key(key: str) -> None:
         raise ValidationError("Posición inválida: fuera del tablero")
 
 
+def punta_from_tipo(tipo: str):
+    # `tipo` tiene el formato 'punta-color' (p. ej. '3-Negro')
+    try:
+        return int(str(tipo).split('-')[0])
+    except Exception:
+        return None
+
+
 class Jugador(models.Model):
     """
     Modelo para representar un jugador (humano o agente Inteligente)
@@ -66,6 +74,10 @@ class Partida(models.Model):
         validators=[MinValueValidator(2), MaxValueValidator(6)]
     )
     is_demo = models.BooleanField(default=False)
+    # Se incrementa en cada cambio de estado del turno (control de concurrencia optimista)
+    version = models.PositiveIntegerField(default=0)
+    # Copia compacta de la colocación de las piezas (ver game/board.py); vacía = sin calcular
+    tablero = models.CharField(max_length=121, blank=True, default='')
     jugadores = models.ManyToManyField(
         Jugador,
         related_name='partidas',  # Relación: Jugador 2..6 --> 0..* Partida
@@ -98,6 +110,8 @@ class Pieza(models.Model):
     """
     id_pieza = models.CharField(max_length=50, primary_key=True)
     tipo = models.CharField(max_length=50)
+    # Punta inicial (0-5) ya extraída de `tipo`, para no parsear la cadena en los agentes
+    punta = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True)
     posicion = models.CharField(
         max_length=10,
         validators=[validate_position_key],
@@ -124,6 +138,24 @@ class Pieza(models.Model):
 
     class Meta:
         verbose_name_plural = "Piezas"
+        constraints = [
+            # Una casilla solo puede tener una pieza; también sirve de índice para las comprobaciones de ocupación
+            models.UniqueConstraint(
+                fields=['partida', 'posicion'],
+                name="pieza_partida_posicion_unica",
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        # `punta` se deriva siempre de `tipo` (si cambia el tipo, no queda desfasada); solo se
+        # conserva la indicada a mano cuando `tipo` no tiene el formato 'punta-color'
+        punta = punta_from_tipo(self.tipo)
+        if punta is not None:
+            self.punta = punta
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'tipo' in update_fields and 'punta' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'punta']
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.tipo} de {self.jugador}"
@@ -160,6 +192,15 @@ class Ronda(models.Model):
                 name="ronda_fin_after_inicio",
             )
         ]
+        indexes = [
+            models.Index(fields=['partida', 'numero'], name="ronda_partida_numero_idx"),
+            # Ronda activa (fin IS NULL): se consulta en cada movimiento, sugerencia y avance
+            models.Index(
+                fields=['partida', 'numero'],
+                condition=models.Q(fin__isnull=True),
+                name="ronda_activa_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Ronda {self.numero} de {self.jugador}"
@@ -195,9 +236,47 @@ class Movimiento(models.Model):
     )
     origen = models.CharField(max_length=10, validators=[validate_position_key])
     destino = models.CharField(max_length=10, validators=[validate_position_key])
+    # Número de orden del paso dentro de la partida (1, 2, 3...), asignado al guardar
+    ply = models.PositiveIntegerField(editable=False)
 
     class Meta:
         verbose_name_plural = "Movimientos"
+        constraints = [
+            models.UniqueConstraint(fields=['partida', 'ply'], name="movimiento_partida_ply_unico"),
+        ]
+        indexes = [
+            # Último movimiento del jugador (agentes y caché de sugerencias) sin JOIN con Ronda
+            models.Index(fields=['partida', 'jugador', 'ply'], name="mov_partida_jugador_ply_idx"),
+        ]
+
+    # Inserciones que se reintentan cuando otra escritura concurrente se queda el mismo `ply`
+    PLY_REINTENTOS = 5
+
+    @staticmethod
+    def next_ply(partida_id) -> int:
+        """Siguiente `ply` libre de la partida según lo ya confirmado.
+
+        No reserva nada: dos escrituras simultáneas pueden obtener el mismo valor. Las vistas
+        lo usan tras `reclamar_version`, que serializa las escrituras de la partida; fuera de
+        ellas, `save` detecta el choque con `movimiento_partida_ply_unico` y reintenta.
+        """
+        ultimo = Movimiento.objects.filter(partida_id=partida_id).aggregate(m=models.Max('ply'))['m']
+        return (ultimo or 0) + 1
+
+    def save(self, *args, **kwargs):
+        if self.ply is not None or not self.partida_id:
+            return super().save(*args, **kwargs)
+
+        for intento in range(1, self.PLY_REINTENTOS + 1):
+            self.ply = Movimiento.next_ply(self.partida_id)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                ply_ocupado = Movimiento.objects.filter(partida_id=self.partida_id, ply=self.ply).exists()
+                self.ply = None
+                if not ply_ocupado or intento == self.PLY_REINTENTOS:
+                    raise
 
     def clean(self):
         super().clean()
@@ -324,3 +403,51 @@ class JugadorPartida(models.Model):
 
     def __str__(self):
         return f"{self.jugador} en {self.partida}"
+
+
+class PartidaArchivada(models.Model):
+    """
+    Partida finalizada archivada en una sola fila: jugadores, piezas, rondas y movimientos
+    en un JSON comprimido (ver game/archive.py). Sus filas ya no están en las tablas de juego.
+    """
+    id_partida = models.CharField(max_length=50, primary_key=True)
+    fecha_inicio = models.DateTimeField()
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+    numero_jugadores = models.IntegerField()
+    is_demo = models.BooleanField(default=False)
+    ganador = models.CharField(max_length=50, blank=True, default='')
+    fecha_archivo = models.DateTimeField(auto_now_add=True)
+    datos = models.BinaryField()
+
+    class Meta:
+        verbose_name_plural = "Partidas archivadas"
+
+    def __str__(self):
+        return f"Partida archivada {self.id_partida}"
+
+
+class InstantaneaTablero(models.Model):
+    """
+    Copia de `Partida.tablero` tras el movimiento `ply` (uno de cada
+    `TABLERO_INSTANTANEA_PLIES`), para reconstruir cualquier posición sin repetir la
+    partida entera (ver `board.position_at_ply`).
+    """
+    partida = models.ForeignKey(
+        Partida,
+        on_delete=models.CASCADE,
+        related_name='instantaneas'
+    )
+    ply = models.PositiveIntegerField()
+    tablero = models.CharField(max_length=121)
+
+    class Meta:
+        verbose_name_plural = "Instantáneas de tablero"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['partida', 'ply'],
+                name="instantanea_partida_ply_unica",
+            )
+        ]
+
+    def __str__(self):
+        return f"Tablero de {self.partida_id} en el ply {self.ply}"
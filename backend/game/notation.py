@@ -0,0 +1,122 @@
+"""Notación compacta de partidas (registro tipo PGN y posición tipo FEN).
+
+Casillas: índice 0-120 de `board.CELL_KEYS`.
+
+Posición (una línea, campos separados por espacios)::
+
+    <tablero> <turno> <numero_jugadores> <ronda>
+
+`<tablero>` recorre las casillas en orden: letras `a`-`f` para una pieza del jugador con
+orden de participación 1-6, `x` para dueño desconocido y un número para una racha de
+casillas vacías. `<turno>` es el orden (1-6) del jugador que mueve y `<ronda>` el número de
+ronda en curso.
+
+Registro: cabeceras `[Clave "valor"]` y después un token por turno, con el número de ronda
+(`3.`) delante del primer turno de cada ronda. Un turno es la lista de casillas que recorre
+la pieza: `12-25` para un paso simple y `40x62x84` para un salto o una cadena de saltos. El
+registro termina con el resultado: `J<orden>` del ganador o `*` si la partida sigue.
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .board import CELL_INDEX, CELL_KEYS, EMPTY_CELL, UNKNOWN_OWNER
+
+_LETRAS = 'abcdef'
+_CABECERA = re.compile(r'\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]')
+_TOKEN_RONDA = re.compile(r'^\d+\.$')
+_TOKEN_TURNO = re.compile(r'^\d+(?:-\d+|(?:x\d+)+)$')
+_RESULTADO = re.compile(r'^(?:\*|J[1-6])$')
+
+
+def position_to_fen(tablero: str, turno: int, numero_jugadores: int, ronda: int) -> str:
+    partes: List[str] = []
+    vacias = 0
+    for c in tablero:
+        if c == EMPTY_CELL:
+            vacias += 1
+            continue
+        if vacias:
+            partes.append(str(vacias))
+            vacias = 0
+        partes.append('x' if c == UNKNOWN_OWNER else _LETRAS[int(c) - 1])
+    if vacias:
+        partes.append(str(vacias))
+    return f"{''.join(partes)} {turno} {numero_jugadores} {ronda}"
+
+
+def fen_to_position(fen: str) -> Tuple[str, int, int, int]:
+    """Devuelve (tablero, turno, numero_jugadores, ronda). Lanza ValueError si la posición no es válida."""
+    campos = str(fen or '').split()
+    if len(campos) != 4:
+        raise ValueError("La posición debe tener 4 campos: tablero turno numero_jugadores ronda")
+    tablero_rle, turno, numero_jugadores, ronda = campos
+    try:
+        turno, numero_jugadores, ronda = int(turno), int(numero_jugadores), int(ronda)
+    except ValueError:
+        raise ValueError("turno, numero_jugadores y ronda deben ser enteros")
+    if not 2 <= numero_jugadores <= 6 or not 1 <= turno <= numero_jugadores or ronda < 1:
+        raise ValueError("turno, numero_jugadores o ronda fuera de rango")
+
+    celdas: List[str] = []
+    for racha, letra in re.findall(r'(\d+)|([a-fx])', tablero_rle):
+        if racha:
+            celdas.extend(EMPTY_CELL * int(racha))
+        elif letra == 'x':
+            celdas.append(UNKNOWN_OWNER)
+        else:
+            slot = _LETRAS.index(letra) + 1
+            if slot > numero_jugadores:
+                raise ValueError(f"Pieza de un jugador inexistente: {letra}")
+            celdas.append(str(slot))
+    if ''.join(re.findall(r'\d+|[a-fx]', tablero_rle)) != tablero_rle or len(celdas) != len(CELL_KEYS):
+        raise ValueError(f"El tablero debe describir exactamente {len(CELL_KEYS)} casillas")
+    return ''.join(celdas), turno, numero_jugadores, ronda
+
+
+def format_turn(casillas: Sequence[str], salto: bool) -> str:
+    """Token de un turno a partir de las claves de casilla recorridas (origen, ..., destino)."""
+    indices = [str(CELL_INDEX[c]) for c in casillas]
+    return ('x' if salto or len(indices) > 2 else '-').join(indices)
+
+
+def parse_turn(token: str) -> List[str]:
+    if not _TOKEN_TURNO.match(token):
+        raise ValueError(f"Turno mal formado: {token}")
+    indices = [int(i) for i in re.split(r'[-x]', token)]
+    if any(i >= len(CELL_KEYS) for i in indices):
+        raise ValueError(f"Casilla fuera del tablero en el turno {token}")
+    return [CELL_KEYS[i] for i in indices]
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def format_record(cabeceras: Sequence[Tuple[str, str]], turnos: Sequence[Tuple[int, str]], resultado: Optional[str]) -> str:
+    """`turnos` es una lista (numero_ronda, token) en orden de juego."""
+    lineas = [f'[{clave} "{_escapar(valor)}"]' for clave, valor in cabeceras]
+    cuerpo: List[str] = []
+    ronda_anterior = None
+    for numero, token in turnos:
+        if numero != ronda_anterior:
+            cuerpo.append(f"{numero}.")
+            ronda_anterior = numero
+        cuerpo.append(token)
+    cuerpo.append(resultado or '*')
+    return '\n'.join(lineas) + '\n\n' + ' '.join(cuerpo) + '\n'
+
+
+def parse_record(texto: str) -> Tuple[Dict[str, str], List[str], str]:
+    """Devuelve (cabeceras, tokens de turno, resultado). Lanza ValueError si el registro no es válido."""
+    texto = str(texto or '')
+    cabeceras = {
+        clave: re.sub(r'\\(.)', r'\1', valor)
+        for clave, valor in _CABECERA.findall(texto)
+    }
+    cuerpo = _CABECERA.sub(' ', texto).split()
+    if not cuerpo or not _RESULTADO.match(cuerpo[-1]):
+        raise ValueError("El registro debe terminar con el resultado (J<orden> o *)")
+    tokens = [t for t in cuerpo[:-1] if not _TOKEN_RONDA.match(t)]
+    for token in tokens:
+        parse_turn(token)
+    return cabeceras, tokens, cuerpo[-1]
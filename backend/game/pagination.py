@@ -0,0 +1,19 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CursorPaginacion(CursorPagination):
+    """Paginación por cursor (keyset) con tope de tamaño de página.
+
+    Cada página es un recorrido por índice a partir de la última clave vista, así que el coste
+    no depende del tamaño de la tabla. El orden lo decide la vista con `get_cursor_ordering`
+    (p. ej. por `ply` dentro de una partida) y `?orden=desc` lo invierte.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(view.get_cursor_ordering()) if hasattr(view, 'get_cursor_ordering') else tuple(self.ordering)
+        if request.query_params.get('orden') == 'desc':
+            ordering = tuple(campo[1:] if campo.startswith('-') else f'-{campo}' for campo in ordering)
+        return ordering
@@ -0,0 +1,105 @@
+"""Borrado en bloque de partidas (retención, archivo y borrado desde la API).
+
+`Model.delete()` y `QuerySet.delete()` pasan por el colector de cascadas del ORM, que carga
+en Python las filas de los modelos con dependientes para emitir señales. Aquí se borra tabla a
+tabla, de hijos a padres, con un único DELETE por tabla y sin leer las filas:
+
+- Los modelos hoja (sin señales ni relaciones que apunten a ellos) usan `QuerySet.delete()`,
+  que para ellos ya es un DELETE directo.
+- Los modelos con dependientes (ya borrados en los pasos anteriores) usan `_delete_sql`, un
+  DELETE explícito sobre su tabla; el proyecto no usa señales.
+
+Los filtros por tablas relacionadas se escriben como subconsultas `__in=....values('pk')`,
+de modo que cada DELETE afecta a una sola tabla sin JOIN.
+"""
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from django.db import connections, transaction
+from django.db.models import QuerySet
+
+from .models import (
+    AgenteInteligente, Chatbot, InstantaneaTablero, Jugador, JugadorPartida, Movimiento, Partida, Pieza, Ronda,
+)
+
+
+def _delete(queryset) -> int:
+    # Modelo hoja: el colector lo borra con un único DELETE sin cargar filas
+    return queryset.delete()[0]
+
+
+def _delete_sql(queryset) -> int:
+    # DELETE directo, sin colector ni señales (el colector leería las filas por sus dependientes)
+    conexion = connections[queryset.db]
+    opts = queryset.model._meta
+    seleccion, params = queryset.values('pk').query.sql_with_params()
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {conexion.ops.quote_name(opts.db_table)} '
+            f'WHERE {conexion.ops.quote_name(opts.pk.column)} IN ({seleccion})',
+            params,
+        )
+        return max(cursor.rowcount, 0)
+
+
+def _pasos(ids: List[str], jugadores: Set[str]) -> List[Tuple[str, Callable[[QuerySet], int], QuerySet]]:
+    """(etiqueta, borrado, queryset) de hijos a padres para `delete_games`.
+
+    Todo modelo con una clave ajena hacia otro que se borra aquí debe tener su paso antes que
+    él (lo comprueba `test_delete_games_cubre_todos_los_modelos_dependientes`).
+    """
+    pasos = [
+        ('instantaneas', _delete, InstantaneaTablero.objects.filter(partida_id__in=ids)),
+        ('movimientos', _delete, Movimiento.objects.filter(partida_id__in=ids)),
+        ('rondas', _delete_sql, Ronda.objects.filter(partida_id__in=ids)),
+        ('piezas', _delete_sql, Pieza.objects.filter(partida_id__in=ids)),
+        ('piezas', _delete_sql, Pieza.objects.filter(
+            chatbot_id__in=Chatbot.objects.filter(partida_id__in=ids).values('pk')
+        )),
+        ('chatbots', _delete_sql, Chatbot.objects.filter(partida_id__in=ids)),
+        ('participaciones', _delete, JugadorPartida.objects.filter(partida_id__in=ids)),
+        ('partidas', _delete_sql, Partida.objects.filter(pk__in=ids)),
+    ]
+    if jugadores:
+        pasos += [
+            ('movimientos', _delete, Movimiento.objects.filter(jugador_id__in=jugadores)),
+            ('rondas', _delete_sql, Ronda.objects.filter(jugador_id__in=jugadores)),
+            ('piezas', _delete_sql, Pieza.objects.filter(jugador_id__in=jugadores)),
+            ('piezas', _delete_sql, Pieza.objects.filter(
+                chatbot_id__in=Chatbot.objects.filter(jugador_id__in=jugadores).values('pk')
+            )),
+            ('chatbots', _delete_sql, Chatbot.objects.filter(jugador_id__in=jugadores)),
+            ('agentes', _delete, AgenteInteligente.objects.filter(jugador_id__in=jugadores)),
+            ('jugadores', _delete_sql, Jugador.objects.filter(pk__in=jugadores)),
+        ]
+    return pasos
+
+
+def delete_games(partida_ids: Iterable[str], *, delete_players: bool = True) -> Dict[str, int]:
+    """Borra las partidas y todas sus filas dependientes. Devuelve las filas borradas por modelo.
+
+    Con `delete_players`, borra también los jugadores que solo participaban en estas partidas
+    (`start_game` crea jugadores nuevos para cada partida) junto con su configuración de agente.
+    """
+    from .ai.mcts_agent import stop_pondering
+
+    ids = list(partida_ids)
+    if not ids:
+        return {}
+    # Los árboles de la búsqueda anticipada de estas partidas ya no los recogerá nadie
+    for partida_id in ids:
+        stop_pondering(partida_id)
+
+    jugadores = set()
+    if delete_players:
+        jugadores = set(JugadorPartida.objects.filter(partida_id__in=ids).values_list('jugador_id', flat=True))
+        jugadores -= set(
+            JugadorPartida.objects.filter(jugador_id__in=jugadores)
+            .exclude(partida_id__in=ids)
+            .values_list('jugador_id', flat=True)
+        )
+
+    borrados: Dict[str, int] = {}
+    with transaction.atomic():
+        for etiqueta, borrar, queryset in _pasos(ids, jugadores):
+            borrados[etiqueta] = borrados.get(etiqueta, 0) + borrar(queryset)
+    return borrados
@@ -78,6 +78,19 @@ class PiezaSerializer(serializers.ModelSerializer):
         if not is_valid_position_key(str(value)):
             raise serializers.ValidationError('Posición inválida: fuera del tablero')
         return value
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+
+        partida = attrs.get('partida') if 'partida' in attrs else getattr(self.instance, 'partida', None)
+        posicion = attrs.get('posicion') if 'posicion' in attrs else getattr(self.instance, 'posicion', None)
+        if partida is not None and posicion:
+            ocupada = Pieza.objects.filter(partida=partida, posicion=str(posicion))
+            if self.instance is not None:
+                ocupada = ocupada.exclude(pk=self.instance.pk)
+            if ocupada.exists():
+                raise serializers.ValidationError({'posicion': 'La casilla ya está ocupada por otra pieza'})
+        return attrs
     
     class Meta:
         model = Pieza
@@ -130,7 +143,8 @@ class MovimientoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Movimiento
         fields = ['id_movimiento', 'jugador', 'jugador_nombre', 'pieza', 'pieza_tipo', 
-                  'ronda', 'partida', 'origen', 'destino']
+                  'ronda', 'partida', 'origen', 'destino', 'ply']
+        read_only_fields = ['ply']
 
 
 class RondaSerializer(serializers.ModelSerializer):
@@ -152,16 +166,16 @@ class PartidaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Partida
         fields = ['id_partida', 'fecha_inicio', 'fecha_fin', 'estado', 
-                  'numero_jugadores', 'tiempo_sobrante', 'is_demo', 'rondas', 'movimientos', 'participantes']
-        read_only_fields = ['fecha_inicio']
+                  'numero_jugadores', 'tiempo_sobrante', 'is_demo', 'version', 'rondas', 'movimientos', 'participantes']
+        read_only_fields = ['fecha_inicio', 'version']
 
 
 class PartidaListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Partida
         fields = ['id_partida', 'fecha_inicio', 'fecha_fin', 'estado', 
-                  'numero_jugadores', 'tiempo_sobrante', 'is_demo']
-        read_only_fields = ['fecha_inicio']
+                  'numero_jugadores', 'tiempo_sobrante', 'is_demo', 'version']
+        read_only_fields = ['fecha_inicio', 'version']
 
 
 class AgenteInteligenteSerializer(serializers.ModelSerializer):
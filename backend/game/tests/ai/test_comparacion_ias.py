@@ -23,7 +23,7 @@ django.setup()
 from django.db import transaction    
 from django.utils import timezone    
 
-from game.ai.max_agent import MaxHeuristicAgent, _distance_to_goal, _parse_punta, _target_punta    
+from game.ai.max_agent import MaxHeuristicAgent, _distance_to_goal, _piece_punta, _target_punta    
 from game.ai.mcts_agent import MCTSAgent    
 from game.models import AgenteInteligente, Jugador, JugadorPartida, Movimiento, Partida, Pieza, Ronda    
 from game.views import get_occupied_positions, validate_move    
@@ -87,7 +87,7 @@ def _player_target(partida_id: str, jugador_id: str) -> Optional[int]:
     )
     if not pieza:
         return None
-    punta = _parse_punta(str(pieza.tipo))
+    punta = _piece_punta(pieza)
     return _target_punta(punta)
 
 
@@ -1,5 +1,6 @@
 import pytest
 
+from game.board import occupied_cells
 from game.models import Movimiento, Pieza, Ronda
 
 
@@ -19,6 +20,7 @@ class TestMovimientosAPI:
             "partida": p.id_partida,
             "origen": "0-4",
             "destino": "1-4",
+            "version": p.version,
         }
 
         res = api_client.post("/api/movimientos/", payload, format="json")
@@ -88,27 +90,27 @@ class TestMovimientosAPI:
 
 @pytest.mark.django_db
 class TestRegistrarMovimientos:
-    def test_registrar_movimientos_requiere_lista_no_vacia(self, api_client, make_partida):
+    def test_registrar_movimientos_requiere_lista_no_vacia(self, api_client, make_partida, version_de):
         p = make_partida(id_partida="P1", numero_jugadores=2)
 
-        res1 = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {}, format="json")
+        res1 = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {"version": version_de(p.id_partida)}, format="json")
         assert res1.status_code == 400
 
         res2 = api_client.post(
             f"/api/partidas/{p.id_partida}/registrar_movimientos/",
-            {"movimientos": "no_es_lista"},
+            {"version": version_de(p.id_partida), "movimientos": "no_es_lista"},
             format="json",
         )
         assert res2.status_code == 400
 
         res3 = api_client.post(
             f"/api/partidas/{p.id_partida}/registrar_movimientos/",
-            {"movimientos": []},
+            {"version": version_de(p.id_partida), "movimientos": []},
             format="json",
         )
         assert res3.status_code == 400
 
-    def test_registrar_movimientos_falla_sin_ronda_activa(self, api_client, make_jugador, make_partida):
+    def test_registrar_movimientos_falla_sin_ronda_activa(self, api_client, make_jugador, make_partida, version_de):
         j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
 
@@ -124,11 +126,11 @@ class TestRegistrarMovimientos:
                 }
             ]
         }
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
         assert "ronda" in str(res.data).lower() or "No hay ronda activa" in str(res.data)
 
-    def test_registrar_movimientos_falla_por_partida_id_mismatch(self, api_client, make_jugador, make_partida, make_ronda, make_pieza):
+    def test_registrar_movimientos_falla_por_partida_id_mismatch(self, api_client, make_jugador, make_partida, make_ronda, make_pieza, version_de):
         j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
         r = make_ronda(id_ronda="R1", jugador=j, numero=1, partida=p)
@@ -146,10 +148,10 @@ class TestRegistrarMovimientos:
                 }
             ]
         }
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
 
-    def test_registrar_movimientos_falla_si_mueve_varias_piezas(self, api_client, make_jugador, make_partida, make_ronda, make_pieza):
+    def test_registrar_movimientos_falla_si_mueve_varias_piezas(self, api_client, make_jugador, make_partida, make_ronda, make_pieza, version_de):
         j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
         r = make_ronda(id_ronda="R1", jugador=j, numero=1, partida=p)
@@ -176,10 +178,10 @@ class TestRegistrarMovimientos:
                 },
             ]
         }
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
 
-    def test_registrar_movimientos_falla_cadena_no_permite_simples(self, api_client, make_jugador, make_partida, make_ronda, make_pieza):
+    def test_registrar_movimientos_falla_cadena_no_permite_simples(self, api_client, make_jugador, make_partida, make_ronda, make_pieza, version_de):
         j = make_jugador(id_jugador="J1", nombre="Agente Inteligente 1", humano=False, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
         r = make_ronda(id_ronda="R1", jugador=j, numero=1, partida=p)
@@ -206,11 +208,12 @@ class TestRegistrarMovimientos:
             ]
         }
 
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
 
     def test_registrar_movimientos_falla_avanzar_mas_de_un_nodo_sin_saltar(
-        self, api_client, make_jugador, make_partida, make_ronda, make_pieza
+        self, api_client, make_jugador, make_partida, make_ronda, make_pieza,
+        version_de,
     ):
         j = make_jugador(id_jugador="J1", nombre="Agente Inteligente 1", humano=False, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
@@ -231,10 +234,10 @@ class TestRegistrarMovimientos:
             ]
         }
 
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
 
-    def test_registrar_movimientos_falla_salto_sin_casilla_libre_detras(self, api_client, make_jugador, make_partida, make_ronda, make_pieza):
+    def test_registrar_movimientos_falla_salto_sin_casilla_libre_detras(self, api_client, make_jugador, make_partida, make_ronda, make_pieza, version_de):
         j = make_jugador(id_jugador="J1", nombre="Agente Inteligente 1", humano=False, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
         r = make_ronda(id_ronda="R1", jugador=j, numero=1, partida=p)
@@ -256,10 +259,10 @@ class TestRegistrarMovimientos:
             ]
         }
 
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
 
-    def test_registrar_movimientos_falla_salto_no_colineal(self, api_client, make_jugador, make_partida, make_ronda, make_pieza):
+    def test_registrar_movimientos_falla_salto_no_colineal(self, api_client, make_jugador, make_partida, make_ronda, make_pieza, version_de):
         j = make_jugador(id_jugador="J1", nombre="Agente Inteligente 1", humano=False, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
         r = make_ronda(id_ronda="R1", jugador=j, numero=1, partida=p)
@@ -280,10 +283,10 @@ class TestRegistrarMovimientos:
             ]
         }
 
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
 
-    def test_registrar_movimientos_falla_origen_igual_destino(self, api_client, make_jugador, make_partida, make_ronda, make_pieza):
+    def test_registrar_movimientos_falla_origen_igual_destino(self, api_client, make_jugador, make_partida, make_ronda, make_pieza, version_de):
         j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
         r = make_ronda(id_ronda="R1", jugador=j, numero=1, partida=p)
@@ -303,10 +306,10 @@ class TestRegistrarMovimientos:
             ]
         }
 
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
 
-    def test_registrar_movimientos_falla_cadena_con_salto_invalido(self, api_client, make_jugador, make_partida, make_ronda, make_pieza):
+    def test_registrar_movimientos_falla_cadena_con_salto_invalido(self, api_client, make_jugador, make_partida, make_ronda, make_pieza, version_de):
         j = make_jugador(id_jugador="J1", nombre="Agente Inteligente 1", humano=False, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
         r = make_ronda(id_ronda="R1", jugador=j, numero=1, partida=p)
@@ -335,11 +338,12 @@ class TestRegistrarMovimientos:
             ]
         }
 
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
 
     def test_registrar_movimientos_ok_salto_en_cadena_actualiza_pieza_y_crea_movimientos(
-        self, api_client, make_jugador, make_partida, make_ronda, make_pieza
+        self, api_client, make_jugador, make_partida, make_ronda, make_pieza,
+        version_de,
     ):
         j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
@@ -371,15 +375,20 @@ class TestRegistrarMovimientos:
             ]
         }
 
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 201
         assert Movimiento.objects.filter(partida=p).count() == 2
+        assert list(Movimiento.objects.filter(partida=p).order_by("ply").values_list("destino", "ply")) == [
+            ("2-4", 1),
+            ("4-4", 2),
+        ]
 
         pieza.refresh_from_db()
         assert pieza.posicion == "4-4"
 
     def test_registrar_movimientos_ok_salto_encadenado_en_un_solo_movimiento_humano(
-        self, api_client, make_jugador, make_partida, make_ronda, make_pieza
+        self, api_client, make_jugador, make_partida, make_ronda, make_pieza,
+        version_de,
     ):
         j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
@@ -402,14 +411,95 @@ class TestRegistrarMovimientos:
             ]
         }
 
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 201
         assert Movimiento.objects.filter(partida=p).count() == 2
 
         pieza.refresh_from_db()
         assert pieza.posicion == "4-4"
 
-    def test_registrar_movimientos_falla_si_ronda_finalizada(self, api_client, make_jugador, make_partida, make_ronda, make_pieza):
+    def test_registrar_movimientos_cadena_que_vuelve_al_origen_conserva_el_tablero(
+        self, api_client, make_jugador, make_partida, make_ronda, make_pieza,
+        version_de,
+    ):
+        j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
+        p = make_partida(id_partida="P1", numero_jugadores=2)
+        t = make_ronda(id_ronda="R1", jugador=j, numero=1, partida=p)
+
+        pieza = make_pieza(id_pieza="X1", jugador=j, partida=p, posicion="0-4")
+        make_pieza(id_pieza="B1", jugador=j, partida=p, posicion="1-4")
+
+        payload = {
+            "movimientos": [
+                {
+                    "jugador_id": j.id_jugador,
+                    "ronda_id": t.id_ronda,
+                    "partida_id": p.id_partida,
+                    "pieza_id": pieza.id_pieza,
+                    "origen": origen,
+                    "destino": destino,
+                }
+                for origen, destino in (("0-4", "2-4"), ("2-4", "0-4"))
+            ]
+        }
+
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
+        assert res.status_code == 201
+
+        p.refresh_from_db()
+        assert occupied_cells(p.tablero) == {"0-4", "1-4"}
+        pieza.refresh_from_db()
+        assert pieza.posicion == "0-4"
+
+    def test_registrar_movimientos_cadena_larga_usa_consultas_constantes(
+        self, api_client, make_jugador, make_partida, make_ronda, make_pieza,
+        version_de,
+    ):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from game.board import sync_board
+
+        j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
+        p = make_partida(id_partida="P1", numero_jugadores=2)
+        pieza = make_pieza(id_pieza="X1", jugador=j, partida=p, posicion="0-4")
+        for i, pos in enumerate(["1-4", "3-4", "5-4", "7-4"], start=1):
+            make_pieza(id_pieza=f"B{i}", jugador=j, partida=p, posicion=pos)
+        sync_board(p.id_partida)
+
+        def registrar(ronda_id, cadena):
+            return api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {
+                "version": version_de(p.id_partida),
+                "movimientos": [
+                    {
+                        "jugador_id": j.id_jugador,
+                        "ronda_id": ronda_id,
+                        "partida_id": p.id_partida,
+                        "pieza_id": pieza.id_pieza,
+                        "origen": origen,
+                        "destino": destino,
+                    }
+                    for origen, destino in zip(cadena, cadena[1:])
+                ]
+            }, format="json")
+
+        make_ronda(id_ronda="R1", jugador=j, numero=1, partida=p)
+        with CaptureQueriesContext(connection) as corta:
+            assert registrar("R1", ["0-4", "2-4"]).status_code == 201
+        Ronda.objects.filter(id_ronda="R1").delete()
+        Pieza.objects.filter(id_pieza="X1").update(posicion="0-4")
+        sync_board(p.id_partida)
+
+        make_ronda(id_ronda="R2", jugador=j, numero=2, partida=p)
+        with CaptureQueriesContext(connection) as larga:
+            assert registrar("R2", ["0-4", "2-4", "4-4", "6-4", "8-4"]).status_code == 201
+
+        assert len(larga.captured_queries) == len(corta.captured_queries)
+        assert Movimiento.objects.filter(ronda_id="R2").count() == 4
+        pieza.refresh_from_db()
+        assert pieza.posicion == "8-4"
+
+    def test_registrar_movimientos_falla_si_ronda_finalizada(self, api_client, make_jugador, make_partida, make_ronda, make_pieza, version_de):
         from django.utils import timezone
         from datetime import timedelta
 
@@ -430,10 +520,10 @@ class TestRegistrarMovimientos:
                 }
             ]
         }
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
 
-    def test_registrar_movimientos_falla_si_pieza_no_pertenece_jugador(self, api_client, make_jugador, make_partida, make_ronda, make_pieza):
+    def test_registrar_movimientos_falla_si_pieza_no_pertenece_jugador(self, api_client, make_jugador, make_partida, make_ronda, make_pieza, version_de):
         j1 = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
         j2 = make_jugador(id_jugador="J2", nombre="Beto", humano=True, numero=2)
         p = make_partida(id_partida="P1", numero_jugadores=2)
@@ -453,10 +543,10 @@ class TestRegistrarMovimientos:
             ]
         }
 
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
 
-    def test_registrar_movimientos_falla_si_jugador_no_existe(self, api_client, make_jugador, make_partida, make_ronda, make_pieza):
+    def test_registrar_movimientos_falla_si_jugador_no_existe(self, api_client, make_jugador, make_partida, make_ronda, make_pieza, version_de):
         j1 = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
         t = make_ronda(id_ronda="R1", jugador=j1, numero=1, partida=p)
@@ -475,11 +565,11 @@ class TestRegistrarMovimientos:
             ]
         }
 
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
         assert "Jugador no encontrado" in str(res.data)
 
-    def test_registrar_movimientos_falla_si_pieza_no_existe(self, api_client, make_jugador, make_partida, make_ronda):
+    def test_registrar_movimientos_falla_si_pieza_no_existe(self, api_client, make_jugador, make_partida, make_ronda, version_de):
         j1 = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
         t = make_ronda(id_ronda="R1", jugador=j1, numero=1, partida=p)
@@ -497,11 +587,11 @@ class TestRegistrarMovimientos:
             ]
         }
 
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
         assert "Pieza no encontrada" in str(res.data)
 
-    def test_registrar_movimientos_falla_si_ronda_no_existe(self, api_client, make_jugador, make_partida, make_pieza, make_ronda):
+    def test_registrar_movimientos_falla_si_ronda_no_existe(self, api_client, make_jugador, make_partida, make_pieza, make_ronda, version_de):
         j1 = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
         make_ronda(id_ronda="R1", jugador=j1, numero=1, partida=p)
@@ -520,11 +610,11 @@ class TestRegistrarMovimientos:
             ]
         }
 
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
         assert "Ronda no encontrada" in str(res.data)
 
-    def test_registrar_movimientos_falla_si_destino_fuera_del_tablero(self, api_client, make_jugador, make_partida, make_ronda, make_pieza):
+    def test_registrar_movimientos_falla_si_destino_fuera_del_tablero(self, api_client, make_jugador, make_partida, make_ronda, make_pieza, version_de):
         j1 = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
         p = make_partida(id_partida="P1", numero_jugadores=2)
         t = make_ronda(id_ronda="R1", jugador=j1, numero=1, partida=p)
@@ -543,7 +633,7 @@ class TestRegistrarMovimientos:
             ]
         }
 
-        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", payload, format="json")
+        res = api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {**payload, "version": version_de(p.id_partida)}, format="json")
         assert res.status_code == 400
 
 
@@ -562,5 +652,102 @@ class TestMovimientosQueryParams:
 
         res = api_client.get(f"/api/movimientos/?ronda_id={t1.id_ronda}")
         assert res.status_code == 200
-        assert len(res.data) == 1
-        assert res.data[0]["ronda"] == t1.id_ronda
+        assert len(res.data["results"]) == 1
+        assert res.data["results"][0]["ronda"] == t1.id_ronda
+
+    def test_list_movimientos_por_partida_desde_ply(self, api_client, make_jugador, make_partida, make_ronda, make_pieza, make_movimiento):
+        j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
+        p = make_partida(id_partida="P1", numero_jugadores=2)
+
+        t1 = make_ronda(id_ronda="R1", jugador=j, numero=1, partida=p)
+        t2 = make_ronda(id_ronda="R2", jugador=j, numero=2, partida=p)
+        pieza = make_pieza(id_pieza="X1", jugador=j, partida=p, posicion="0-4")
+
+        make_movimiento(id_movimiento="M_B", jugador=j, pieza=pieza, ronda=t1, partida=p, origen="0-4", destino="1-4")
+        make_movimiento(id_movimiento="M_A", jugador=j, pieza=pieza, ronda=t2, partida=p, origen="1-4", destino="2-4")
+
+        res = api_client.get(f"/api/movimientos/?partida_id={p.id_partida}&desde_ply=1")
+        assert res.status_code == 200
+        assert [m["id_movimiento"] for m in res.data["results"]] == ["M_A"]
+        assert res.data["results"][0]["ply"] == 2
+
+        res = api_client.get(f"/api/movimientos/?partida_id={p.id_partida}&desde_ply=x")
+        assert res.status_code == 400
+
+    def test_list_movimientos_pagina_por_cursor_con_tope(self, api_client, make_jugador, make_partida, make_ronda, make_pieza, make_movimiento):
+        j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
+        p = make_partida(id_partida="P1", numero_jugadores=2)
+        t = make_ronda(id_ronda="R1", jugador=j, numero=1, partida=p)
+        pieza = make_pieza(id_pieza="X1", jugador=j, partida=p, posicion="0-4")
+        for i in range(5):
+            make_movimiento(id_movimiento=f"M{i}", jugador=j, pieza=pieza, ronda=t, partida=p, origen="0-4", destino="1-4")
+
+        vistos = []
+        url = f"/api/movimientos/?partida_id={p.id_partida}&jugador_id={j.id_jugador}&hasta_ply=4&page_size=3"
+        while url:
+            res = api_client.get(url)
+            assert res.status_code == 200
+            vistos += [m["ply"] for m in res.data["results"]]
+            url = res.data["next"]
+        assert vistos == [1, 2, 3, 4]
+
+        res = api_client.get(f"/api/movimientos/?partida_id={p.id_partida}&orden=desc&page_size=100000")
+        assert [m["ply"] for m in res.data["results"]] == [5, 4, 3, 2, 1]
+        assert res.data["next"] is None
+
+
+@pytest.mark.django_db
+def test_list_rondas_por_cursor_desempata_por_id(api_client, make_jugador, make_partida, make_ronda):
+    from django.utils import timezone
+    from game.models import Ronda
+
+    j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
+    p = make_partida(id_partida="P1", numero_jugadores=2)
+    for id_ronda in ("R_c", "R_a", "R_d", "R_b"):
+        make_ronda(id_ronda=id_ronda, jugador=j, numero=1, partida=p)
+    Ronda.objects.filter(partida=p).update(inicio=timezone.now())
+
+    vistos = []
+    url = f"/api/rondas/?partida_id={p.id_partida}&page_size=1"
+    while url:
+        res = api_client.get(url)
+        assert res.status_code == 200
+        vistos += [r["id_ronda"] for r in res.data["results"]]
+        url = res.data["next"]
+    assert vistos == ["R_a", "R_b", "R_c", "R_d"]
+
+    res = api_client.get(f"/api/rondas/?partida_id={p.id_partida}&orden=desc")
+    assert [r["id_ronda"] for r in res.data["results"]] == ["R_d", "R_c", "R_b", "R_a"]
+
+
+@pytest.mark.django_db
+def test_registrar_movimientos_version_obsoleta_devuelve_409(api_client, make_jugador, make_partida, make_ronda, make_pieza):
+    from game.models import Partida
+
+    j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
+    p = make_partida(id_partida="P1", numero_jugadores=2)
+    make_ronda(id_ronda="R1", jugador=j, numero=1, partida=p)
+    make_pieza(id_pieza="X1", jugador=j, partida=p, posicion="0-4")
+
+    def registrar(destino, version):
+        return api_client.post(f"/api/partidas/{p.id_partida}/registrar_movimientos/", {
+            "version": version,
+            "movimientos": [{
+                "jugador_id": "J1", "ronda_id": "R1", "partida_id": "P1",
+                "pieza_id": "X1", "origen": "0-4", "destino": destino,
+            }],
+        }, format="json")
+
+    # Un error de validación no consume la versión
+    assert registrar("0-4", 0).status_code == 400
+    assert Partida.objects.get(pk="P1").version == 0
+
+    res = registrar("1-4", 0)
+    assert res.status_code == 201
+    assert res.json()["version"] == 1
+
+    # Reintento (o segunda pestaña) con la versión antigua
+    res2 = registrar("1-4", 0)
+    assert res2.status_code == 409
+    assert res2.json()["version"] == 1
+    assert Movimiento.objects.filter(partida_id="P1").count() == 1
@@ -1,4 +1,6 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from game.models import AgenteInteligente, Chatbot, Jugador, JugadorPartida, Movimiento, Partida, Pieza, Ronda
 
@@ -126,6 +128,25 @@ def test_start_game_crea_piezas_iniciales_10_por_jugador(api_client):
     assert Pieza.objects.filter(partida_id=partida_id).count() == 20
 
 
+@pytest.mark.django_db
+def test_start_game_seis_jugadores_inserta_en_bloque(api_client):
+    payload = {
+        "numero_jugadores": 6,
+        "jugadores": [{"tipo": "humano" if i % 2 else "ia", "numero": i + 1} for i in range(6)],
+    }
+    with CaptureQueriesContext(connection) as ctx:
+        res = _start_game(api_client, payload)
+    assert res.status_code == 201
+    inserts = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+    # Jugador, AgenteInteligente, Partida, JugadorPartida, Pieza y Ronda
+    assert len(inserts) == 6
+
+    partida = Partida.objects.get(id_partida=res.json()["id_partida"])
+    assert Pieza.objects.filter(partida=partida).count() == 60
+    assert len(partida.tablero) == 121 and partida.tablero.count("0") == 121 - 60
+    assert sorted(set(partida.tablero) - {"0"}) == ["1", "2", "3", "4", "5", "6"]
+
+
 @pytest.mark.django_db
 def test_start_game_crea_ia_con_nivel_correcto(api_client):
     res = _start_game(api_client)
@@ -286,6 +307,7 @@ def test_crear_movimiento_no_rechaza_destino_ocupado_en_otra_partida(api_client,
         "partida": partida1.id_partida,
         "origen": "0-0",
         "destino": "0-1",
+        "version": partida1.version,
     }
     res = api_client.post("/api/movimientos/", payload, format="json")
     assert res.status_code == 201
@@ -375,24 +397,24 @@ def test_crear_participacion_rechaza_jugador_duplicado_en_partida(api_client, ma
 
 
 @pytest.mark.django_db
-def test_accion_actualizar_posiciones_iniciales_ok(api_client):
+def test_accion_actualizar_posiciones_iniciales_ok(api_client, version_de):
     res = _start_game(api_client)
     assert res.status_code == 201
     partida_id = res.json()["id_partida"]
 
-    res2 = api_client.post(f"/api/partidas/{partida_id}/actualizar_posiciones_iniciales/", {}, format="json")
+    res2 = api_client.post(f"/api/partidas/{partida_id}/actualizar_posiciones_iniciales/", {"version": version_de(partida_id)}, format="json")
     assert res2.status_code == 200
     data2 = res2.json()
     assert data2.get("piezas_actualizadas") == 20
 
 
 @pytest.mark.django_db
-def test_accion_end_game_finaliza_partida_y_ronda(api_client):
+def test_accion_end_game_finaliza_partida_y_ronda(api_client, version_de):
     res = _start_game(api_client)
     assert res.status_code == 201
     partida_id = res.json()["id_partida"]
 
-    res2 = api_client.post(f"/api/partidas/{partida_id}/end_game/", {}, format="json")
+    res2 = api_client.post(f"/api/partidas/{partida_id}/end_game/", {"version": version_de(partida_id)}, format="json")
     assert res2.status_code == 200
     data2 = res2.json()
     assert data2["estado"] == "FINALIZADA"
@@ -405,7 +427,52 @@ def test_accion_end_game_finaliza_partida_y_ronda(api_client):
 
 
 @pytest.mark.django_db
-def test_accion_avanzar_ronda_crea_nueva_ronda(api_client):
+def test_doble_envio_con_la_misma_version_aplica_solo_uno(api_client):
+    data = _start_game(api_client).json()
+    partida_id = data["id_partida"]
+
+    # El cliente reenvía tal cual la misma petición (doble clic, reintento, otra pestaña)
+    parche = {"tiempo_sobrante": 30, "version": data["version"]}
+    respuestas = [api_client.patch(f"/api/partidas/{partida_id}/", parche, format="json") for _ in range(2)]
+    assert [r.status_code for r in respuestas] == [200, 409]
+    assert respuestas[0].json()["version"] == respuestas[1].json()["version"] == data["version"] + 1
+
+    fin = {"version": data["version"] + 1}
+    respuestas = [api_client.post(f"/api/partidas/{partida_id}/end_game/", fin, format="json") for _ in range(2)]
+    assert [r.status_code for r in respuestas] == [200, 409]
+    assert Partida.objects.get(pk=partida_id).version == data["version"] + 2
+
+
+@pytest.mark.django_db
+def test_escrituras_sin_version_responden_428(api_client):
+    data = _start_game(api_client).json()
+    partida_id = data["id_partida"]
+    jugador_id = data["participantes"][0]["jugador"]
+    pieza = Pieza.objects.filter(partida_id=partida_id, jugador_id=jugador_id).first()
+    ronda = Ronda.objects.get(partida_id=partida_id, fin__isnull=True)
+
+    respuestas = [
+        api_client.post(f"/api/partidas/{partida_id}/end_game/", {}, format="json"),
+        api_client.patch(f"/api/partidas/{partida_id}/", {"tiempo_sobrante": 30}, format="json"),
+        api_client.post("/api/movimientos/", {
+            "id_movimiento": "M_SIN_VERSION", "jugador": jugador_id, "pieza": pieza.id_pieza,
+            "ronda": ronda.id_ronda, "partida": partida_id, "origen": pieza.posicion, "destino": pieza.posicion,
+        }, format="json"),
+        api_client.post("/api/piezas/", {
+            "id_pieza": "X_SIN_VERSION", "tipo": pieza.tipo, "posicion": "4-8", "jugador": jugador_id, "partida": partida_id,
+        }, format="json"),
+    ]
+
+    assert [r.status_code for r in respuestas] == [428] * 4
+    assert all(r.json()["version"] == data["version"] for r in respuestas)
+    partida = Partida.objects.get(pk=partida_id)
+    assert (partida.estado, partida.version) == (data["estado"], data["version"])
+    assert not Movimiento.objects.filter(partida_id=partida_id).exists()
+    assert not Pieza.objects.filter(pk="X_SIN_VERSION").exists()
+
+
+@pytest.mark.django_db
+def test_accion_avanzar_ronda_crea_nueva_ronda(api_client, version_de):
     res = _start_game(api_client)
     assert res.status_code == 201
     data = res.json()
@@ -425,7 +492,7 @@ def test_accion_avanzar_ronda_crea_nueva_ronda(api_client):
             "jugador_id": jugador_ids[1],
         },
     }
-    res2 = api_client.post(f"/api/partidas/{partida_id}/avanzar_ronda/", payload, format="json")
+    res2 = api_client.post(f"/api/partidas/{partida_id}/avanzar_ronda/", {**payload, "version": version_de(partida_id)}, format="json")
     assert res2.status_code == 201
     data2 = res2.json()
     assert data2["nueva_ronda"]["numero"] == 1
@@ -433,7 +500,7 @@ def test_accion_avanzar_ronda_crea_nueva_ronda(api_client):
 
 
 @pytest.mark.django_db
-def test_accion_avanzar_ronda_rechaza_jugador_no_esperado(api_client):
+def test_accion_avanzar_ronda_rechaza_jugador_no_esperado(api_client, version_de):
     res = _start_game(api_client)
     assert res.status_code == 201
     data = res.json()
@@ -454,13 +521,13 @@ def test_accion_avanzar_ronda_rechaza_jugador_no_esperado(api_client):
         },
     }
 
-    res2 = api_client.post(f"/api/partidas/{partida_id}/avanzar_ronda/", payload, format="json")
+    res2 = api_client.post(f"/api/partidas/{partida_id}/avanzar_ronda/", {**payload, "version": version_de(partida_id)}, format="json")
     assert res2.status_code == 400
     assert "jugador_id" in str(res2.data)
 
 
 @pytest.mark.django_db
-def test_accion_avanzar_ronda_rechaza_numero_tampered(api_client):
+def test_accion_avanzar_ronda_rechaza_numero_tampered(api_client, version_de):
     res = _start_game(api_client)
     assert res.status_code == 201
     data = res.json()
@@ -481,13 +548,13 @@ def test_accion_avanzar_ronda_rechaza_numero_tampered(api_client):
         },
     }
 
-    res2 = api_client.post(f"/api/partidas/{partida_id}/avanzar_ronda/", payload, format="json")
+    res2 = api_client.post(f"/api/partidas/{partida_id}/avanzar_ronda/", {**payload, "version": version_de(partida_id)}, format="json")
     assert res2.status_code == 400
     assert "numero" in str(res2.data)
 
 
 @pytest.mark.django_db
-def test_accion_avanzar_ronda_rechaza_jugador_fuera_de_partida(api_client, make_jugador):
+def test_accion_avanzar_ronda_rechaza_jugador_fuera_de_partida(api_client, make_jugador, version_de):
     res = _start_game(api_client)
     assert res.status_code == 201
     data = res.json()
@@ -510,12 +577,12 @@ def test_accion_avanzar_ronda_rechaza_jugador_fuera_de_partida(api_client, make_
         },
     }
 
-    res2 = api_client.post(f"/api/partidas/{partida_id}/avanzar_ronda/", payload, format="json")
+    res2 = api_client.post(f"/api/partidas/{partida_id}/avanzar_ronda/", {**payload, "version": version_de(partida_id)}, format="json")
     assert res2.status_code == 400
 
 
 @pytest.mark.django_db
-def test_accion_avanzar_ronda_rechaza_old_round_de_otra_partida(api_client):
+def test_accion_avanzar_ronda_rechaza_old_round_de_otra_partida(api_client, version_de):
     res = _start_game(api_client)
     assert res.status_code == 201
     data = res.json()
@@ -536,7 +603,7 @@ def test_accion_avanzar_ronda_rechaza_old_round_de_otra_partida(api_client):
         },
     }
 
-    res2 = api_client.post(f"/api/partidas/{partida_id}/avanzar_ronda/", payload, format="json")
+    res2 = api_client.post(f"/api/partidas/{partida_id}/avanzar_ronda/", {**payload, "version": version_de(partida_id)}, format="json")
     assert res2.status_code == 400
     assert "oldRound.partida_id" in str(res2.data)
 
@@ -621,3 +688,391 @@ def test_chatbot_for_context_devuelve_historial_si_existe(api_client, make_jugad
     assert data["chatbot_id"] == cb.id
     assert isinstance(data["conversaciones"], list)
     assert data["conversaciones"][0]["mensaje"] == "hola"
+
+
+@pytest.mark.django_db
+def test_jugar_turno_ia_aplica_jugada_y_abre_siguiente_ronda(api_client, version_de):
+    res = _start_game(api_client, {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "humano", "nombre": "Ana", "numero": 2},
+        ],
+    })
+    data = res.json()
+    partida_id = data["id_partida"]
+    ia_id, humano_id = [p["jugador"] for p in data["participantes"]]
+
+    res2 = api_client.post(f"/api/partidas/{partida_id}/jugar_turno_ia/", {"version": version_de(partida_id)}, format="json")
+    assert res2.status_code == 201
+    out = res2.json()
+
+    jugada = out["movimiento"]
+    assert out["registrados"][0]["origen"] == jugada["origen"]
+    assert out["registrados"][-1]["destino"] == jugada["destino"]
+    assert Movimiento.objects.filter(partida_id=partida_id).count() == len(out["registrados"])
+    assert Pieza.objects.get(id_pieza=jugada["pieza_id"]).posicion == jugada["destino"]
+
+    assert Ronda.objects.get(id_ronda=out["ronda_actualizada"]["id_ronda"]).fin is not None
+    nueva = Ronda.objects.get(partida_id=partida_id, fin__isnull=True)
+    assert nueva.jugador_id == humano_id
+    assert nueva.numero == 1
+    assert out["nueva_ronda"]["id_ronda"] == nueva.id_ronda
+
+    # El turno ya no es del agente
+    res3 = api_client.post(f"/api/partidas/{partida_id}/jugar_turno_ia/", {"version": version_de(partida_id)}, format="json")
+    assert res3.status_code == 400
+    assert Ronda.objects.filter(partida_id=partida_id, jugador_id=ia_id).count() == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("valor, esperado", [("false", False), ("False", False), (False, False), ("true", True), (True, True)])
+def test_jugar_turno_ia_interpreta_permitir_simples(api_client, monkeypatch, valor, esperado, version_de):
+    import game.views
+
+    res = _start_game(api_client, {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "humano", "nombre": "Ana", "numero": 2},
+        ],
+    })
+    partida_id = res.json()["id_partida"]
+
+    recibido = []
+    original = game.views.suggest_move_cached
+
+    def espiar(*args, **kwargs):
+        recibido.append(kwargs["allow_simple"])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(game.views, "suggest_move_cached", espiar)
+    res2 = api_client.post(f"/api/partidas/{partida_id}/jugar_turno_ia/", {"version": version_de(partida_id), "permitir_simples": valor}, format="json")
+    assert res2.status_code == 201
+    assert recibido == [esperado]
+
+
+@pytest.mark.django_db
+def test_simular_juega_turnos_y_guarda_en_bloque(api_client, version_de):
+    res = _start_game(api_client, {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+    })
+    partida_id = res.json()["id_partida"]
+
+    res2 = api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": 5}, format="json")
+    assert res2.status_code == 201
+    out = res2.json()
+
+    assert len(out["turnos"]) == 5
+    assert out["ganador"] is None
+    assert Ronda.objects.filter(partida_id=partida_id).count() == 6
+    assert Ronda.objects.filter(partida_id=partida_id, fin__isnull=True).get().id_ronda == out["ronda_activa"]
+    pasos = sum(len(t["secuencia"]) for t in out["turnos"])
+    assert Movimiento.objects.filter(partida_id=partida_id).count() == pasos
+    ultimo = out["turnos"][-1]
+    assert Pieza.objects.get(id_pieza=ultimo["pieza_id"]).posicion == ultimo["destino"]
+
+    # Se puede seguir simulando desde donde quedó
+    res3 = api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": 2}, format="json")
+    assert res3.status_code == 201
+    assert Ronda.objects.filter(partida_id=partida_id).count() == 8
+
+
+@pytest.mark.django_db
+def test_simular_guarda_los_instantes_de_cada_turno(api_client, version_de):
+    partida_id = _start_game(api_client, {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+    }).json()["id_partida"]
+    assert api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": 6}, format="json").status_code == 201
+
+    rondas = list(Ronda.objects.filter(partida_id=partida_id).order_by("inicio"))
+    assert len(rondas) == 7
+    # Cada ronda empieza cuando termina la anterior
+    assert all(a.fin == b.inicio and a.fin > a.inicio for a, b in zip(rondas, rondas[1:]))
+    assert rondas[-1].fin is None
+
+
+@pytest.mark.django_db
+def test_simular_sin_turnos_se_corta_por_tiempo(api_client, settings, version_de):
+    settings.SIMULATION_TIME_BUDGET = 0
+    partida_id = _start_game(api_client, {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+    }).json()["id_partida"]
+
+    out = api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id)}, format="json").json()
+    assert len(out["turnos"]) == 1
+    assert out["tiempo_agotado"] is True
+    assert Ronda.objects.filter(partida_id=partida_id, fin__isnull=True).get().id_ronda == out["ronda_activa"]
+
+
+@pytest.mark.django_db
+def test_simular_calcula_los_turnos_sin_transaccion_abierta(api_client, monkeypatch):
+    from game.ai.max_agent import MaxHeuristicAgent
+
+    partida_id = _start_game(api_client, {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+    }).json()["id_partida"]
+    version = Partida.objects.get(pk=partida_id).version
+    bloques = len(connection.atomic_blocks)
+    abiertos = []
+    original = MaxHeuristicAgent.choose_move
+
+    def espiar(self, *args, **kwargs):
+        abiertos.append(len(connection.atomic_blocks) - bloques)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(MaxHeuristicAgent, "choose_move", espiar)
+    res = api_client.post(f"/api/partidas/{partida_id}/simular/", {"turnos": 3, "version": version}, format="json")
+    assert res.status_code == 201
+    assert res.json()["version"] == version + 1
+    assert abiertos == [0, 0, 0]
+
+
+@pytest.mark.django_db
+def test_simular_responde_409_si_la_partida_cambia_mientras_simula(api_client, monkeypatch, version_de):
+    from django.db.models import F
+    from game.ai.max_agent import MaxHeuristicAgent
+
+    partida_id = _start_game(api_client, {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+    }).json()["id_partida"]
+    version = Partida.objects.get(pk=partida_id).version
+    original = MaxHeuristicAgent.choose_move
+
+    def otra_peticion(self, *args, **kwargs):
+        Partida.objects.filter(pk=partida_id).update(version=F("version") + 1)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(MaxHeuristicAgent, "choose_move", otra_peticion)
+    res = api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": 2}, format="json")
+    assert res.status_code == 409
+    assert res.json()["version"] == version + 2
+    assert Ronda.objects.filter(partida_id=partida_id).count() == 1
+    assert not Movimiento.objects.filter(partida_id=partida_id).exists()
+
+
+@pytest.mark.django_db
+def test_simular_rechaza_partidas_con_humanos(api_client, version_de):
+    partida_id = _start_game(api_client).json()["id_partida"]
+    res = api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": 1}, format="json")
+    assert res.status_code == 400
+
+
+@pytest.mark.django_db
+def test_sincronizar_devuelve_delta_y_304_si_no_hay_cambios(api_client, django_assert_num_queries, version_de):
+    res = _start_game(api_client, {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+    })
+    partida_id = res.json()["id_partida"]
+    assert api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": 3}, format="json").status_code == 201
+    total = Movimiento.objects.filter(partida_id=partida_id).count()
+
+    res = api_client.get(f"/api/partidas/{partida_id}/sincronizar/")
+    assert res.status_code == 200
+    data = res.json()
+    assert len(data["movimientos"]) == total
+    assert data["ultimo_ply"] == total
+    assert len(data["tablero"]) == 121
+    assert data["ronda_actual"]["id_ronda"] == Ronda.objects.get(partida_id=partida_id, fin__isnull=True).id_ronda
+
+    res = api_client.get(f"/api/partidas/{partida_id}/sincronizar/?desde_ply={total - 1}")
+    assert [m["ply"] for m in res.json()["movimientos"]] == [total]
+
+    # Sin cambios: 304 leyendo solo la fila de la partida
+    etag = res["ETag"]
+    with django_assert_num_queries(1):
+        res = api_client.get(f"/api/partidas/{partida_id}/sincronizar/?desde_ply={total - 1}", HTTP_IF_NONE_MATCH=etag)
+    assert res.status_code == 304
+
+    assert api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": 1}, format="json").status_code == 201
+    res = api_client.get(f"/api/partidas/{partida_id}/sincronizar/?desde_ply={total - 1}", HTTP_IF_NONE_MATCH=etag)
+    assert res.status_code == 200
+    assert res["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_eventos_long_poll_publica_jugadas_y_recurre_a_bd(api_client, django_capture_on_commit_callbacks, version_de):
+    res = _start_game(api_client, {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+    })
+    partida_id = res.json()["id_partida"]
+    version = api_client.get(f"/api/partidas/{partida_id}/eventos/").json()["version"]
+
+    # Sin cambios: agota la espera y no devuelve eventos
+    res = api_client.get(f"/api/partidas/{partida_id}/eventos/?version={version}&timeout=0")
+    assert res.status_code == 200
+    assert res.json() == {"version": version, "eventos": []}
+
+    # Jugada publicada en este proceso: llegan los eventos de movimiento y de ronda
+    with django_capture_on_commit_callbacks(execute=True):
+        assert api_client.post(f"/api/partidas/{partida_id}/jugar_turno_ia/", {"version": version_de(partida_id)}, format="json").status_code == 201
+    out = api_client.get(f"/api/partidas/{partida_id}/eventos/?version={version}&timeout=5").json()
+    assert out["version"] == version + 1
+    assert [e["tipo"] for e in out["eventos"]] == ["movimiento_registrado", "ronda_avanzada"]
+    plies = [m["ply"] for m in out["eventos"][0]["movimientos"]]
+
+    # Cambio sin evento local (p. ej. otro proceso): se sincroniza desde la base de datos
+    assert api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": 1}, format="json").status_code == 201
+    out = api_client.get(
+        f"/api/partidas/{partida_id}/eventos/?version={version + 1}&desde_ply={plies[-1]}&timeout=5"
+    ).json()
+    assert out["version"] == version + 2
+    (evento,) = out["eventos"]
+    assert evento["tipo"] == "sincronizacion"
+    assert evento["movimientos"][0]["ply"] == plies[-1] + 1
+    assert evento["ronda_actual"]["id_ronda"] == Ronda.objects.get(partida_id=partida_id, fin__isnull=True).id_ronda
+
+
+@pytest.mark.django_db
+def test_eventos_limita_las_esperas_y_libera_sus_condiciones(api_client, settings):
+    import time
+
+    from game import events
+
+    partida_id = _start_game(api_client, {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+    }).json()["id_partida"]
+    version = Partida.objects.get(pk=partida_id).version
+    events.reset()
+
+    # Al salir la última espera de una partida sin buffer no queda su condición
+    settings.EVENTOS_INTERVALO_DB = 0.01
+    assert events.wait_for_events(partida_id, version, timeout=0.05) == (version, [])
+    assert partida_id not in events._conditions
+    assert partida_id not in events._esperando
+
+    # Por encima del límite de esperas se responde al momento
+    settings.EVENTOS_MAX_ESPERAS = 0
+    inicio = time.monotonic()
+    res = api_client.get(f"/api/partidas/{partida_id}/eventos/?version={version}&timeout=5")
+    assert res.json() == {"version": version, "eventos": []}
+    assert time.monotonic() - inicio < 1
+
+
+@pytest.mark.django_db
+def test_simular_publica_eventos_y_programa_el_precalculo(api_client, monkeypatch, django_capture_on_commit_callbacks, version_de):
+    from game import events, views
+
+    programadas = []
+    monkeypatch.setattr(views, "schedule_suggestion", lambda partida_id, jugador_id, **kw: programadas.append(jugador_id))
+    partida_id = _start_game(api_client, {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+    }).json()["id_partida"]
+    version = Partida.objects.get(pk=partida_id).version
+    events.reset()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        out = api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": 3}, format="json").json()
+
+    activa = Ronda.objects.get(pk=out["ronda_activa"])
+    assert programadas == [activa.jugador_id]
+    # Los clientes en espera reciben la simulación sin recurrir a la base de datos
+    res = api_client.get(f"/api/partidas/{partida_id}/eventos/?version={version}&timeout=0").json()
+    assert res["version"] == version + 1
+    movimientos, ronda = res["eventos"]
+    assert movimientos["tipo"] == "movimiento_registrado"
+    assert len(movimientos["movimientos"]) == sum(len(t["secuencia"]) for t in out["turnos"])
+    assert ronda["tipo"] == "ronda_avanzada"
+    assert ronda["nueva_ronda"]["id_ronda"] == out["ronda_activa"]
+
+
+@pytest.mark.django_db
+def test_lecturas_usan_consultas_constantes_sea_cual_sea_la_longitud(api_client, version_de):
+    res = _start_game(api_client, {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+    })
+    partida_id = res.json()["id_partida"]
+    urls = [
+        f"/api/partidas/{partida_id}/",
+        f"/api/rondas/?partida_id={partida_id}",
+        f"/api/movimientos/?partida_id={partida_id}",
+        f"/api/piezas/?partida_id={partida_id}",
+    ]
+
+    def contar():
+        cuentas = []
+        for url in urls:
+            with CaptureQueriesContext(connection) as ctx:
+                assert api_client.get(url).status_code == 200
+            cuentas.append(len(ctx.captured_queries))
+        return cuentas
+
+    assert api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": 2}, format="json").status_code == 201
+    corta = contar()
+    assert api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": 10}, format="json").status_code == 201
+    assert contar() == corta
+
+
+@pytest.mark.django_db
+def test_rematch_reinicia_la_partida_con_sentencias_constantes(api_client, version_de):
+    res = _start_game(api_client, {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+    })
+    partida_id = res.json()["id_partida"]
+    inicial = dict(Pieza.objects.filter(partida_id=partida_id).values_list("id_pieza", "posicion"))
+    tablero_inicial = Partida.objects.get(pk=partida_id).tablero
+
+    def revancha(turnos):
+        assert api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": turnos}, format="json").status_code == 201
+        with CaptureQueriesContext(connection) as ctx:
+            res = api_client.post(f"/api/partidas/{partida_id}/rematch/", {"version": version_de(partida_id)}, format="json")
+        assert res.status_code == 200
+        return res.json(), len(ctx.captured_queries)
+
+    _, corta = revancha(2)
+    out, larga = revancha(12)
+    assert corta == larga
+
+    partida = Partida.objects.get(pk=partida_id)
+    assert partida.estado == "EN_CURSO" and partida.fecha_fin is None
+    assert partida.tablero == tablero_inicial
+    assert dict(Pieza.objects.filter(partida_id=partida_id).values_list("id_pieza", "posicion")) == inicial
+    assert not Movimiento.objects.filter(partida_id=partida_id).exists()
+    assert list(Ronda.objects.filter(partida_id=partida_id).values_list("id_ronda", "numero", "fin")) == [
+        (f"R1_{partida_id}", 1, None)
+    ]
+    assert out["version"] == partida.version
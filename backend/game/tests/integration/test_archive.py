@@ -0,0 +1,107 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from game.models import Jugador, Movimiento, Partida, PartidaArchivada, Pieza, Ronda
+
+
+def _partida_terminada(api_client):
+    payload = {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+    }
+    partida_id = api_client.post("/api/partidas/start_game/", payload, format="json").json()["id_partida"]
+    assert api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": Partida.objects.get(pk=partida_id).version, "turnos": 4}, format="json").status_code == 201
+    assert api_client.post(f"/api/partidas/{partida_id}/end_game/", {"version": Partida.objects.get(pk=partida_id).version}, format="json").status_code == 200
+    return partida_id
+
+
+@pytest.mark.django_db
+def test_archive_games_mueve_la_partida_a_una_fila_y_el_detalle_la_reconstruye(api_client):
+    partida_id = _partida_terminada(api_client)
+    antes = api_client.get(f"/api/partidas/{partida_id}/").json()
+    en_curso = api_client.post("/api/partidas/start_game/", {
+        "numero_jugadores": 2,
+        "jugadores": [{"tipo": "ia", "numero": 1}, {"tipo": "ia", "numero": 2}],
+    }, format="json").json()["id_partida"]
+
+    out = StringIO()
+    call_command("archive_games", "--dry-run", stdout=out)
+    assert "1 partidas" in out.getvalue()
+    call_command("archive_games", stdout=StringIO())
+
+    assert PartidaArchivada.objects.filter(pk=partida_id).exists()
+    assert set(Partida.objects.values_list("pk", flat=True)) == {en_curso}
+    for modelo in (Movimiento, Ronda, Pieza):
+        assert not modelo.objects.filter(partida_id=partida_id).exists()
+    assert Jugador.objects.count() == 2
+
+    despues = api_client.get(f"/api/partidas/{partida_id}/").json()
+    assert despues["archivada"] is True
+    for campo in ("id_partida", "estado", "fecha_inicio", "fecha_fin", "numero_jugadores", "participantes"):
+        assert despues[campo] == antes[campo]
+    paso = lambda m: (m["ply"], m["ronda"], m["pieza"], m["jugador"], m["origen"], m["destino"])
+    assert [paso(m) for m in despues["movimientos"]] == [paso(m) for m in antes["movimientos"]]
+    assert [(r["id_ronda"], r["numero"], r["fin"], len(r["movimientos"])) for r in despues["rondas"]] == [
+        (r["id_ronda"], r["numero"], r["fin"], len(r["movimientos"])) for r in antes["rondas"]
+    ]
+
+
+@pytest.mark.django_db
+def test_end_game_archiva_si_esta_activado(api_client, settings, django_capture_on_commit_callbacks):
+    settings.ARCHIVE_ON_END_GAME = True
+    with django_capture_on_commit_callbacks(execute=True):
+        partida_id = _partida_terminada(api_client)
+    assert not Partida.objects.filter(pk=partida_id).exists()
+    assert api_client.get(f"/api/partidas/{partida_id}/").json()["archivada"] is True
+
+
+def _huerfano(partida_id, otra_id):
+    """Apunta un movimiento de `partida_id` a una pieza de otra partida (sin pasar por `clean`)."""
+    movimiento = Movimiento.objects.filter(partida_id=partida_id).order_by("ply").first()
+    Movimiento.objects.filter(pk=movimiento.pk).update(pieza_id=Pieza.objects.filter(partida_id=otra_id).first().pk)
+    return movimiento.pk
+
+
+@pytest.mark.django_db
+def test_archive_games_omite_la_partida_con_movimientos_huerfanos_y_sigue(api_client):
+    rota, sana = _partida_terminada(api_client), _partida_terminada(api_client)
+    en_curso = api_client.post("/api/partidas/start_game/", {
+        "numero_jugadores": 2,
+        "jugadores": [{"tipo": "ia", "numero": 1}, {"tipo": "ia", "numero": 2}],
+    }, format="json").json()["id_partida"]
+    huerfano = _huerfano(rota, en_curso)
+
+    out, err = StringIO(), StringIO()
+    call_command("archive_games", stdout=out, stderr=err)
+
+    assert f"{rota} omitida" in err.getvalue() and huerfano in err.getvalue()
+    assert "1 partidas archivadas" in out.getvalue()
+    assert set(PartidaArchivada.objects.values_list("pk", flat=True)) == {sana}
+    # La partida omitida sigue intacta en las tablas de juego
+    assert Movimiento.objects.filter(pk=huerfano).exists()
+    assert Partida.objects.get(pk=rota).estado == "FINALIZADA"
+
+
+@pytest.mark.django_db
+def test_end_game_con_movimiento_huerfano_finaliza_sin_archivar(api_client, settings, django_capture_on_commit_callbacks):
+    otra = _partida_terminada(api_client)
+    partida_id = api_client.post("/api/partidas/start_game/", {
+        "numero_jugadores": 2,
+        "jugadores": [{"tipo": "ia", "numero": 1}, {"tipo": "ia", "numero": 2}],
+    }, format="json").json()["id_partida"]
+    version = Partida.objects.get(pk=partida_id).version
+    assert api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version, "turnos": 2}, format="json").status_code == 201
+    _huerfano(partida_id, otra)
+
+    settings.ARCHIVE_ON_END_GAME = True
+    with django_capture_on_commit_callbacks(execute=True):
+        res = api_client.post(f"/api/partidas/{partida_id}/end_game/", {"version": version + 1}, format="json")
+
+    assert res.status_code == 200
+    assert Partida.objects.get(pk=partida_id).estado == "FINALIZADA"
+    assert not PartidaArchivada.objects.filter(pk=partida_id).exists()
@@ -0,0 +1,77 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from game.export import filter_games, iter_games
+from game.models import Movimiento, Partida
+
+
+def _crear(api_client, turnos=0, is_demo=False):
+    partida_id = api_client.post("/api/partidas/start_game/", {
+        "numero_jugadores": 2,
+        "is_demo": is_demo,
+        "jugadores": [{"tipo": "ia", "numero": 1}, {"tipo": "ia", "numero": 2}],
+    }, format="json").json()["id_partida"]
+    if turnos:
+        assert api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": Partida.objects.get(pk=partida_id).version, "turnos": turnos}, format="json").status_code == 201
+    return partida_id
+
+
+@pytest.mark.django_db
+def test_exportar_devuelve_una_linea_por_partida_con_sus_movimientos(api_client):
+    ids = sorted([_crear(api_client, turnos=6), _crear(api_client), _crear(api_client, turnos=4, is_demo=True)])
+
+    res = api_client.get("/api/partidas/exportar/")
+    assert res.status_code == 200
+    assert res["Content-Type"] == "application/x-ndjson"
+    lineas = [json.loads(l) for l in b"".join(res.streaming_content).decode().splitlines()]
+    assert [p["id_partida"] for p in lineas] == ids
+
+    for partida in lineas:
+        esperados = list(
+            Movimiento.objects.filter(partida_id=partida["id_partida"]).order_by("ply")
+            .values_list("ply", "ronda__numero", "jugador_id", "pieza_id", "origen", "destino")
+        )
+        assert [tuple(m) for m in partida["movimientos"]] == esperados
+        assert [j["orden"] for j in partida["jugadores"]] == [1, 2]
+        assert [j["nivel"] for j in partida["jugadores"]] == [1, 1]
+
+    res = api_client.get("/api/partidas/exportar/", {"is_demo": "true"})
+    assert len(b"".join(res.streaming_content).splitlines()) == 1
+    assert api_client.get("/api/partidas/exportar/", {"desde": "ayer"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_consultas_por_bloque_y_no_por_partida(api_client):
+    for i in range(4):
+        _crear(api_client, turnos=2 + i)
+
+    # Páginas de movimientos pequeñas para recorrer varias claves por bloque
+    with CaptureQueriesContext(connection) as todas:
+        assert len(list(iter_games(filter_games(), chunk_size=100, pagina=1000))) == 4
+    with CaptureQueriesContext(connection) as por_bloques:
+        assert len(list(iter_games(filter_games(), chunk_size=2, pagina=1000))) == 4
+    # Partidas + (participaciones, agentes, movimientos) por bloque
+    assert len(todas) == 1 + 3
+    assert len(por_bloques) == 1 + 2 * 3
+
+    paginado = list(iter_games(filter_games(), chunk_size=100, pagina=3))
+    assert [p["movimientos"] for p in paginado] == [p["movimientos"] for p in iter_games(filter_games())]
+
+
+@pytest.mark.django_db
+def test_comando_export_games(api_client, tmp_path):
+    _crear(api_client, turnos=2)
+    _crear(api_client, is_demo=True)
+
+    out = StringIO()
+    call_command("export_games", "--sin-demos", stdout=out, stderr=StringIO())
+    assert len(out.getvalue().splitlines()) == 1
+
+    salida = tmp_path / "partidas.ndjson"
+    call_command("export_games", "--salida", str(salida), "--lote", "1", stderr=StringIO())
+    assert sorted(json.loads(l)["is_demo"] for l in salida.read_text(encoding="utf-8").splitlines()) == [False, True]
@@ -0,0 +1,103 @@
+import pytest
+
+from game.models import Movimiento, Partida, Ronda
+
+
+def _partida_simulada(api_client, turnos=6):
+    partida_id = api_client.post("/api/partidas/start_game/", {
+        "numero_jugadores": 3,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+            {"tipo": "ia", "dificultad": "Difícil", "numero": 3},
+        ],
+    }, format="json").json()["id_partida"]
+    assert api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": Partida.objects.get(pk=partida_id).version, "turnos": turnos}, format="json").status_code == 201
+    return partida_id
+
+
+def _recorrido(partida_id):
+    return list(
+        Movimiento.objects.filter(partida_id=partida_id).order_by("ply").values_list("ply", "ronda__numero", "origen", "destino")
+    )
+
+
+@pytest.mark.django_db
+def test_export_e_importar_reproducen_la_partida(api_client):
+    partida_id = _partida_simulada(api_client)
+    res = api_client.get(f"/api/partidas/{partida_id}/export/")
+    assert res.status_code == 200
+    datos = res.json()
+    assert '[J1Tipo "ia1"]' in datos["registro"]
+    assert '[J3Tipo "ia2"]' in datos["registro"]
+    assert "Posicion" not in datos["registro"]
+    assert datos["registro"].rstrip().endswith("*")
+
+    res = api_client.post("/api/partidas/importar/", {"registro": datos["registro"]}, format="json")
+    assert res.status_code == 201, res.content
+    copia = res.json()
+    assert Partida.objects.get(pk=copia["id_partida"]).tablero == Partida.objects.get(pk=partida_id).tablero
+    assert [(m[0], m[1], m[2], m[3]) for m in _recorrido(copia["id_partida"])] == _recorrido(partida_id)
+    assert Ronda.objects.filter(partida_id=copia["id_partida"], fin__isnull=True).count() == 1
+    assert api_client.get(f"/api/partidas/{copia['id_partida']}/export/").json()["posicion"] == datos["posicion"]
+
+    # Las rondas importadas llevan los instantes medidos al reproducirlas, encadenados
+    rondas = list(Ronda.objects.filter(partida_id=copia["id_partida"]).order_by("inicio"))
+    assert rondas[0].inicio == Partida.objects.get(pk=copia["id_partida"]).fecha_inicio
+    assert all(a.fin == b.inicio and a.fin > a.inicio for a, b in zip(rondas, rondas[1:]))
+
+
+@pytest.mark.django_db
+def test_importar_posicion_y_rechazos(api_client):
+    partida_id = _partida_simulada(api_client, turnos=2)
+    posicion = api_client.get(f"/api/partidas/{partida_id}/export/").json()["posicion"]
+
+    res = api_client.post("/api/partidas/importar/", {"posicion": posicion}, format="json")
+    assert res.status_code == 201
+    copia = res.json()
+    assert Partida.objects.get(pk=copia["id_partida"]).tablero == Partida.objects.get(pk=partida_id).tablero
+    assert api_client.get(f"/api/partidas/{copia['id_partida']}/export/").json()["posicion"] == posicion
+    assert "[Posicion " in api_client.get(f"/api/partidas/{copia['id_partida']}/export/").json()["registro"]
+
+    antes = Partida.objects.count()
+    for cuerpo in (
+        {},
+        {"posicion": "121 1 2 1"},
+        {"registro": '[Jugadores "2"]\n\n1. 0-1 *'},
+        {"registro": '[Jugadores "2"]\n\n1. 0x1 *'},
+    ):
+        assert api_client.post("/api/partidas/importar/", cuerpo, format="json").status_code == 400
+    assert Partida.objects.count() == antes
+
+
+@pytest.mark.django_db
+def test_export_con_cadena_que_vuelve_al_origen(api_client, version_de):
+    from game.ai.mcts_agent import _jump_sequences, load_game_state
+
+    partida_id = api_client.post("/api/partidas/start_game/", {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "humano", "nombre": "Ana", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+    }, format="json").json()["id_partida"]
+    ronda = Ronda.objects.get(partida_id=partida_id, fin__isnull=True)
+    state = load_game_state(partida_id, ronda.jugador_id)
+    pieza, (origen, salto) = next(
+        (p, seq[:2]) for p in state.pieces_of(ronda.jugador_id) for seq in _jump_sequences(p.posicion, state.occupied())
+    )
+    res = api_client.post(f"/api/partidas/{partida_id}/registrar_movimientos/", {
+        "version": version_de(partida_id),
+        "movimientos": [
+            {"jugador_id": ronda.jugador_id, "ronda_id": ronda.id_ronda, "partida_id": partida_id,
+             "pieza_id": pieza.pieza_id, "origen": a, "destino": b}
+            for a, b in ((origen, salto), (salto, origen))
+        ]
+    }, format="json")
+    assert res.status_code == 201, res.content
+
+    registro = api_client.get(f"/api/partidas/{partida_id}/export/").json()["registro"]
+    assert "Posicion" not in registro
+    res = api_client.post("/api/partidas/importar/", {"registro": registro}, format="json")
+    assert res.status_code == 201, res.content
+    assert Partida.objects.get(pk=res.json()["id_partida"]).tablero == Partida.objects.get(pk=partida_id).tablero
@@ -0,0 +1,38 @@
+import pytest
+
+from game.board import move_on_board, start_board
+from game.models import InstantaneaTablero, Movimiento, Partida
+
+
+@pytest.mark.django_db
+def test_posicion_en_cualquier_ply_coincide_con_repetir_la_partida(api_client, settings, version_de):
+    settings.TABLERO_INSTANTANEA_PLIES = 4
+    partida_id = api_client.post("/api/partidas/start_game/", {
+        "numero_jugadores": 2,
+        "jugadores": [{"tipo": "ia", "numero": 1}, {"tipo": "ia", "numero": 2}],
+    }, format="json").json()["id_partida"]
+    assert api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": 12}, format="json").status_code == 201
+
+    pasos = list(Movimiento.objects.filter(partida_id=partida_id).order_by("ply").values_list("origen", "destino"))
+    ultimo = len(pasos)
+    assert sorted(InstantaneaTablero.objects.filter(partida_id=partida_id).values_list("ply", flat=True)) == list(range(4, ultimo + 1, 4))
+
+    tablero = start_board(2)
+    esperados = [tablero]
+    for origen, destino in pasos:
+        tablero = move_on_board(tablero, origen, destino)
+        esperados.append(tablero)
+    assert esperados[-1] == Partida.objects.get(pk=partida_id).tablero
+
+    for ply in range(ultimo + 1):
+        res = api_client.get(f"/api/partidas/{partida_id}/posicion/", {"ply": ply})
+        assert res.status_code == 200
+        datos = res.json()
+        assert datos["tablero"] == esperados[ply], ply
+        assert datos["ultimo_ply"] == ultimo
+        assert datos["movimientos_aplicados"] <= 4
+
+    assert api_client.get(f"/api/partidas/{partida_id}/posicion/").json()["ply"] == ultimo
+    assert api_client.get(f"/api/partidas/{partida_id}/posicion/", {"ply": ultimo + 1}).status_code == 400
+    assert api_client.get(f"/api/partidas/{partida_id}/posicion/", {"ply": "x"}).status_code == 400
+    assert api_client.get("/api/partidas/NOPE/posicion/").status_code == 404
@@ -0,0 +1,104 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from game.models import AgenteInteligente, Chatbot, Jugador, JugadorPartida, Movimiento, Partida, Pieza, Ronda
+from game.retention import delete_games
+
+
+def _start_game(api_client, **extra):
+    payload = {
+        "numero_jugadores": 2,
+        "jugadores": [
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 1},
+            {"tipo": "ia", "dificultad": "Fácil", "numero": 2},
+        ],
+        **extra,
+    }
+    partida_id = api_client.post("/api/partidas/start_game/", payload, format="json").json()["id_partida"]
+    assert api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": Partida.objects.get(pk=partida_id).version, "turnos": 3}, format="json").status_code == 201
+    return partida_id
+
+
+def _envejecer(partida_id, dias, **campos):
+    inicio = timezone.now() - timedelta(days=dias)
+    Partida.objects.filter(pk=partida_id).update(fecha_inicio=inicio, **campos)
+
+
+@pytest.mark.django_db
+def test_purge_games_borra_segun_politica_por_lotes(api_client):
+    finalizada = _start_game(api_client)
+    _envejecer(finalizada, 40, estado="FINALIZADA")
+    demo = _start_game(api_client, is_demo=True)
+    _envejecer(demo, 40)
+    reciente = _start_game(api_client)
+    Partida.objects.filter(pk=reciente).update(estado="FINALIZADA")
+    en_curso = _start_game(api_client)
+    _envejecer(en_curso, 40)
+
+    out = StringIO()
+    call_command("purge_games", "--dias", "30", "--incluir-demos", "--dry-run", stdout=out)
+    assert "2 partidas" in out.getvalue()
+    assert Partida.objects.count() == 4
+
+    out = StringIO()
+    call_command("purge_games", "--dias", "30", "--incluir-demos", "--lote", "1", stdout=out)
+    assert "2/2 partidas borradas" in out.getvalue()
+
+    assert set(Partida.objects.values_list("pk", flat=True)) == {reciente, en_curso}
+    for modelo in (Movimiento, Ronda, Pieza, JugadorPartida):
+        assert not modelo.objects.filter(partida_id__in=[finalizada, demo]).exists()
+    # Los jugadores creados para las partidas borradas también desaparecen
+    assert Jugador.objects.count() == 4
+    assert AgenteInteligente.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_delete_games_borra_piezas_de_chatbot_por_subconsulta_sin_leer_filas(api_client):
+    borrada, conservada = _start_game(api_client), _start_game(api_client)
+    ajeno = JugadorPartida.objects.filter(partida_id=conservada).first().jugador
+    propio = JugadorPartida.objects.filter(partida_id=borrada).first().jugador
+
+    # Piezas de chatbot sin partida, de un jugador que sobrevive: solo las alcanza el filtro por chatbot
+    chatbot_partida = Chatbot.objects.create(partida_id=borrada)
+    chatbot_jugador = Chatbot.objects.create(jugador=propio)
+    chatbot_ajeno = Chatbot.objects.create(partida_id=conservada)
+    for i, chatbot in enumerate((chatbot_partida, chatbot_jugador, chatbot_ajeno)):
+        Pieza.objects.create(id_pieza=f"CB{i}", tipo="0-Rojo", posicion="0-0", jugador=ajeno, chatbot=chatbot)
+
+    with CaptureQueriesContext(connection) as consultas:
+        borrados = delete_games([borrada])
+
+    assert set(Pieza.objects.filter(chatbot__isnull=False).values_list("pk", flat=True)) == {"CB2"}
+    assert set(Chatbot.objects.values_list("pk", flat=True)) == {chatbot_ajeno.pk}
+    assert borrados["chatbots"] == 2 and borrados["partidas"] == 1
+    assert not Movimiento.objects.filter(partida_id=borrada).exists()
+    # Solo se consultan las participaciones (para los jugadores); el resto son DELETE directos
+    lecturas = [q["sql"] for q in consultas.captured_queries if q["sql"].startswith("SELECT")]
+    assert all('"game_jugadorpartida"' in sql for sql in lecturas), lecturas
+
+
+def test_delete_games_cubre_todos_los_modelos_dependientes():
+    from django.apps import apps
+
+    from game import retention
+
+    # Modelos que borra delete_games, en orden; un modelo nuevo con FK hacia ellos debe añadirse
+    orden = [queryset.model for _, _, queryset in retention._pasos(["P"], {"J"})]
+    assert {Partida, Jugador} <= set(orden)
+
+    for modelo in apps.get_app_config("game").get_models():
+        for campo in modelo._meta.get_fields():
+            if not (campo.concrete and (campo.many_to_one or campo.one_to_one)) or campo.related_model not in orden:
+                continue
+            assert modelo in orden, f"delete_games no borra {modelo.__name__} ({campo.name} -> {campo.related_model.__name__})"
+            destino = campo.related_model
+            if destino is not modelo:
+                # Los hijos se borran antes del último paso del padre
+                ultimo_padre = len(orden) - 1 - orden[::-1].index(destino)
+                assert orden.index(modelo) < ultimo_padre, f"{modelo.__name__} se borra después de {destino.__name__}"
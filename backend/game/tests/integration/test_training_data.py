@@ -0,0 +1,30 @@
+from io import StringIO
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+def test_generate_training_data_desde_bd_puntua_cada_turno(api_client, tmp_path, version_de):
+    partida_id = api_client.post("/api/partidas/start_game/", {
+        "numero_jugadores": 2,
+        "jugadores": [{"tipo": "ia", "numero": 1}, {"tipo": "ia", "numero": 2}],
+    }, format="json").json()["id_partida"]
+    turnos = api_client.post(f"/api/partidas/{partida_id}/simular/", {"version": version_de(partida_id), "turnos": 8}, format="json").json()["turnos"]
+    assert api_client.post(f"/api/partidas/{partida_id}/end_game/", {"version": version_de(partida_id)}, format="json").status_code == 200
+
+    out = StringIO()
+    call_command("generate_training_data", "--salida", str(tmp_path), "--desde-bd", "--autojuego", "1",
+                 "--max-turnos", "5", "--seed", "1", stdout=out)
+    assert "13 posiciones de 2 partidas en 1 shards" in out.getvalue()
+
+    datos = np.load(tmp_path / "posiciones-00000.npz")
+    bd = datos["partida"] == 1
+    assert list(datos["jugador"][bd]) == [t["orden"] for t in turnos]
+    assert not np.isnan(datos["contexto"][bd]).any()
+    # `end_game` sin ganador: ninguna posición tiene resultado
+    assert not datos["resultado"][bd].any()
+
+    with pytest.raises(Exception):
+        call_command("generate_training_data", "--salida", str(tmp_path), stdout=StringIO())
@@ -0,0 +1,62 @@
+import pytest
+
+from game import board
+
+
+def test_cell_keys_cubren_las_121_casillas():
+    assert len(board.CELL_KEYS) == 121
+    assert board.CELL_KEYS[0] == '0-0'
+    assert board.CELL_KEYS[-1] == '0-16'
+    assert len(board.EMPTY_BOARD) == 121
+
+
+def test_encode_decode_y_mover():
+    tablero = board.encode_board([('0-0', 1), ('3-13', 2), ('4-4', None)])
+    assert board.decode_board(tablero) == {'0-0': 1, '3-13': 2, '4-4': 9}
+    assert board.occupied_cells(tablero) == {'0-0', '3-13', '4-4'}
+
+    movido = board.move_on_board(tablero, '0-0', '1-1')
+    assert board.decode_board(movido) == {'1-1': 1, '3-13': 2, '4-4': 9}
+
+
+@pytest.mark.django_db
+def test_start_game_y_registrar_movimientos_mantienen_el_tablero(api_client, version_de):
+    from game.models import Partida, Pieza
+
+    res = api_client.post('/api/partidas/start_game/', {
+        'numero_jugadores': 2,
+        'jugadores': [
+            {'tipo': 'humano', 'nombre': 'Ana', 'numero': 1},
+            {'tipo': 'humano', 'nombre': 'Bea', 'numero': 2},
+        ],
+    }, format='json')
+    data = res.json()
+    partida = Partida.objects.get(pk=data['id_partida'])
+    assert board.decode_board(partida.tablero) == {
+        p.posicion: 1 if p.jugador_id == data['participantes'][0]['jugador'] else 2
+        for p in Pieza.objects.filter(partida=partida)
+    }
+
+    pieza = Pieza.objects.get(partida=partida, posicion='0-3')
+    res2 = api_client.post(f"/api/partidas/{partida.id_partida}/registrar_movimientos/", {
+        "version": version_de(partida.id_partida),
+        'movimientos': [{
+            'jugador_id': pieza.jugador_id,
+            'ronda_id': data['rondas'][0]['id_ronda'],
+            'partida_id': partida.id_partida,
+            'pieza_id': pieza.id_pieza,
+            'origen': '0-3',
+            'destino': '4-4',
+        }],
+    }, format='json')
+    assert res2.status_code == 201
+
+    partida.refresh_from_db()
+    assert partida.tablero == board.build_board(partida.id_partida)
+    assert board.decode_board(partida.tablero)['4-4'] == 1
+
+
+def test_move_on_board_origen_igual_destino_no_cambia_el_tablero():
+    tablero = board.start_board(2)
+    origen = next(k for k, c in zip(board.CELL_KEYS, tablero) if c != board.EMPTY_CELL)
+    assert board.move_on_board(tablero, origen, origen) == tablero
@@ -0,0 +1,50 @@
+import pytest
+from django.db import IntegrityError, connection
+
+from game.models import Movimiento, Pieza, Ronda
+
+
+def _plan(queryset):
+    if connection.vendor == 'postgresql':
+        # Con tablas vacías el planificador prefiere un Seq Scan: se desactiva para ver el índice elegible
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    return queryset.explain()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('queryset, indice', [
+    (lambda: Ronda.objects.filter(partida_id='P1', fin__isnull=True).order_by('numero'), 'ronda_activa_idx'),
+    (lambda: Movimiento.objects.filter(partida_id='P1', jugador_id='J1').order_by('-ply'), 'mov_partida_jugador_ply_idx'),
+])
+def test_consultas_calientes_usan_su_indice(queryset, indice):
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        pytest.skip('EXPLAIN solo se comprueba en SQLite y PostgreSQL')
+    assert indice in _plan(queryset())
+
+
+@pytest.mark.django_db
+def test_ocupacion_de_pieza_usa_indice_de_la_restriccion_unica():
+    plan = _plan(Pieza.objects.filter(partida_id='P1', posicion='0-1'))
+    if connection.vendor == 'sqlite':
+        assert 'USING INDEX' in plan and '(partida_id=? AND posicion=?)' in plan
+    elif connection.vendor == 'postgresql':
+        assert 'pieza_partida_posicion_unica' in plan
+
+
+@pytest.mark.django_db
+def test_movimientos_desde_ply_recorren_indice_sin_ordenar():
+    plan = _plan(Movimiento.objects.filter(partida_id='P1', ply__gt=10).order_by('ply'))
+    if connection.vendor == 'sqlite':
+        assert 'USING INDEX' in plan and 'TEMP B-TREE' not in plan
+    elif connection.vendor == 'postgresql':
+        assert 'movimiento_partida_ply_unico' in plan
+
+
+@pytest.mark.django_db
+def test_pieza_no_puede_compartir_casilla(make_jugador, make_partida, make_pieza):
+    j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
+    p = make_partida(id_partida="P1", numero_jugadores=2)
+    make_pieza(id_pieza="X1", jugador=j, partida=p, posicion="0-4")
+    with pytest.raises(IntegrityError):
+        make_pieza(id_pieza="X2", jugador=j, partida=p, posicion="0-4")
@@ -155,3 +155,69 @@ def test_mcts_agent_suggest_move_monkeypatched(monkeypatch):
     agent = mcts_agent.MCTSAgent()
     out = agent.suggest_move(partida_id='PM1', jugador_id='J1', allow_simple=True, iterations=1, seed=1)
     assert 'pieza_id' in out and 'destino' in out
+
+
+@pytest.mark.django_db
+def test_mcts_ponder_reutiliza_el_arbol_de_la_respuesta_humana():
+    from django.utils import timezone
+
+    from game.models import Jugador, JugadorPartida, Partida, Pieza, Ronda
+
+    p = Partida.objects.create(id_partida='PP1', numero_jugadores=2)
+    ia = Jugador.objects.create(id_jugador='IA', nombre='IA', humano=False, numero=1)
+    hu = Jugador.objects.create(id_jugador='HU', nombre='HU', humano=True, numero=2)
+    JugadorPartida.objects.create(jugador=ia, partida=p, orden_participacion=1)
+    JugadorPartida.objects.create(jugador=hu, partida=p, orden_participacion=2)
+    Pieza.objects.create(id_pieza='A1', tipo='0-Blanco', posicion='0-1', jugador=ia, partida=p)
+    Pieza.objects.create(id_pieza='B1', tipo='3-Negro', posicion='3-13', jugador=hu, partida=p)
+    Ronda.objects.create(id_ronda='R1_J2', jugador=hu, numero=1, partida=p)
+
+    hecho = mcts_agent.ponder('PP1', 'IA', seconds=5, max_nodes=500, max_replies=2)
+    assert hecho > 0
+
+    state = mcts_agent.load_game_state('PP1', 'HU')
+    respuesta = mcts_agent.legal_turn_moves(state, 'HU', allow_simple=True)[0]
+    Pieza.objects.filter(id_pieza='B1').update(posicion=respuesta.destino)
+    Ronda.objects.filter(id_ronda='R1_J2').update(fin=timezone.now())
+    Ronda.objects.create(id_ronda='R2_J1', jugador=ia, numero=2, partida=p)
+
+    out = mcts_agent.MCTSAgent().suggest_move('PP1', 'IA', iterations=hecho + 5, seed=1)
+
+    assert out['simulaciones_anticipadas'] > 0
+    assert out['pieza_id'] == 'A1'
+    # El árbol se consume una sola vez
+    assert mcts_agent.take_pondered_search('PP1', 'IA', state) is None
+
+
+def test_mcts_stop_pondering_sin_sesiones_no_falla():
+    mcts_agent.stop_pondering('NO-EXISTE')
+
+
+def test_mcts_stop_pondering_descarta_las_sesiones_salvo_tras_la_jugada_humana(settings):
+    settings.MCTS_PONDER_SESSION_TTL = 600
+    conservada = mcts_agent._PonderSession()
+    mcts_agent._ponder_sessions[('PS1', 'IA')] = conservada
+    mcts_agent.stop_pondering('PS1', discard=False)
+    assert conservada.stop.is_set()
+    assert mcts_agent._ponder_sessions[('PS1', 'IA')] is conservada
+
+    mcts_agent.stop_pondering('PS1')
+    assert ('PS1', 'IA') not in mcts_agent._ponder_sessions
+
+
+def test_mcts_sesiones_anticipadas_caducan(settings):
+    settings.MCTS_PONDER_SESSION_TTL = 0
+    vieja = mcts_agent._PonderSession(started=0.0)
+    mcts_agent._ponder_sessions[('PS2', 'IA')] = vieja
+    mcts_agent.stop_pondering('OTRA')
+    assert ('PS2', 'IA') not in mcts_agent._ponder_sessions
+    assert vieja.stop.is_set()
+
+
+@pytest.mark.django_db
+def test_borrar_partida_descarta_su_busqueda_anticipada():
+    from game.retention import delete_games
+
+    mcts_agent._ponder_sessions[('PS3', 'IA')] = mcts_agent._PonderSession()
+    delete_games(['PS3'])
+    assert ('PS3', 'IA') not in mcts_agent._ponder_sessions
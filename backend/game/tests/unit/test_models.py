@@ -100,6 +100,23 @@ class TestPropiedadesYValidaciones:
         assert pieza.partida_id is None
         assert pieza.chatbot_id is None
 
+    @pytest.mark.django_db
+    def test_pieza_rellena_punta_desde_tipo(self, make_jugador, make_pieza):
+        j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
+        assert make_pieza(id_pieza="X_P3", tipo="3-Negro", posicion="0-0", jugador=j).punta == 3
+        assert make_pieza(id_pieza="X_P?", tipo="punta-0", posicion="0-1", jugador=j).punta is None
+
+    @pytest.mark.django_db
+    def test_pieza_recalcula_punta_al_cambiar_tipo(self, make_jugador, make_pieza):
+        j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
+        pieza = make_pieza(id_pieza="X_P3", tipo="3-Negro", posicion="0-0", jugador=j)
+        pieza.tipo = "0-Rojo"
+        pieza.save()
+        assert Pieza.objects.get(pk="X_P3").punta == 0
+        pieza.tipo = "5-Azul"
+        pieza.save(update_fields=["tipo"])
+        assert Pieza.objects.get(pk="X_P3").punta == 5
+
     @pytest.mark.django_db
     def test_pieza_requiere_jugador(self, make_pieza):
         with pytest.raises(IntegrityError):
@@ -355,6 +372,30 @@ class TestPropiedadesYValidaciones:
         with pytest.raises(ValidationError):
             jp.full_clean()
 
+    @pytest.mark.django_db
+    def test_movimiento_save_reintenta_si_otra_escritura_se_queda_el_ply(self, monkeypatch, make_jugador, make_partida, make_ronda, make_pieza, make_movimiento):
+        j = make_jugador(id_jugador="J1", nombre="Ana", humano=True, numero=1)
+        p = make_partida(id_partida="P1", numero_jugadores=2)
+        r = make_ronda(id_ronda="R1", jugador=j, numero=1, partida=p)
+        x1 = make_pieza(id_pieza="X1", jugador=j, partida=p, posicion="0-0")
+        x2 = make_pieza(id_pieza="X2", jugador=j, partida=p, posicion="0-1")
+        make_movimiento(id_movimiento="M1", jugador=j, partida=p, ronda=r, pieza=x1, origen="0-0", destino="0-2")
+
+        # La primera lectura llega antes de ver M1, como haría una escritura concurrente
+        original = Movimiento.next_ply
+        lecturas = iter([1])
+        monkeypatch.setattr(Movimiento, "next_ply", staticmethod(lambda partida_id: next(lecturas, None) or original(partida_id)))
+
+        m2 = make_movimiento(id_movimiento="M2", jugador=j, partida=p, ronda=r, pieza=x2, origen="0-1", destino="1-1")
+        assert m2.ply == 2
+
+        # Si el choque persiste, se rinde con el IntegrityError en vez de reintentar sin fin
+        monkeypatch.setattr(Movimiento, "next_ply", staticmethod(lambda partida_id: 1))
+        with pytest.raises(IntegrityError):
+            with transaction.atomic():
+                make_movimiento(id_movimiento="M3", jugador=j, partida=p, ronda=r, pieza=x2, origen="0-1", destino="1-1")
+        assert not Movimiento.objects.filter(pk="M3").exists()
+
 
 # ============================================================================
 # 3) TESTEO DE RELACIONES ENTRE ENTIDADES
@@ -0,0 +1,51 @@
+import pytest
+
+from game.board import CELL_KEYS, start_board
+from game.notation import fen_to_position, format_record, format_turn, parse_record, parse_turn, position_to_fen
+
+
+def test_posicion_ida_y_vuelta():
+    tablero = start_board(3)
+    tablero = tablero[:5] + '9' + tablero[6:]
+    fen = position_to_fen(tablero, 2, 3, 7)
+    assert fen.endswith(" 2 3 7")
+    assert fen_to_position(fen) == (tablero, 2, 3, 7)
+
+
+@pytest.mark.parametrize("fen", [
+    "121 1 2",
+    "120 1 2 1",
+    "a121 1 2 1",
+    "c120 1 2 1",
+    "121 3 2 1",
+    "12z109 1 2 1",
+])
+def test_posicion_invalida(fen):
+    with pytest.raises(ValueError):
+        fen_to_position(fen)
+
+
+def test_turnos_simples_y_saltos():
+    assert format_turn([CELL_KEYS[12], CELL_KEYS[25]], salto=False) == "12-25"
+    assert format_turn([CELL_KEYS[40], CELL_KEYS[62]], salto=True) == "40x62"
+    assert format_turn([CELL_KEYS[40], CELL_KEYS[62], CELL_KEYS[84]], salto=False) == "40x62x84"
+    assert parse_turn("40x62x84") == [CELL_KEYS[40], CELL_KEYS[62], CELL_KEYS[84]]
+    for token in ("40-62-84", "12", "12-121", "a-b"):
+        with pytest.raises(ValueError):
+            parse_turn(token)
+
+
+def test_registro_ida_y_vuelta():
+    texto = format_record(
+        [("Partida", "P_1"), ("J1", 'Ana "la rápida"')],
+        [(1, "12-25"), (1, "108-95"), (2, "25x47x69")],
+        "J2",
+    )
+    assert "1. 12-25 108-95 2. 25x47x69 J2" in texto
+    cabeceras, tokens, resultado = parse_record(texto)
+    assert cabeceras == {"Partida": "P_1", "J1": 'Ana "la rápida"'}
+    assert tokens == ["12-25", "108-95", "25x47x69"]
+    assert resultado == "J2"
+
+    with pytest.raises(ValueError):
+        parse_record('[Partida "P_1"] 1. 12-25')
@@ -0,0 +1,169 @@
+import pytest
+
+from game.ai import suggestions
+from game.models import Jugador, JugadorPartida, Partida, Pieza, Ronda
+
+
+@pytest.fixture()
+def partida_dos_jugadores(db):
+    p = Partida.objects.create(id_partida='PS1', numero_jugadores=2)
+    j1 = Jugador.objects.create(id_jugador='J1', nombre='J1', humano=False, numero=1)
+    j2 = Jugador.objects.create(id_jugador='J2', nombre='J2', humano=True, numero=2)
+    JugadorPartida.objects.create(jugador=j1, partida=p, orden_participacion=1)
+    JugadorPartida.objects.create(jugador=j2, partida=p, orden_participacion=2)
+    Pieza.objects.create(id_pieza='A1', tipo='0-Blanco', posicion='0-1', jugador=j1, partida=p)
+    Pieza.objects.create(id_pieza='B1', tipo='3-Negro', posicion='3-13', jugador=j2, partida=p)
+    Ronda.objects.create(id_ronda='R1', jugador=j1, numero=1, partida=p)
+    return p
+
+
+def _count_calls(monkeypatch):
+    calls = []
+
+    def fake_compute(partida_id, jugador_id, **kwargs):
+        calls.append((partida_id, jugador_id, kwargs))
+        return {'pieza_id': 'A1', 'origen': '0-1', 'destino': '0-2', 'heuristica': 'fake'}
+
+    monkeypatch.setattr(suggestions, 'compute_suggestion', fake_compute)
+    return calls
+
+
+def test_suggest_move_cached_reutiliza_sugerencia_en_tablero_igual(partida_dos_jugadores, monkeypatch):
+    calls = _count_calls(monkeypatch)
+
+    first = suggestions.suggest_move_cached('PS1', 'J1', nivel=1, allow_simple=True)
+    second = suggestions.suggest_move_cached('PS1', 'J1', nivel=1, allow_simple=True)
+
+    assert first == second
+    assert len(calls) == 1
+
+
+def test_suggest_move_cached_distingue_nivel_simples_y_presupuesto(partida_dos_jugadores, monkeypatch):
+    calls = _count_calls(monkeypatch)
+
+    suggestions.suggest_move_cached('PS1', 'J1', nivel=1, allow_simple=True)
+    suggestions.suggest_move_cached('PS1', 'J1', nivel=1, allow_simple=False)
+    suggestions.suggest_move_cached('PS1', 'J1', nivel=2, allow_simple=True, iterations=100)
+    suggestions.suggest_move_cached('PS1', 'J1', nivel=2, allow_simple=True, iterations=200)
+    suggestions.suggest_move_cached('PS1', 'J1', nivel=2, allow_simple=True, iterations=200)
+
+    assert len(calls) == 4
+
+
+def test_suggest_move_cached_invalida_al_cambiar_la_version(partida_dos_jugadores, monkeypatch):
+    from django.db import connection
+    from django.db.models import F
+    from django.test.utils import CaptureQueriesContext
+
+    calls = _count_calls(monkeypatch)
+
+    suggestions.suggest_move_cached('PS1', 'J1', nivel=1, allow_simple=True)
+    # Un acierto de caché cuesta una sola lectura (la versión), o ninguna si se pasa
+    with CaptureQueriesContext(connection) as consultas:
+        suggestions.suggest_move_cached('PS1', 'J1', nivel=1, allow_simple=True)
+    assert len(consultas) == 1
+    with CaptureQueriesContext(connection) as consultas:
+        suggestions.suggest_move_cached('PS1', 'J1', nivel=1, allow_simple=True, version=0)
+    assert len(consultas) == 0
+
+    # Todo cambio de estado avanza la versión de la partida
+    Partida.objects.filter(pk='PS1').update(version=F('version') + 1)
+    suggestions.suggest_move_cached('PS1', 'J1', nivel=1, allow_simple=True)
+
+    assert len(calls) == 2
+
+
+def test_suggest_move_cached_no_guarda_errores(partida_dos_jugadores, monkeypatch):
+    calls = []
+
+    def failing_compute(partida_id, jugador_id, **kwargs):
+        calls.append(1)
+        raise ValueError('No hay movimientos validos disponibles')
+
+    monkeypatch.setattr(suggestions, 'compute_suggestion', failing_compute)
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            suggestions.suggest_move_cached('PS1', 'J1', nivel=1, allow_simple=True)
+    assert len(calls) == 2
+
+
+def test_sugerir_movimiento_endpoint_usa_cache(partida_dos_jugadores, api_client, monkeypatch):
+    from game.models import AgenteInteligente
+
+    AgenteInteligente.objects.create(jugador_id='J1', nivel=1)
+    calls = _count_calls(monkeypatch)
+
+    for _ in range(3):
+        res = api_client.post('/api/agentes-inteligentes/J1/sugerir_movimiento/', {'partida_id': 'PS1'}, format='json')
+        assert res.status_code == 200
+        assert res.json()['destino'] == '0-2'
+    assert len(calls) == 1
+
+
+def test_schedule_suggestion_precalcula_y_suggest_espera_al_resultado(partida_dos_jugadores, monkeypatch):
+    import threading
+
+    release = threading.Event()
+    calls = []
+
+    def slow_compute(partida_id, jugador_id, **kwargs):
+        calls.append(1)
+        release.wait(5)
+        return {'pieza_id': 'A1', 'origen': '0-1', 'destino': '0-2', 'heuristica': 'fake'}
+
+    monkeypatch.setattr(suggestions, 'compute_suggestion', slow_compute)
+
+    future = suggestions.schedule_suggestion('PS1', 'J1', nivel=1)
+    assert future is not None
+    assert suggestions.schedule_suggestion('PS1', 'J1', nivel=1) is future
+
+    release.set()
+    out = suggestions.suggest_move_cached('PS1', 'J1', nivel=1)
+
+    assert out['destino'] == '0-2'
+    assert len(calls) == 1
+    assert suggestions.schedule_suggestion('PS1', 'J1', nivel=1) is None
+
+
+def test_avanzar_ronda_programa_precalculo_para_agente(db, api_client, monkeypatch, django_capture_on_commit_callbacks, version_de):
+    from game import views
+
+    scheduled = []
+    monkeypatch.setattr(views, 'schedule_suggestion', lambda partida_id, jugador_id, **kw: scheduled.append((partida_id, jugador_id, kw)))
+
+    res = api_client.post('/api/partidas/start_game/', {
+        'numero_jugadores': 2,
+        'jugadores': [
+            {'tipo': 'humano', 'nombre': 'Ana', 'numero': 1},
+            {'tipo': 'ia', 'dificultad': 'Difícil', 'numero': 2},
+        ],
+    }, format='json')
+    data = res.json()
+    jugador_ids = [p['jugador'] for p in data['participantes']]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        res2 = api_client.post(f"/api/partidas/{data['id_partida']}/avanzar_ronda/", {
+            "version": version_de(data['id_partida']),
+            'oldRound': {'numero': 1, 'jugador_id': jugador_ids[0]},
+            'newRoundCreated': {'numero': 1, 'jugador_id': jugador_ids[1]},
+        }, format='json')
+
+    assert res2.status_code == 201
+    assert scheduled == [(data['id_partida'], jugador_ids[1], {
+        'nivel': 2,
+        'allow_simple': True,
+        'iterations': suggestions.DEFAULT_MCTS_ITERATIONS,
+        'rollout_depth': suggestions.DEFAULT_MCTS_ROLLOUT_DEPTH,
+    })]
+
+
+def test_busqueda_anticipada_usa_su_propio_pool(settings, monkeypatch):
+    from game.ai import suggestions
+
+    settings.MCTS_PONDERING_ENABLED = True
+    monkeypatch.setattr(suggestions, '_run_ponder', lambda partida_id, agent_id: 0)
+    future = suggestions.schedule_pondering('P1', 'IA')
+    assert future.result(timeout=5) == 0
+    assert suggestions._ponder_executor is not None
+    assert suggestions._ponder_executor is not suggestions._executor
@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+import pytest
+
+from game.ai.max_agent import MaxHeuristicAgent, WEIGHT_NAMES, weight_vector
+from game.ai.mcts_agent import legal_turn_moves, new_game_state
+from game.ai.training import CONTEXT_FEATURES, _turno, self_play_games, write_shards
+
+
+def test_move_units_reproducen_la_puntuacion_de_max():
+    agent = MaxHeuristicAgent()
+    pesos = np.asarray(weight_vector())
+    state = new_game_state(3)
+    rng = random.Random(7)
+    for _ in range(60):
+        jugador_id = state.current_player_id
+        elegida = agent.choose_move(state.pieces, jugador_id)
+        unidades = agent.move_units(state.pieces, jugador_id, [(elegida["pieza_id"], _turno(elegida))])[0]
+        assert np.dot(pesos, unidades) == pytest.approx(elegida["puntuacion"])
+
+        jugada = rng.choice(legal_turn_moves(state, jugador_id, allow_simple=True))
+        detalle = agent.move_features(state.pieces, jugador_id, jugada.pieza_id, jugada.sequence)
+        unidades = agent.move_units(state.pieces, jugador_id, [(jugada.pieza_id, jugada.sequence)])[0]
+        assert np.dot(pesos, unidades) == pytest.approx(detalle["puntuacion"])
+        state = state.apply(jugada)
+
+
+def test_un_peso_a_cero_conserva_su_columna(monkeypatch, tmp_path):
+    from game.ai import max_agent
+
+    agent = MaxHeuristicAgent()
+    state = new_game_state(2)
+    jugador_id = state.current_player_id
+    jugadas = [(j.pieza_id, j.sequence) for j in legal_turn_moves(state, jugador_id, allow_simple=True)]
+    columna = WEIGHT_NAMES.index("W_JUMP_BONUS")
+    antes = agent.move_units(state.pieces, jugador_id, jugadas)
+
+    monkeypatch.setattr(max_agent, "W_JUMP_BONUS", 0.0)
+    despues = agent.move_units(state.pieces, jugador_id, jugadas)
+    # Las unidades no dependen del peso: la columna de saltos sigue marcando los saltos
+    np.testing.assert_array_equal(despues, antes)
+    assert despues[:, columna].any()
+
+    writer = write_shards(self_play_games(numero_jugadores=2, partidas=1, max_turnos=40, epsilon=0.3, seed=5), str(tmp_path))
+    datos = np.load(writer.rutas[0])
+    assert datos["pesos"][columna] == 0.0
+    assert datos["X"][:, columna].any()
+
+
+def test_autojuego_escribe_shards_en_streaming(tmp_path):
+    writer = write_shards(
+        self_play_games(numero_jugadores=2, partidas=2, max_turnos=30, epsilon=0.2, seed=3),
+        str(tmp_path),
+        filas_por_shard=25,
+    )
+    assert writer.filas == 60
+    assert writer.partidas == 2
+    assert [len(np.load(r)["resultado"]) for r in writer.rutas] == [25, 25, 10]
+
+    datos = np.load(writer.rutas[0])
+    assert datos["X"].shape == (25, len(WEIGHT_NAMES))
+    assert datos["contexto"].shape == (25, len(CONTEXT_FEATURES))
+    assert list(datos["nombres_pesos"]) == list(WEIGHT_NAMES)
+    assert list(datos["jugador"][:4]) == [1, 2, 1, 2]
+    assert list(datos["turno"][:3]) == [1, 2, 3]
+    # 30 turnos no bastan para terminar la partida
+    assert not np.load(writer.rutas[-1])["resultado"].any()
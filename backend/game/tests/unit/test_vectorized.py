@@ -0,0 +1,106 @@
+import random
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from game.ai.max_agent import GOAL_POSITIONS, MaxHeuristicAgent
+from game.ai.mcts_agent import MCTSAgent, TurnMove, _build_search, legal_turn_moves, new_game_state
+from game.ai.vectorized import FUERA, StateBatchEvaluator, neighbour_tables
+
+
+def _jugada(elegida):
+    pasos = elegida.get("secuencia") or [{"origen": elegida["origen"], "destino": elegida["destino"]}]
+    return TurnMove(str(elegida["pieza_id"]), tuple([pasos[0]["origen"]] + [p["destino"] for p in pasos]))
+
+
+@pytest.mark.parametrize("numero_jugadores", [2, 3, 6])
+def test_evaluacion_vectorizada_elige_lo_mismo_que_una_a_una(numero_jugadores):
+    vectorizado, escalar = MaxHeuristicAgent(vectorized=True), MaxHeuristicAgent(vectorized=False)
+    state = new_game_state(numero_jugadores)
+    rng = random.Random(numero_jugadores)
+    ultimos = {}
+    for _ in range(50):
+        jugador_id = state.current_player_id
+        ultimo = ultimos.get(jugador_id)
+        elegida = vectorizado.choose_move(state.pieces, jugador_id, last_move=ultimo)
+        assert elegida == escalar.choose_move(state.pieces, jugador_id, last_move=ultimo)
+
+        jugadas = legal_turn_moves(state, jugador_id, allow_simple=True)
+        jugada = rng.choice(jugadas) if rng.random() < 0.3 else _jugada(elegida)
+        ultimos[jugador_id] = (jugada.pieza_id, jugada.origen, jugada.destino)
+        state = state.apply(jugada)
+
+
+def test_score_moves_coincide_con_move_features():
+    agent = MaxHeuristicAgent()
+    state = new_game_state(2)
+    rng = random.Random(5)
+    for _ in range(30):
+        jugador_id = state.current_player_id
+        jugadas = legal_turn_moves(state, jugador_id, allow_simple=True)
+        puntuaciones = agent.score_moves(state.pieces, jugador_id, [(j.pieza_id, j.sequence) for j in jugadas])
+        esperadas = [agent.move_features(state.pieces, jugador_id, j.pieza_id, j.sequence)["puntuacion"] for j in jugadas]
+        assert puntuaciones.shape == (len(jugadas),)
+        assert np.allclose(puntuaciones, esperadas, atol=1e-9)
+        state = state.apply(rng.choice(jugadas))
+
+
+def test_tabla_de_vecinos_sin_salto_fuera_del_tablero():
+    vecinos, aterrizajes = neighbour_tables()
+    assert vecinos.shape == aterrizajes.shape == (121, 6)
+    assert np.all(aterrizajes[vecinos == FUERA] == FUERA)
+    # La punta superior (0-0) solo tiene dos vecinos
+    assert int((vecinos[0] != FUERA).sum()) == 2
+
+
+def _estados(numero_jugadores, turnos, seed):
+    state = new_game_state(numero_jugadores)
+    rng = random.Random(seed)
+    estados = []
+    for _ in range(turnos):
+        estados.append(state)
+        state = state.apply(rng.choice(legal_turn_moves(state, state.current_player_id, allow_simple=True)))
+    return estados
+
+
+@pytest.mark.parametrize("numero_jugadores", [2, 3, 6])
+def test_evaluacion_por_lotes_igual_que_evaluate(numero_jugadores):
+    estados = _estados(numero_jugadores, 80, numero_jugadores)
+    for raiz in estados[0].player_order:
+        valores = StateBatchEvaluator(estados[0], raiz).evaluate(estados)
+        assert np.array_equal(valores, [s.evaluate(raiz) for s in estados])
+
+
+def test_evaluacion_por_lotes_detecta_victorias():
+    inicial = new_game_state(2)
+    meta = iter(GOAL_POSITIONS[dict(inicial.player_targets)["1"]])
+    ganado = replace(
+        inicial,
+        pieces=tuple(replace(p, posicion=next(meta)) if p.jugador_id == "1" else p for p in inicial.pieces),
+    )
+    assert list(StateBatchEvaluator(inicial, "1").evaluate([ganado, inicial])) == [1.0, inicial.evaluate("1")]
+    assert StateBatchEvaluator(inicial, "2").evaluate([ganado])[0] == -1.0
+
+
+def test_mcts_por_lotes_reparte_las_hojas_y_cuenta_simulaciones():
+    state = new_game_state(2)
+    random.seed(3)
+    montecarlo = _build_search(state, state.current_player_id, True, 1.35, leaf_batch=8)
+    montecarlo.simulate(41)
+    # Cada hoja expandida cuenta como una simulación, aunque una ronda se corte al repetir hoja
+    expandidos = [n for n in _nodos(montecarlo.root_node) if n.expanded]
+    assert len(expandidos) == 41
+    assert montecarlo.root_node.visits == sum(len(n.children) for n in expandidos)
+
+    jugada = MCTSAgent().choose_move(state, iterations=60, leaf_batch=16)
+    assert any(
+        m.pieza_id == jugada["pieza_id"] and m.origen == jugada["origen"] and m.destino == jugada["destino"]
+        for m in legal_turn_moves(state, state.current_player_id, allow_simple=True)
+    )
+
+
+def _nodos(nodo):
+    yield nodo
+    for hijo in nodo.children:
+        yield from _nodos(hijo)
@@ -1,21 +1,45 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from django.http import Http404, StreamingHttpResponse
 from django.utils import timezone
 from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Prefetch
 from datetime import datetime
 from collections import deque
+from functools import wraps
+import logging
 import re
+import zlib
 from .ai.gemini_api import generate_gemini_reply, GeminiError, GeminiHttpError
-from .models import Jugador, Partida, Pieza, Ronda, Movimiento, AgenteInteligente, Chatbot, JugadorPartida
-from .ai.max_agent import MaxHeuristicAgent
-from .ai.mcts_agent import MCTSAgent
+from .models import (
+    Jugador, Partida, PartidaArchivada, Pieza, Ronda, Movimiento, AgenteInteligente, Chatbot, JugadorPartida,
+    InstantaneaTablero,
+)
+from .board import (
+    CELL_KEYS, COLORES_POR_PUNTA, EMPTY_CELL, POSICIONES_POR_PUNTA, UNKNOWN_OWNER, build_board, decode_board, encode_board,
+    move_on_board, occupied_cells, position_at_ply, punta_asignada, save_checkpoints, start_board, sync_board,
+    update_piece_positions,
+)
+from .pagination import CursorPaginacion
+from .retention import delete_games
+from .archive import RegistroIncompleto, archive_game, find_winner, load_record, rehydrate
+from .export import filter_games, iter_ndjson, parse_fecha
+from .notation import fen_to_position, format_record, format_turn, parse_record, parse_turn, position_to_fen
+from .events import game_delta, movimiento_datos, publish_on_commit, ronda_datos, wait_for_events
+from .ai.mcts_agent import stop_pondering
+from .ai.simulation import simulate_game, timestamp_after
+from .ai.suggestions import DEFAULT_MCTS_ITERATIONS, DEFAULT_MCTS_ROLLOUT_DEPTH, schedule_pondering, schedule_suggestion, suggest_move_cached
 from .serializers import (
     JugadorSerializer, PartidaSerializer, PartidaListSerializer,
     PiezaSerializer, RondaSerializer,
     MovimientoSerializer, AgenteInteligenteSerializer, ChatbotSerializer, JugadorPartidaSerializer
 )
 
+logger = logging.getLogger(__name__)
+
 CARTESIAN_COORD_ROWS = [
     [{"q": 0, "r": 0}],
     [{"q": -1, "r": 1}, {"q": 0, "r": 1}],
@@ -54,8 +78,16 @@ AXIAL_DIRECTIONS = [
 ]
 
 
-def get_occupied_positions(partida_id):
-    """Obtiene todas las posiciones ocupadas en una partida."""
+def get_occupied_positions(partida_id, tablero=None):
+    """Obtiene todas las posiciones ocupadas en una partida.
+
+    Lee la columna compacta `Partida.tablero` (o la recibida); las partidas sin ella
+    calculada se resuelven desde las filas `Pieza`.
+    """
+    if tablero is None:
+        tablero = Partida.objects.filter(pk=partida_id).values_list('tablero', flat=True).first()
+    if tablero:
+        return occupied_cells(tablero)
     piezas = Pieza.objects.filter(partida_id=partida_id)
     return {pieza.posicion for pieza in piezas if pieza.posicion}
 
@@ -213,6 +245,14 @@ def get_valid_moves_from(origin_key, occupied_positions, allow_simple=True):
     return list(set(simple + jumps))
 
 
+def is_adjacent(origin_key, destination_key):
+    """True si las dos casillas son vecinas (paso simple)."""
+    a, b = coord_from_key(origin_key), coord_from_key(destination_key)
+    if not a or not b:
+        return False
+    return {"dq": b["q"] - a["q"], "dr": b["r"] - a["r"]} in AXIAL_DIRECTIONS
+
+
 def validate_move(origin_key, destination_key, occupied_positions, allow_simple=True):
     """
     Valida si un movimiento de origen a destino es válido.
@@ -266,6 +306,129 @@ def validate_move(origin_key, destination_key, occupied_positions, allow_simple=
     return False, "Movimiento inválido: en cadena solo se permiten saltos legales"
 
 
+class ConflictoVersion(Exception):
+    """La partida cambió desde la versión que conocía el cliente."""
+
+    def __init__(self, version_actual):
+        super().__init__('La partida ha cambiado; recarga el estado e inténtalo de nuevo')
+        self.version_actual = version_actual
+
+
+class VersionRequerida(Exception):
+    """La petición modifica la partida sin indicar sobre qué versión se hizo."""
+
+    def __init__(self, version_actual):
+        super().__init__('Falta version: envía la última versión recibida de la partida')
+        self.version_actual = version_actual
+
+
+def version_de_peticion(request, partida):
+    """`version` que envía el cliente (en el cuerpo o como `?version=`) para modificar `partida`.
+
+    Es obligatoria en toda escritura sobre una partida: lanza `VersionRequerida` si falta y
+    `ValidationError` si no es un entero.
+    """
+    valor = request.data.get('version') if hasattr(request.data, 'get') else None
+    if valor is None:
+        valor = request.query_params.get('version')
+    if valor is None:
+        raise VersionRequerida(partida.version)
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValidationError({'version': 'Debe ser un entero'})
+
+
+def reclamar_version(partida, version_cliente):
+    """Reserva el siguiente cambio de estado de la partida. Debe llamarse dentro de una transacción.
+
+    En PostgreSQL bloquea la fila de la partida (`select_for_update`), de modo que las
+    peticiones sobre una misma partida se serializan sin afectar a las demás. En todos los
+    motores avanza `version` con un UPDATE condicional (`WHERE version = N`) sobre la versión
+    que indicó el cliente; si otra petición se adelantó (un reintento, un doble envío, otra
+    pestaña), lanza `ConflictoVersion`.
+    """
+    esperada = int(version_cliente)
+    if connection.vendor == 'postgresql':
+        Partida.objects.select_for_update().values_list('version', flat=True).get(pk=partida.pk)
+    actualizadas = Partida.objects.filter(pk=partida.pk, version=esperada).update(version=F('version') + 1)
+    if actualizadas != 1:
+        raise ConflictoVersion(Partida.objects.filter(pk=partida.pk).values_list('version', flat=True).first())
+    partida.version = esperada + 1
+    return partida.version
+
+
+def accion_versionada(handler):
+    """Ejecuta una acción de `PartidaViewSet` como sección crítica de la partida.
+
+    Toda la acción corre en una transacción tras `reclamar_version`; las respuestas de error
+    deshacen también el avance de versión. Sin `version` se responde 428 y con una versión
+    obsoleta 409, ambos con la versión actual (ver `EscrituraVersionadaMixin`).
+    """
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        partida = self.get_object()
+        version_cliente = version_de_peticion(request, partida)
+        with transaction.atomic():
+            nueva_version = reclamar_version(partida, version_cliente)
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code >= 400:
+                transaction.set_rollback(True)
+
+        if response.status_code < 400 and isinstance(response.data, dict):
+            response.data['version'] = nueva_version
+        return response
+
+    return wrapper
+
+
+class EscrituraVersionadaMixin:
+    """Escrituras de un ViewSet que cambian el estado de una partida.
+
+    Los `perform_*` llaman a `reclamar_escritura` dentro de su transacción; la respuesta lleva
+    la nueva `version` de la partida. `ConflictoVersion` se responde con 409 y
+    `VersionRequerida` con 428, ambos con la versión actual para que el cliente se resincronice.
+    """
+
+    def reclamar_escritura(self, partida):
+        if partida is None:
+            return
+        self._version_reclamada = reclamar_version(partida, version_de_peticion(self.request, partida))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        version = getattr(self, '_version_reclamada', None)
+        if version is not None and response.status_code < 400 and isinstance(response.data, dict):
+            response.data['version'] = version
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, VersionRequerida):
+            return Response({ 'error': str(exc), 'version': exc.version_actual }, status=status.HTTP_428_PRECONDITION_REQUIRED)
+        if isinstance(exc, ConflictoVersion):
+            return Response({ 'error': str(exc), 'version': exc.version_actual }, status=status.HTTP_409_CONFLICT)
+        return super().handle_exception(exc)
+
+
+def _permite_simples(request):
+    """`permitir_simples` del cuerpo: acepta booleanos JSON y cadenas de formularios ("false")."""
+    valor = request.data.get('permitir_simples', True)
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).lower() != 'false'
+
+
+def _movimientos_lectura():
+    """Movimientos listos para `MovimientoSerializer` (nombre del jugador y tipo de pieza sin consultas extra)."""
+    return Movimiento.objects.select_related('jugador', 'pieza').order_by('ply')
+
+
+def _rondas_lectura():
+    """Rondas listas para `RondaSerializer`, con sus movimientos precargados."""
+    return (
+        Ronda.objects.select_related('jugador')
+        .prefetch_related(Prefetch('movimientos', queryset=_movimientos_lectura()))
+        .order_by('numero', 'inicio')
+    )
 
 
 class JugadorViewSet(viewsets.ModelViewSet):
@@ -294,7 +457,7 @@ class JugadorViewSet(viewsets.ModelViewSet):
         self._ensure_ai_name(jugador, self.request.data)
 
 
-class PartidaViewSet(viewsets.ModelViewSet):
+class PartidaViewSet(EscrituraVersionadaMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar partidas de Damas Chinas
     """
@@ -307,6 +470,32 @@ class PartidaViewSet(viewsets.ModelViewSet):
         if self.action == 'list':
             return PartidaListSerializer
         return PartidaSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            # Detalle anidado con un número fijo de consultas, sea cual sea la longitud de la partida
+            queryset = queryset.prefetch_related(
+                Prefetch('rondas', queryset=_rondas_lectura()),
+                Prefetch('movimientos', queryset=_movimientos_lectura()),
+                Prefetch('jugadorpartida_set', queryset=JugadorPartida.objects.select_related('jugador').order_by('orden_participacion')),
+            )
+        return queryset
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            self.reclamar_escritura(serializer.instance)
+            serializer.save()
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Las partidas archivadas se reconstruyen desde su registro comprimido
+            archivada = PartidaArchivada.objects.filter(pk=kwargs.get(self.lookup_field)).first()
+            if archivada is None:
+                raise
+            return Response(rehydrate(load_record(archivada)))
     
     @action(detail=False, methods=['post'])
     def start_game(self, request):
@@ -360,8 +549,17 @@ class PartidaViewSet(viewsets.ModelViewSet):
         if len(set(numeros)) != len(numeros):
             return Response({'error': 'No puede haber dos jugadores con el mismo numero en la misma partida'}, status=status.HTTP_400_BAD_REQUEST)
         
+        is_demo = request.data.get('is_demo', False)
+        marca = datetime.now().timestamp()
+        partida = Partida(
+            id_partida=f"P_{marca}",
+            numero_jugadores=numero_jugadores,
+            is_demo=is_demo
+        )
+
+        # Todas las filas se construyen en memoria y se insertan en bloque, una sentencia por modelo
         jugadores_list = []
-        
+        agentes = []
         for idx, jugador_data in enumerate(jugadores_data):
             es_humano = jugador_data.get('tipo', 'humano') == 'humano'
             numero = numeros[idx]
@@ -372,8 +570,8 @@ class PartidaViewSet(viewsets.ModelViewSet):
             else:
                 nombre = f"Agente Inteligente {numero}"
             
-            jugador = Jugador.objects.create(
-                id_jugador=f"J{idx + 1}_{datetime.now().timestamp()}",
+            jugador = Jugador(
+                id_jugador=f"J{idx + 1}_{marca}",
                 nombre=nombre,
                 humano=es_humano,
                 numero=numero
@@ -381,90 +579,133 @@ class PartidaViewSet(viewsets.ModelViewSet):
             
             if not es_humano:
                 nivel = 2 if dificultad == 'Difícil' else 1
-                
-                AgenteInteligente.objects.create(
-                    jugador=jugador,
-                    nivel=nivel
-                )
+                agentes.append(AgenteInteligente(jugador=jugador, nivel=nivel))
             
             jugadores_list.append(jugador)
-        
-        is_demo = request.data.get('is_demo', False)
-        
-        partida = Partida.objects.create(
-            id_partida=f"P_{datetime.now().timestamp()}",
-            numero_jugadores=numero_jugadores,
-            is_demo=is_demo
-        )
-        
-        for idx, jugador in enumerate(jugadores_list):
-            JugadorPartida.objects.create(
-                jugador=jugador,
-                partida=partida,
-                fecha_union=timezone.now(),
-                orden_participacion=idx + 1
+
+        ahora = timezone.now()
+        participaciones = [
+            JugadorPartida(jugador=jugador, partida=partida, fecha_union=ahora, orden_participacion=idx + 1)
+            for idx, jugador in enumerate(jugadores_list)
+        ]
+        piezas = [
+            pieza
+            for idx, jugador in enumerate(jugadores_list)
+            for pieza in self._build_pieces(jugador, partida, idx + 1)
+        ]
+        slots = {jugador.id_jugador: idx + 1 for idx, jugador in enumerate(jugadores_list)}
+        partida.tablero = encode_board((pieza.posicion, slots[pieza.jugador_id]) for pieza in piezas)
+
+        with transaction.atomic():
+            Jugador.objects.bulk_create(jugadores_list)
+            AgenteInteligente.objects.bulk_create(agentes)
+            partida.save(force_insert=True)
+            JugadorPartida.objects.bulk_create(participaciones)
+            Pieza.objects.bulk_create(piezas)
+            Ronda.objects.create(
+                id_ronda=f"R1_{partida.id_partida}",
+                jugador=jugadores_list[0],
+                numero=1,
+                partida=partida
             )
-            self._initialize_pieces(jugador, partida)
-        
-        Ronda.objects.create(
-            id_ronda=f"R1_{partida.id_partida}",
-            jugador=jugadores_list[0],
-            numero=1,
-            partida=partida
-        )
         
         serializer = self.get_serializer(partida)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['post'])
+    @accion_versionada
     def actualizar_posiciones_iniciales(self, request, id_partida=None):
         """
         Actualiza las posiciones de todas las piezas de la partida a sus posiciones iniciales
         según la punta asignada a cada jugador.
         """
         partida = self.get_object()
-        
-        posiciones_por_punta = {
-            0: ['0-0', '0-1', '1-1', '0-2', '1-2', '2-2', '0-3', '1-3', '2-3', '3-3'],
-            1: ['0-4', '0-5', '1-4', '1-5', '1-6', '2-4', '2-5', '3-4', '0-6', '0-7'],
-            2: ['12-4', '9-6', '11-4', '11-5', '10-6', '10-4', '10-5', '9-5', '9-4', '9-7'],
-            3: ['3-13', '2-13', '2-14', '1-13', '1-14', '1-15', '0-13', '0-14', '0-15', '0-16'],
-            4: ['0-9', '0-10', '2-12', '1-10', '1-11', '3-12', '2-11', '1-12', '0-11', '0-12'],
-            5: ['9-9', '9-10', '11-11', '10-10', '10-11', '10-12', '12-12', '11-12', '9-11', '9-12'],
-        }
-        
-        puntas_activas_map = {
-            2: [0, 3],
-            3: [0, 4, 5],
-            4: [1, 2, 4, 5],
-            6: [0, 1, 2, 3, 4, 5],
-        }
-        
-        puntas_activas = puntas_activas_map.get(partida.numero_jugadores, [0, 3])
-        
-        participaciones = JugadorPartida.objects.filter(partida=partida).order_by('orden_participacion')
-        
-        piezas_actualizadas = 0
-        
-        for participacion in participaciones:
-            punta_index = participacion.orden_participacion - 1
-            punta_asignada = puntas_activas[punta_index]
-            posiciones = posiciones_por_punta.get(punta_asignada, posiciones_por_punta[0])
-            
-            piezas = Pieza.objects.filter(jugador=participacion.jugador, partida=partida).order_by('id_pieza')
-            
-            for i, pieza in enumerate(piezas[:10]):
-                if i < len(posiciones):
-                    pieza.posicion = posiciones[i]
-                    pieza.save()
-                    piezas_actualizadas += 1
-        
+        cambiadas, tablero, piezas_actualizadas = self._posiciones_iniciales(partida)
+
+        # Las piezas pueden intercambiar casillas: se guardan en bloque (restricción única por casilla)
+        update_piece_positions(cambiadas)
+        Partida.objects.filter(pk=partida.pk).update(tablero=tablero)
+
         return Response({
             'mensaje': 'Posiciones actualizadas correctamente',
             'piezas_actualizadas': piezas_actualizadas
         }, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
+    @accion_versionada
+    def rematch(self, request, id_partida=None):
+        """
+        Revancha sobre la misma partida: devuelve las piezas a sus puntas, borra rondas y
+        movimientos y vuelve a empezar en la ronda 1 con los mismos jugadores. El número de
+        sentencias no depende de la longitud de la partida anterior.
+        """
+        partida = self.get_object()
+        primero = (
+            JugadorPartida.objects.filter(partida=partida)
+            .select_related('jugador')
+            .order_by('orden_participacion')
+            .first()
+        )
+        if primero is None:
+            return Response({ 'error': 'La partida no tiene jugadores asociados' }, status=status.HTTP_400_BAD_REQUEST)
+
+        stop_pondering(partida.id_partida)
+        cambiadas, tablero, _ = self._posiciones_iniciales(partida)
+
+        InstantaneaTablero.objects.filter(partida=partida).delete()
+        Movimiento.objects.filter(partida=partida).delete()
+        Ronda.objects.filter(partida=partida).delete()
+        update_piece_positions(cambiadas)
+        Partida.objects.filter(pk=partida.pk).update(
+            tablero=tablero,
+            estado='EN_CURSO',
+            fecha_inicio=timezone.now(),
+            fecha_fin=None,
+            tiempo_sobrante=0,
+        )
+        Ronda.objects.create(
+            id_ronda=f"R1_{partida.id_partida}",
+            jugador=primero.jugador,
+            numero=1,
+            partida=partida
+        )
+        publish_on_commit(partida.id_partida, partida.version, 'partida_reiniciada', {})
+
+        serializer = self.get_serializer(Partida.objects.get(pk=partida.pk))
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def _posiciones_iniciales(self, partida):
+        """
+        Calcula en memoria la colocación inicial de las piezas de la partida (dos consultas).
+
+        Devuelve las piezas que cambian de casilla (sin guardar), la codificación del tablero
+        resultante y el número de piezas colocadas en su punta.
+        """
+        slots = dict(
+            JugadorPartida.objects.filter(partida=partida).values_list('jugador_id', 'orden_participacion')
+        )
+        piezas = list(Pieza.objects.filter(partida=partida).only('id_pieza', 'posicion', 'jugador_id').order_by('id_pieza'))
+
+        por_jugador = {}
+        for pieza in piezas:
+            por_jugador.setdefault(pieza.jugador_id, []).append(pieza)
+
+        cambiadas = []
+        colocadas = 0
+        for jugador_id, orden in slots.items():
+            punta = punta_asignada(partida.numero_jugadores, orden)
+            posiciones = POSICIONES_POR_PUNTA.get(punta, POSICIONES_POR_PUNTA[0])
+            for pieza, posicion in zip(por_jugador.get(jugador_id, [])[:10], posiciones):
+                colocadas += 1
+                if pieza.posicion != posicion:
+                    pieza.posicion = posicion
+                    cambiadas.append(pieza)
+
+        tablero = encode_board((pieza.posicion, slots.get(pieza.jugador_id)) for pieza in piezas if pieza.posicion)
+        return cambiadas, tablero, colocadas
+
+    @action(detail=True, methods=['post'])
+    @accion_versionada
     def registrar_movimientos(self, request, id_partida=None):
         """
         Registra una lista de movimientos para la partida indicada.
@@ -475,77 +716,89 @@ class PartidaViewSet(viewsets.ModelViewSet):
         if not isinstance(movimientos_data, list) or len(movimientos_data) == 0:
             return Response({ 'error': 'No hay movimientos para registrar' }, status=status.HTTP_400_BAD_REQUEST)
 
-        occupied_positions = get_occupied_positions(partida.id_partida)
+        occupied_positions = get_occupied_positions(partida.id_partida, partida.tablero)
 
         ronda_actual = partida.rondas.filter(fin__isnull=True).order_by('numero').first()
         if not ronda_actual:
             return Response({ 'error': 'No hay ronda activa para la partida' }, status=status.HTTP_400_BAD_REQUEST)
 
-        created = []
-        piece_positions = {}
         moved_piece_id = None
         expected_jugador_id = None
         expected_ronda_id = None
         expected_partida_id = str(partida.id_partida)
         chain_mode = len(movimientos_data) > 1
 
+        # 1) Comprobaciones de forma: todos los pasos son del mismo jugador, ronda y pieza
         for idx, m in enumerate(movimientos_data, start=1):
+            if not isinstance(m, dict):
+                return Response({ 'error': f'Movimiento incompleto en índice {idx-1}' }, status=status.HTTP_400_BAD_REQUEST)
+            jugador_id = m.get('jugador_id')
+            ronda_id = m.get('ronda_id')
+            partida_id = m.get('partida_id')
+            pieza_id = m.get('pieza_id')
+
+            if not all([jugador_id, ronda_id, pieza_id, m.get('origen'), m.get('destino'), partida_id]):
+                return Response({ 'error': f'Movimiento incompleto en índice {idx-1}' }, status=status.HTTP_400_BAD_REQUEST)
+
+            if str(partida_id) != expected_partida_id:
+                return Response({ 'error': f'partida_id no coincide con la partida de la ruta: {partida_id} != {partida.id_partida}' }, status=status.HTTP_400_BAD_REQUEST)
+
+            if expected_jugador_id is None:
+                expected_jugador_id = str(jugador_id)
+            elif str(jugador_id) != expected_jugador_id:
+                return Response({ 'error': 'Todos los movimientos deben pertenecer al mismo jugador' }, status=status.HTTP_400_BAD_REQUEST)
+
+            if expected_ronda_id is None:
+                expected_ronda_id = str(ronda_id)
+            elif str(ronda_id) != expected_ronda_id:
+                return Response({ 'error': 'Todos los movimientos deben pertenecer a la misma ronda' }, status=status.HTTP_400_BAD_REQUEST)
+
+            if moved_piece_id is None:
+                moved_piece_id = str(pieza_id)
+            elif str(pieza_id) != moved_piece_id:
+                return Response({ 'error': 'No se permite mover varias piezas en una misma ronda' }, status=status.HTTP_400_BAD_REQUEST)
+
+        # 2) Jugador, ronda y pieza se resuelven una sola vez para toda la cadena
+        jugador = Jugador.objects.filter(id_jugador=expected_jugador_id).first()
+        if jugador is None:
+            return Response({ 'error': f'Jugador no encontrado: {expected_jugador_id}' }, status=status.HTTP_400_BAD_REQUEST)
+        if str(ronda_actual.id_ronda) == expected_ronda_id:
+            ronda = ronda_actual
+        else:
+            ronda = Ronda.objects.filter(id_ronda=expected_ronda_id).first()
+            if ronda is None:
+                return Response({ 'error': f'Ronda no encontrada: {expected_ronda_id}' }, status=status.HTTP_400_BAD_REQUEST)
+        pieza = Pieza.objects.filter(id_pieza=moved_piece_id).first()
+        if pieza is None:
+            return Response({ 'error': f'Pieza no encontrada: {moved_piece_id}' }, status=status.HTTP_400_BAD_REQUEST)
+
+        if str(ronda.partida_id) != expected_partida_id:
+            return Response({ 'error': 'La ronda no pertenece a la partida' }, status=status.HTTP_400_BAD_REQUEST)
+        if ronda.fin is not None:
+            return Response({ 'error': 'La ronda ya está finalizada' }, status=status.HTTP_400_BAD_REQUEST)
+        if str(ronda_actual.id_ronda) != str(ronda.id_ronda):
+            return Response({ 'error': 'No es la ronda activa de la partida' }, status=status.HTTP_400_BAD_REQUEST)
+        if str(ronda.jugador_id) != str(jugador.id_jugador):
+            return Response({ 'error': 'El jugador del movimiento no coincide con el jugador de la ronda' }, status=status.HTTP_400_BAD_REQUEST)
+        if str(pieza.partida_id) != expected_partida_id:
+            return Response({ 'error': 'La pieza no pertenece a la partida' }, status=status.HTTP_400_BAD_REQUEST)
+        if str(pieza.jugador_id) != str(jugador.id_jugador):
+            return Response({ 'error': 'La pieza no pertenece al jugador' }, status=status.HTTP_400_BAD_REQUEST)
+
+        enforce_move_rules = (not bool(getattr(jugador, 'humano', False))) or bool(getattr(settings, 'ENFORCE_MOVE_VALIDATION_FOR_HUMANS', False))
+
+        # 3) Validación de la cadena completa en memoria; los pasos se guardan al final
+        pasos = []
+        posicion_actual = pieza.posicion
+        for idx, m in enumerate(movimientos_data, start=1):
+            origen = m.get('origen')
+            destino = m.get('destino')
             try:
-                jugador_id = m.get('jugador_id')
-                ronda_id = m.get('ronda_id')
-                partida_id = m.get('partida_id')
-                pieza_id = m.get('pieza_id')
-                origen = m.get('origen')
-                destino = m.get('destino')
-
-                if not all([jugador_id, ronda_id, pieza_id, origen, destino, partida_id]):
-                    return Response({ 'error': f'Movimiento incompleto en índice {idx-1}' }, status=status.HTTP_400_BAD_REQUEST)
-
-                if str(partida_id) != expected_partida_id:
-                    return Response({ 'error': f'partida_id no coincide con la partida de la ruta: {partida_id} != {partida.id_partida}' }, status=status.HTTP_400_BAD_REQUEST)
-
-                if expected_jugador_id is None:
-                    expected_jugador_id = str(jugador_id)
-                elif str(jugador_id) != expected_jugador_id:
-                    return Response({ 'error': 'Todos los movimientos deben pertenecer al mismo jugador' }, status=status.HTTP_400_BAD_REQUEST)
-
-                if expected_ronda_id is None:
-                    expected_ronda_id = str(ronda_id)
-                elif str(ronda_id) != expected_ronda_id:
-                    return Response({ 'error': 'Todos los movimientos deben pertenecer a la misma ronda' }, status=status.HTTP_400_BAD_REQUEST)
-
-                if moved_piece_id is None:
-                    moved_piece_id = str(pieza_id)
-                elif str(pieza_id) != moved_piece_id:
-                    return Response({ 'error': 'No se permite mover varias piezas en una misma ronda' }, status=status.HTTP_400_BAD_REQUEST)
-
-                jugador = Jugador.objects.get(id_jugador=jugador_id)
-                ronda = Ronda.objects.get(id_ronda=ronda_id)
-                pieza = Pieza.objects.get(id_pieza=pieza_id)
-
-                enforce_move_rules = (not bool(getattr(jugador, 'humano', False))) or bool(getattr(settings, 'ENFORCE_MOVE_VALIDATION_FOR_HUMANS', False))
-
-                if str(ronda.partida_id) != expected_partida_id:
-                    return Response({ 'error': 'La ronda no pertenece a la partida' }, status=status.HTTP_400_BAD_REQUEST)
-                if ronda.fin is not None:
-                    return Response({ 'error': 'La ronda ya está finalizada' }, status=status.HTTP_400_BAD_REQUEST)
-                if str(ronda_actual.id_ronda) != str(ronda.id_ronda):
-                    return Response({ 'error': 'No es la ronda activa de la partida' }, status=status.HTTP_400_BAD_REQUEST)
-                if str(ronda.jugador_id) != str(jugador.id_jugador):
-                    return Response({ 'error': 'El jugador del movimiento no coincide con el jugador de la ronda' }, status=status.HTTP_400_BAD_REQUEST)
-                if str(pieza.partida_id) != expected_partida_id:
-                    return Response({ 'error': 'La pieza no pertenece a la partida' }, status=status.HTTP_400_BAD_REQUEST)
-                if str(pieza.jugador_id) != str(jugador.id_jugador):
-                    return Response({ 'error': 'La pieza no pertenece al jugador' }, status=status.HTTP_400_BAD_REQUEST)
-
-                expected_origin = pieza.posicion
-                if pieza_id in piece_positions:
-                    expected_origin = piece_positions[pieza_id][1]
-                if str(origen) != str(expected_origin):
+                if str(origen) != str(posicion_actual):
                     return Response({
                         'error': 'El origen no coincide con la posición actual de la pieza',
                         'origen_recibido': origen,
-                        'origen_esperado': expected_origin,
+                        'origen_esperado': posicion_actual,
                     }, status=status.HTTP_400_BAD_REQUEST)
 
                 if enforce_move_rules:
@@ -569,19 +822,9 @@ class PartidaViewSet(viewsets.ModelViewSet):
 
                                     occupied_positions.discard(step_origen)
                                     occupied_positions.add(step_destino)
+                                    pasos.append((f"{idx}_{step_i + 1}", step_origen, step_destino))
 
-                                    mov = Movimiento.objects.create(
-                                        id_movimiento=f"M_{ronda.id_ronda}_{idx}_{step_i + 1}_{datetime.now().timestamp()}",
-                                        jugador=jugador,
-                                        pieza=pieza,
-                                        ronda=ronda,
-                                        partida=partida,
-                                        origen=step_origen,
-                                        destino=step_destino,
-                                    )
-                                    created.append(mov)
-
-                                piece_positions[pieza_id] = (pieza, destino)
+                                posicion_actual = destino
                                 continue
 
                         return Response({
@@ -613,54 +856,52 @@ class PartidaViewSet(viewsets.ModelViewSet):
 
                                 occupied_positions.discard(step_origen)
                                 occupied_positions.add(step_destino)
+                                pasos.append((f"{idx}_{step_i + 1}", step_origen, step_destino))
 
-                                mov = Movimiento.objects.create(
-                                    id_movimiento=f"M_{ronda.id_ronda}_{idx}_{step_i + 1}_{datetime.now().timestamp()}",
-                                    jugador=jugador,
-                                    pieza=pieza,
-                                    ronda=ronda,
-                                    partida=partida,
-                                    origen=step_origen,
-                                    destino=step_destino,
-                                )
-                                created.append(mov)
-
-                            piece_positions[pieza_id] = (pieza, destino)
+                            posicion_actual = destino
                             continue
 
                 occupied_positions.discard(origen)
                 occupied_positions.add(destino)
+                pasos.append((str(idx), origen, destino))
+                posicion_actual = destino
 
-                mov = Movimiento.objects.create(
-                    id_movimiento=f"M_{ronda.id_ronda}_{idx}_{datetime.now().timestamp()}",
+            except Exception as e:
+                return Response({ 'error': str(e) }, status=status.HTTP_400_BAD_REQUEST)
+
+        # 4) Escritura: inserción en bloque + un único UPDATE de la pieza, todo o nada
+        marca = datetime.now().timestamp()
+        with transaction.atomic():
+            primer_ply = Movimiento.next_ply(partida.id_partida)
+            created = Movimiento.objects.bulk_create([
+                Movimiento(
+                    id_movimiento=f"M_{ronda.id_ronda}_{sufijo}_{marca}",
                     jugador=jugador,
                     pieza=pieza,
                     ronda=ronda,
                     partida=partida,
-                    origen=origen,
-                    destino=destino,
+                    origen=paso_origen,
+                    destino=paso_destino,
+                    ply=primer_ply + i,
                 )
-                created.append(mov)
-
-                piece_positions[pieza_id] = (pieza, destino)
-                
-            except Jugador.DoesNotExist:
-                return Response({ 'error': f'Jugador no encontrado: {jugador_id}' }, status=status.HTTP_400_BAD_REQUEST)
-            except Ronda.DoesNotExist:
-                return Response({ 'error': f'Ronda no encontrada: {ronda_id}' }, status=status.HTTP_400_BAD_REQUEST)
-            except Pieza.DoesNotExist:
-                return Response({ 'error': f'Pieza no encontrada: {pieza_id}' }, status=status.HTTP_400_BAD_REQUEST)
-            except Exception as e:
-                return Response({ 'error': str(e) }, status=status.HTTP_400_BAD_REQUEST)
-
-        for pieza, destino in piece_positions.values():
-            pieza.posicion = destino
-            pieza.save()
+                for i, (sufijo, paso_origen, paso_destino) in enumerate(pasos)
+            ])
+            Pieza.objects.filter(pk=pieza.pk).update(posicion=posicion_actual)
+            tablero = move_on_board(partida.tablero or build_board(partida.id_partida), pieza.posicion, posicion_actual)
+            Partida.objects.filter(pk=partida.pk).update(tablero=tablero)
+            save_checkpoints(partida.id_partida, tablero, created)
+            publish_on_commit(partida.id_partida, partida.version, 'movimiento_registrado', {
+                'movimientos': [movimiento_datos(m) for m in created],
+            })
+
+        # La jugada ya está hecha: cortar la búsqueda anticipada para que el agente recoja su árbol
+        stop_pondering(partida.id_partida, discard=False)
 
         serializer = MovimientoSerializer(created, many=True)
         return Response({ 'registrados': serializer.data }, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['post'])
+    @accion_versionada
     def avanzar_ronda(self, request, id_partida=None):
         """Actualiza la ronda actual y crea la nueva ronda."""
         partida = self.get_object()
@@ -772,23 +1013,20 @@ class PartidaViewSet(viewsets.ModelViewSet):
         if not JugadorPartida.objects.filter(partida=partida, jugador=jugador_nuevo).exists():
             return Response({ 'error': 'El jugador no pertenece a la partida' }, status=status.HTTP_400_BAD_REQUEST)
 
-        new_round_id = f"R{numero_nuevo_int}_{partida.id_partida}"
-
-        nueva_ronda = Ronda(
-            id_ronda=new_round_id,
-            jugador=jugador_nuevo,
-            numero=numero_nuevo_int,
-            partida=partida
-        )
+        inicio_ronda = None
         if inicio_nuevo:
             try:
                 if isinstance(inicio_nuevo, (int, float)):
-                    nueva_ronda.inicio = datetime.fromtimestamp(inicio_nuevo / 1000.0, tz=timezone.get_current_timezone())
+                    inicio_ronda = datetime.fromtimestamp(inicio_nuevo / 1000.0, tz=timezone.get_current_timezone())
                 else:
-                    nueva_ronda.inicio = datetime.fromisoformat(str(inicio_nuevo))
+                    inicio_ronda = datetime.fromisoformat(str(inicio_nuevo))
             except Exception:
-                nueva_ronda.inicio = timezone.now()
-        nueva_ronda.save()
+                inicio_ronda = timezone.now()
+        nueva_ronda = self._abrir_ronda(partida, jugadores_ordenados, next_idx, numero_nuevo_int, inicio=inicio_ronda)
+        publish_on_commit(partida.id_partida, partida.version, 'ronda_avanzada', {
+            'ronda_actualizada': updated_round.id_ronda if updated_round else None,
+            'nueva_ronda': ronda_datos(nueva_ronda),
+        })
 
         response_data = {
             'nueva_ronda': RondaSerializer(nueva_ronda).data
@@ -798,7 +1036,569 @@ class PartidaViewSet(viewsets.ModelViewSet):
 
         return Response(response_data, status=status.HTTP_201_CREATED)
     
+    def _abrir_ronda(self, partida, jugadores_ordenados, idx, numero, inicio=None):
+        """Crea la ronda `numero` del jugador en la posición `idx` del orden de participación.
+
+        Tras el commit lanza el precálculo de la jugada (si el jugador es un agente) y la
+        búsqueda anticipada del siguiente agente (si el jugador es humano).
+        """
+        jugador = jugadores_ordenados[idx].jugador
+        # Varias rondas comparten `numero` (una por jugador): el id debe incluir el orden del jugador
+        nueva_ronda = Ronda(
+            id_ronda=f"R{numero}_J{idx + 1}_{partida.id_partida}",
+            jugador=jugador,
+            numero=numero,
+            partida=partida
+        )
+        if inicio is not None:
+            nueva_ronda.inicio = inicio
+        nueva_ronda.save()
+
+        jugador_siguiente = jugadores_ordenados[(idx + 1) % len(jugadores_ordenados)].jugador
+        transaction.on_commit(lambda: self._precompute_ai_turn(partida.id_partida, jugador))
+        transaction.on_commit(lambda: self._ponder_ai_turn(partida.id_partida, jugador, jugador_siguiente))
+        return nueva_ronda
+
+    def _precompute_ai_turn(self, partida_id, jugador):
+        """Si la nueva ronda es de un agente Inteligente, empieza a calcular su jugada en segundo plano.
+
+        El resultado queda en la caché de sugerencias con los mismos parámetros que usa el
+        frontend, de modo que `sugerir_movimiento` solo tiene que recogerlo.
+        """
+        if jugador.humano or not getattr(settings, 'AI_PRECOMPUTE_ENABLED', True):
+            return
+        agente = AgenteInteligente.objects.filter(jugador=jugador).first()
+        if agente is None:
+            return
+        try:
+            schedule_suggestion(
+                partida_id,
+                jugador.id_jugador,
+                nivel=int(agente.nivel or 1),
+                allow_simple=True,
+                iterations=DEFAULT_MCTS_ITERATIONS,
+                rollout_depth=DEFAULT_MCTS_ROLLOUT_DEPTH,
+            )
+        except Exception:
+            # El precálculo es solo una optimización: nunca debe romper el avance de ronda
+            pass
+
+    def _ponder_ai_turn(self, partida_id, jugador, siguiente):
+        """Durante la ronda de un humano, si le sigue un agente MCTS, anticipa su búsqueda (modo ponder)."""
+        if not jugador.humano or siguiente.humano or not getattr(settings, 'MCTS_PONDERING_ENABLED', False):
+            return
+        agente = AgenteInteligente.objects.filter(jugador=siguiente).first()
+        if agente is None or int(agente.nivel or 1) < 2:
+            return
+        try:
+            schedule_pondering(partida_id, siguiente.id_jugador)
+        except Exception:
+            pass
+
     @action(detail=True, methods=['post'])
+    def jugar_turno_ia(self, request, id_partida=None):
+        """
+        Juega en el servidor el turno del agente Inteligente de la ronda activa.
+        Calcula la jugada, registra todos sus saltos, cierra la ronda y abre la siguiente
+        en una única transacción (sustituye a sugerir_movimiento + registrar_movimientos +
+        avanzar_ronda).
+        """
+        partida = self.get_object()
+        version_cliente = version_de_peticion(request, partida)
+        ronda_actual = partida.rondas.filter(fin__isnull=True).select_related('jugador').order_by('numero').first()
+        if not ronda_actual:
+            return Response({ 'error': 'No hay ronda activa para la partida' }, status=status.HTTP_400_BAD_REQUEST)
+
+        jugador = ronda_actual.jugador
+        if jugador.humano:
+            return Response({ 'error': 'La ronda activa es de un jugador humano' }, status=status.HTTP_400_BAD_REQUEST)
+        agente = AgenteInteligente.objects.filter(jugador=jugador).first()
+        if agente is None:
+            return Response({ 'error': 'El jugador de la ronda activa no tiene agente inteligente' }, status=status.HTTP_400_BAD_REQUEST)
+
+        jugadores_ordenados = list(
+            JugadorPartida.objects
+            .filter(partida=partida)
+            .select_related('jugador')
+            .order_by('orden_participacion')
+        )
+        current_idx = next(
+            (idx for idx, jp in enumerate(jugadores_ordenados) if str(jp.jugador_id) == str(jugador.id_jugador)),
+            None,
+        )
+        if current_idx is None:
+            return Response({ 'error': 'La ronda activa tiene un jugador no asociado a la partida' }, status=status.HTTP_400_BAD_REQUEST)
+
+        allow_simple = _permite_simples(request)
+        try:
+            sugerencia = suggest_move_cached(
+                partida.id_partida,
+                jugador.id_jugador,
+                nivel=int(agente.nivel or 1),
+                allow_simple=allow_simple,
+                iterations=DEFAULT_MCTS_ITERATIONS,
+                rollout_depth=DEFAULT_MCTS_ROLLOUT_DEPTH,
+                version=partida.version,
+            )
+        except ValueError as e:
+            return Response({ 'error': str(e) }, status=status.HTTP_400_BAD_REQUEST)
+
+        pasos = sugerencia.get('secuencia') or [{ 'origen': sugerencia['origen'], 'destino': sugerencia['destino'] }]
+        next_idx = (current_idx + 1) % len(jugadores_ordenados)
+        numero_nuevo = int(ronda_actual.numero) + 1 if next_idx == 0 else int(ronda_actual.numero)
+
+        try:
+            with transaction.atomic():
+                # La búsqueda se hizo fuera de la sección crítica: solo se aplica si nadie cambió la partida
+                reclamar_version(partida, version_cliente)
+
+                # La pieza debe seguir donde la vio el agente (otra petición pudo jugar el turno)
+                actualizadas = Pieza.objects.filter(
+                    id_pieza=sugerencia['pieza_id'],
+                    partida=partida,
+                    jugador=jugador,
+                    posicion=pasos[0]['origen'],
+                ).update(posicion=pasos[-1]['destino'])
+                if actualizadas != 1:
+                    raise IntegrityError('La pieza ya no está en el origen calculado')
+                tablero = Partida.objects.filter(pk=partida.pk).values_list('tablero', flat=True).get() or build_board(partida.id_partida)
+                tablero = move_on_board(tablero, pasos[0]['origen'], pasos[-1]['destino'])
+                Partida.objects.filter(pk=partida.pk).update(tablero=tablero)
+
+                primer_ply = Movimiento.next_ply(partida.id_partida)
+                created = Movimiento.objects.bulk_create([
+                    Movimiento(
+                        id_movimiento=f"M_{ronda_actual.id_ronda}_{i}",
+                        jugador=jugador,
+                        pieza_id=sugerencia['pieza_id'],
+                        ronda=ronda_actual,
+                        partida=partida,
+                        origen=paso['origen'],
+                        destino=paso['destino'],
+                        ply=primer_ply + i - 1,
+                    )
+                    for i, paso in enumerate(pasos, start=1)
+                ])
+                save_checkpoints(partida.id_partida, tablero, created)
+
+                ronda_actual.fin = timezone.now()
+                ronda_actual.save(update_fields=['fin'])
+                nueva_ronda = self._abrir_ronda(partida, jugadores_ordenados, next_idx, numero_nuevo)
+                publish_on_commit(partida.id_partida, partida.version, 'movimiento_registrado', {
+                    'movimientos': [movimiento_datos(m) for m in created],
+                })
+                publish_on_commit(partida.id_partida, partida.version, 'ronda_avanzada', {
+                    'ronda_actualizada': ronda_actual.id_ronda,
+                    'nueva_ronda': ronda_datos(nueva_ronda),
+                })
+        except ConflictoVersion as e:
+            return Response({ 'error': str(e), 'version': e.version_actual }, status=status.HTTP_409_CONFLICT)
+        except IntegrityError:
+            return Response({ 'error': 'El turno ya se ha jugado o el tablero ha cambiado' }, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            'version': partida.version,
+            'movimiento': sugerencia,
+            'registrados': MovimientoSerializer(created, many=True).data,
+            'ronda_actualizada': RondaSerializer(ronda_actual).data,
+            'nueva_ronda': RondaSerializer(nueva_ronda).data,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def simular(self, request, id_partida=None):
+        """
+        Juega en el servidor `turnos` turnos (o la partida completa si no se indica) de una
+        partida demo o entre agentes Inteligentes y devuelve la lista de jugadas para animarlas.
+        La simulación se corta a los `SIMULATION_TIME_BUDGET` segundos (`tiempo_agotado`).
+
+        Como en `jugar_turno_ia`, los turnos se calculan sin transacción abierta; la versión se
+        reclama solo al guardar el resultado, y si la partida cambió entretanto se responde 409.
+        """
+        partida = self.get_object()
+        version_cliente = version_de_peticion(request, partida)
+        turnos = request.data.get('turnos')
+        iteraciones = request.data.get('iteraciones', DEFAULT_MCTS_ITERATIONS)
+        try:
+            turnos = int(turnos) if turnos is not None else None
+            iteraciones = max(1, min(int(iteraciones), 2000))
+        except (TypeError, ValueError):
+            return Response({ 'error': 'turnos e iteraciones deben ser enteros' }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            resultado = simulate_game(
+                partida.id_partida,
+                max_turnos=turnos,
+                iterations=iteraciones,
+                allow_simple=_permite_simples(request),
+                seed=request.data.get('seed'),
+                before_persist=lambda: reclamar_version(partida, version_cliente),
+            )
+        except ConflictoVersion as e:
+            return Response({ 'error': str(e), 'version': e.version_actual }, status=status.HTTP_409_CONFLICT)
+        except IntegrityError:
+            return Response({ 'error': 'La partida ha cambiado durante la simulación' }, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({ 'error': str(e) }, status=status.HTTP_400_BAD_REQUEST)
+
+        if resultado['ronda_activa']:
+            # Como `_abrir_ronda`: precálculo del agente de la ronda abierta o búsqueda anticipada
+            ronda = Ronda.objects.select_related('jugador').get(pk=resultado['ronda_activa'])
+            orden = [
+                jp.jugador for jp in JugadorPartida.objects.filter(partida=partida)
+                .select_related('jugador').order_by('orden_participacion')
+            ]
+            idx = next(i for i, jugador in enumerate(orden) if jugador.id_jugador == ronda.jugador_id)
+            siguiente = orden[(idx + 1) % len(orden)]
+            transaction.on_commit(lambda: self._precompute_ai_turn(partida.id_partida, ronda.jugador))
+            transaction.on_commit(lambda: self._ponder_ai_turn(partida.id_partida, ronda.jugador, siguiente))
+
+        resultado['version'] = partida.version
+        return Response(resultado, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'], url_path='export')
+    def export(self, request, id_partida=None):
+        """
+        Exporta la partida en notación compacta (ver game/notation.py): el registro completo
+        tipo PGN y la posición actual tipo FEN.
+        """
+        partida = self.get_object()
+        participaciones = list(
+            JugadorPartida.objects.filter(partida=partida).select_related('jugador').order_by('orden_participacion')
+        )
+        if not participaciones:
+            return Response({ 'error': 'La partida no tiene jugadores asociados' }, status=status.HTTP_400_BAD_REQUEST)
+        slots = {jp.jugador_id: jp.orden_participacion for jp in participaciones}
+        niveles = dict(
+            AgenteInteligente.objects.filter(jugador_id__in=list(slots)).values_list('jugador_id', 'nivel')
+        )
+        rondas = {
+            id_ronda: (numero, jugador_id, fin)
+            for id_ronda, numero, jugador_id, fin in Ronda.objects.filter(partida=partida).values_list('id_ronda', 'numero', 'jugador_id', 'fin')
+        }
+
+        # Un turno por ronda: casillas recorridas por la pieza en orden de `ply`
+        turnos = []
+        pasos = list(Movimiento.objects.filter(partida=partida).order_by('ply').values_list('ronda_id', 'origen', 'destino'))
+        for ronda_id, origen, destino in pasos:
+            if turnos and turnos[-1][0] == ronda_id and turnos[-1][1][-1] == origen:
+                turnos[-1][1].append(destino)
+            else:
+                turnos.append((ronda_id, [origen, destino]))
+
+        # Posición inicial: deshacer los movimientos uno a uno (una cadena puede volver a su origen)
+        tablero = partida.tablero or build_board(partida.id_partida)
+        tablero_inicial = tablero
+        for _ronda_id, origen, destino in reversed(pasos):
+            tablero_inicial = move_on_board(tablero_inicial, destino, origen)
+
+        activa = next((r for r in sorted(rondas.values(), key=lambda r: r[0]) if r[2] is None), None)
+        if turnos:
+            numero_inicial, jugador_inicial, _ = rondas[turnos[0][0]]
+        elif activa:
+            numero_inicial, jugador_inicial, _ = activa
+        else:
+            numero_inicial, jugador_inicial = 1, participaciones[0].jugador_id
+        turno_inicial = slots.get(jugador_inicial, 1)
+
+        cabeceras = [
+            ('Partida', partida.id_partida),
+            ('Fecha', partida.fecha_inicio.date().isoformat()),
+            ('Jugadores', partida.numero_jugadores),
+        ]
+        for jp in participaciones:
+            tipo = 'humano' if jp.jugador.humano else f"ia{niveles.get(jp.jugador_id) or 1}"
+            cabeceras += [(f"J{jp.orden_participacion}", jp.jugador.nombre), (f"J{jp.orden_participacion}Tipo", tipo)]
+        if (tablero_inicial, turno_inicial, numero_inicial) != (start_board(partida.numero_jugadores), 1, 1):
+            cabeceras.append(('Posicion', position_to_fen(tablero_inicial, turno_inicial, partida.numero_jugadores, numero_inicial)))
+        cabeceras.append(('Estado', partida.estado))
+
+        ganador = find_winner(partida.id_partida, [jp.jugador_id for jp in participaciones]) if partida.estado == 'FINALIZADA' else None
+        registro = format_record(
+            cabeceras,
+            [
+                (rondas[ronda_id][0], format_turn(casillas, salto=not is_adjacent(casillas[0], casillas[1])))
+                for ronda_id, casillas in turnos
+            ],
+            f"J{slots[ganador]}" if ganador in slots else '*',
+        )
+
+        if activa:
+            turno_actual, numero_actual = slots.get(activa[1], 1), activa[0]
+        else:
+            turno_actual, numero_actual = turno_inicial, numero_inicial
+        return Response({
+            'registro': registro,
+            'posicion': position_to_fen(tablero, turno_actual, partida.numero_jugadores, numero_actual),
+        })
+
+    @action(detail=False, methods=['post'])
+    def importar(self, request):
+        """
+        Crea una partida a partir de un registro (`registro`, ver `export`) o de una posición
+        (`posicion`, con `jugadores` opcional en el formato de `start_game`). Los turnos del
+        registro se validan con las reglas del juego y todo se inserta en bloque.
+        """
+        registro = request.data.get('registro')
+        posicion = request.data.get('posicion')
+        if not registro and not posicion:
+            return Response({ 'error': 'Se requiere registro o posicion' }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            if registro:
+                cabeceras, tokens, resultado = parse_record(registro)
+                if cabeceras.get('Posicion'):
+                    tablero, turno, numero_jugadores, ronda = fen_to_position(cabeceras['Posicion'])
+                else:
+                    numero_jugadores = int(cabeceras.get('Jugadores', 0))
+                    if numero_jugadores not in (2, 3, 4, 6):
+                        raise ValueError("La cabecera Jugadores debe ser 2, 3, 4 o 6")
+                    tablero, turno, ronda = start_board(numero_jugadores), 1, 1
+                jugadores = []
+                for slot in range(1, numero_jugadores + 1):
+                    tipo = cabeceras.get(f"J{slot}Tipo", 'ia1')
+                    jugadores.append((
+                        cabeceras.get(f"J{slot}", f"Jugador {slot}"),
+                        tipo == 'humano',
+                        2 if tipo == 'ia2' else 1,
+                    ))
+                finalizada = resultado != '*' or cabeceras.get('Estado') == 'FINALIZADA'
+            else:
+                tablero, turno, numero_jugadores, ronda = fen_to_position(posicion)
+                datos = request.data.get('jugadores') or [{'tipo': 'ia'} for _ in range(numero_jugadores)]
+                if len(datos) != numero_jugadores:
+                    raise ValueError("jugadores no coincide con el número de jugadores de la posición")
+                jugadores = [
+                    (
+                        d.get('nombre', f"Jugador {slot}") if d.get('tipo', 'humano') == 'humano' else f"Agente Inteligente {slot}",
+                        d.get('tipo', 'humano') == 'humano',
+                        2 if d.get('dificultad') == 'Difícil' else 1,
+                    )
+                    for slot, d in enumerate(datos, start=1)
+                ]
+                tokens, finalizada = [], False
+            partida = self._importar_partida(numero_jugadores, jugadores, tablero, turno, ronda, tokens, finalizada)
+        except ValueError as e:
+            return Response({ 'error': str(e) }, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(Partida.objects.get(pk=partida.pk))
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """
+        Exporta en streaming (NDJSON, una línea por partida con jugadores y movimientos) las
+        partidas filtradas por `estado` (repetible), `desde`/`hasta` (fecha de inicio, ISO 8601)
+        y `is_demo`. La memoria no depende del número de partidas (ver game/export.py).
+        """
+        params = request.query_params
+        try:
+            desde, hasta = parse_fecha(params.get('desde')), parse_fecha(params.get('hasta'))
+        except ValueError as e:
+            return Response({ 'error': str(e) }, status=status.HTTP_400_BAD_REQUEST)
+        is_demo = {'true': True, '1': True, 'false': False, '0': False}.get(params.get('is_demo', ''))
+
+        partidas = filter_games(params.getlist('estado'), desde, hasta, is_demo)
+        response = StreamingHttpResponse(iter_ndjson(partidas), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="partidas.ndjson"'
+        return response
+
+    def _importar_partida(self, numero_jugadores, jugadores_spec, tablero, turno, ronda_inicial, tokens, finalizada):
+        """Reproduce en memoria los turnos sobre la posición dada y guarda la partida con inserciones en bloque."""
+        marca = datetime.now().timestamp()
+        partida = Partida(id_partida=f"P_{marca}", numero_jugadores=numero_jugadores)
+
+        jugadores = []
+        agentes = []
+        for slot, (nombre, humano, nivel) in enumerate(jugadores_spec, start=1):
+            jugador = Jugador(id_jugador=f"J{slot}_{marca}", nombre=nombre, humano=humano, numero=slot)
+            jugadores.append(jugador)
+            if not humano:
+                agentes.append(AgenteInteligente(jugador=jugador, nivel=nivel))
+
+        piezas_en = {}
+        por_jugador = [0] * numero_jugadores
+        for idx, c in enumerate(tablero):
+            if c == EMPTY_CELL:
+                continue
+            if c == UNKNOWN_OWNER:
+                raise ValueError("La posición tiene piezas sin dueño")
+            slot = int(c)
+            punta = punta_asignada(numero_jugadores, slot)
+            jugador = jugadores[slot - 1]
+            piezas_en[CELL_KEYS[idx]] = Pieza(
+                id_pieza=f"P_{jugador.id_jugador}_{por_jugador[slot - 1]}_{partida.id_partida}",
+                tipo=f"{punta}-{COLORES_POR_PUNTA.get(punta, '')}",
+                punta=punta,
+                posicion=CELL_KEYS[idx],
+                jugador=jugador,
+                partida=partida,
+            )
+            por_jugador[slot - 1] += 1
+        for slot, total in enumerate(por_jugador, start=1):
+            if total != len(POSICIONES_POR_PUNTA[punta_asignada(numero_jugadores, slot)]):
+                raise ValueError(f"El jugador {slot} debe tener todas sus piezas en el tablero")
+        piezas = list(piezas_en.values())
+
+        ocupadas = set(piezas_en)
+        rondas, movimientos = [], []
+        slot, numero = turno, ronda_inicial
+        # marcas[k]: instante en que termina de reproducirse el turno k (marcas[0], el inicio)
+        marcas = [timestamp_after()]
+        for token in tokens:
+            casillas = parse_turn(token)
+            pieza = piezas_en.get(casillas[0])
+            if pieza is None or pieza.jugador is not jugadores[slot - 1]:
+                raise ValueError(f"Turno {token}: el origen no tiene una pieza del jugador {slot}")
+            ronda = Ronda(id_ronda=f"R{numero}_J{slot}_{partida.id_partida}", jugador=pieza.jugador, numero=numero, partida=partida)
+            rondas.append(ronda)
+            for paso_origen, paso_destino in zip(casillas, casillas[1:]):
+                valido, error = validate_move(paso_origen, paso_destino, ocupadas, allow_simple=len(casillas) == 2)
+                if not valido:
+                    raise ValueError(f"Turno {token}: {error}")
+                ocupadas.discard(paso_origen)
+                ocupadas.add(paso_destino)
+                movimientos.append(Movimiento(
+                    id_movimiento=f"M_{ronda.id_ronda}_{len(movimientos) + 1}",
+                    jugador=pieza.jugador,
+                    pieza=pieza,
+                    ronda=ronda,
+                    partida=partida,
+                    origen=paso_origen,
+                    destino=paso_destino,
+                    ply=len(movimientos) + 1,
+                ))
+            del piezas_en[casillas[0]]
+            pieza.posicion = casillas[-1]
+            piezas_en[casillas[-1]] = pieza
+            marcas.append(timestamp_after(marcas[-1]))
+            slot = slot % numero_jugadores + 1
+            if slot == 1:
+                numero += 1
+
+        cerradas = len(rondas)
+        if not finalizada:
+            rondas.append(Ronda(
+                id_ronda=f"R{numero}_J{slot}_{partida.id_partida}", jugador=jugadores[slot - 1], numero=numero, partida=partida
+            ))
+        partida.tablero = encode_board((pieza.posicion, int(pieza.jugador.numero)) for pieza in piezas)
+        partida.estado = 'FINALIZADA' if finalizada else 'EN_CURSO'
+
+        with transaction.atomic():
+            Jugador.objects.bulk_create(jugadores)
+            AgenteInteligente.objects.bulk_create(agentes)
+            partida.save(force_insert=True)
+            JugadorPartida.objects.bulk_create([
+                JugadorPartida(jugador=jugador, partida=partida, orden_participacion=slot)
+                for slot, jugador in enumerate(jugadores, start=1)
+            ])
+            Pieza.objects.bulk_create(piezas)
+            Ronda.objects.bulk_create(rondas)
+            # `inicio` es auto_now_add: tras insertarlas se fijan los instantes medidos al
+            # reproducir los turnos (la ronda k empieza cuando termina el turno k - 1)
+            for k, ronda in enumerate(rondas):
+                ronda.inicio = marcas[k]
+                ronda.fin = marcas[k + 1] if k < cerradas else None
+            Ronda.objects.bulk_update(rondas, ['inicio', 'fin'])
+            Partida.objects.filter(pk=partida.pk).update(
+                fecha_inicio=marcas[0],
+                fecha_fin=timestamp_after(marcas[-1]) if finalizada else None,
+            )
+            Movimiento.objects.bulk_create(movimientos)
+            save_checkpoints(partida.id_partida, partida.tablero, movimientos)
+        return partida
+
+    @action(detail=True, methods=['get'])
+    def posicion(self, request, id_partida=None):
+        """
+        Tablero de la partida tras el movimiento `ply` (por defecto el último; 0 = colocación
+        inicial). Se reconstruye desde la instantánea más cercana aplicando como mucho
+        `TABLERO_INSTANTANEA_PLIES` movimientos (ver `board.position_at_ply`).
+        """
+        fila = Partida.objects.filter(id_partida=id_partida).values('tablero').first()
+        if fila is None:
+            raise NotFound('Partida no encontrada')
+        ultimo_ply = Movimiento.next_ply(id_partida) - 1
+
+        try:
+            ply = int(request.query_params.get('ply', ultimo_ply))
+        except (TypeError, ValueError):
+            return Response({ 'error': 'ply debe ser un entero' }, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 <= ply <= ultimo_ply:
+            return Response({ 'error': f'ply debe estar entre 0 y {ultimo_ply}' }, status=status.HTTP_400_BAD_REQUEST)
+
+        tablero, aplicados = position_at_ply(id_partida, ply, fila['tablero'] or build_board(id_partida), ultimo_ply)
+        return Response({
+            'id_partida': id_partida,
+            'ply': ply,
+            'ultimo_ply': ultimo_ply,
+            'tablero': tablero,
+            'casillas': decode_board(tablero),
+            'movimientos_aplicados': aplicados,
+        })
+
+    @action(detail=True, methods=['get'])
+    def sincronizar(self, request, id_partida=None):
+        """
+        Estado compacto de la partida para refrescar la vista: tablero codificado, ronda activa
+        y solo los movimientos con `ply` mayor que `desde_ply`. Si el `If-None-Match` del cliente
+        coincide con el `ETag` actual responde 304 sin consultar rondas ni movimientos.
+        """
+        try:
+            desde_ply = max(0, int(request.query_params.get('desde_ply') or 0))
+        except (TypeError, ValueError):
+            return Response({ 'error': 'desde_ply debe ser un entero' }, status=status.HTTP_400_BAD_REQUEST)
+
+        fila = Partida.objects.filter(id_partida=id_partida).values('estado', 'version', 'tablero').first()
+        if fila is None:
+            raise NotFound('Partida no encontrada')
+
+        # `version` cambia con cada jugada o cambio de ronda; el tablero y el estado cubren
+        # las ediciones directas de piezas y el final de la partida
+        tablero = fila['tablero'] or build_board(id_partida)
+        huella = zlib.crc32(f"{fila['estado']}|{tablero}".encode())
+        etag = f'"{fila["version"]}-{huella:08x}-{desde_ply}"'
+        cabeceras = { 'ETag': etag, 'Cache-Control': 'no-cache' }
+
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in [e.strip() for e in if_none_match.split(',')] or if_none_match.strip() == '*':
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=cabeceras)
+
+        return Response({
+            'id_partida': id_partida,
+            'estado': fila['estado'],
+            'version': fila['version'],
+            'tablero': tablero,
+            **game_delta(id_partida, desde_ply),
+        }, headers=cabeceras)
+
+    @action(detail=True, methods=['get'])
+    def eventos(self, request, id_partida=None):
+        """
+        Long-poll de cambios de la partida. Espera hasta `timeout` segundos a que la partida
+        pase de `version` y devuelve los eventos (`movimiento_registrado`, `ronda_avanzada` o,
+        si no están en este proceso, un evento `sincronizacion` con los movimientos desde
+        `desde_ply`). Sin `version` responde al momento con la versión actual.
+        """
+        maximo = float(getattr(settings, 'EVENTOS_LONG_POLL_TIMEOUT', 25))
+        try:
+            version = request.query_params.get('version')
+            desde_ply = max(0, int(request.query_params.get('desde_ply') or 0))
+            timeout = max(0.0, min(float(request.query_params.get('timeout', maximo)), maximo))
+            version = int(version) if version is not None else None
+        except (TypeError, ValueError):
+            return Response({ 'error': 'version, desde_ply y timeout deben ser numéricos' }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            if version is None:
+                actual = Partida.objects.filter(pk=id_partida).values_list('version', flat=True).get()
+                return Response({ 'version': actual, 'eventos': [] })
+            actual, eventos = wait_for_events(id_partida, version, desde_ply, timeout)
+        except Partida.DoesNotExist:
+            raise NotFound('Partida no encontrada')
+        return Response({ 'version': actual, 'eventos': eventos })
+
+    @action(detail=True, methods=['post'])
+    @accion_versionada
     def end_game(self, request, id_partida=None):
         """
         Finaliza una partida
@@ -813,90 +1613,96 @@ class PartidaViewSet(viewsets.ModelViewSet):
             ronda_actual.fin = timezone.now()
             ronda_actual.save()
         
+        stop_pondering(partida.id_partida)
+
         serializer = self.get_serializer(partida)
-        return Response(serializer.data)
+        data = serializer.data
+        if getattr(settings, 'ARCHIVE_ON_END_GAME', False):
+            transaction.on_commit(lambda: self._archivar_al_terminar(partida.id_partida))
+        return Response(data)
+
+    def _archivar_al_terminar(self, partida_id):
+        """Archiva la partida recién finalizada (`ARCHIVE_ON_END_GAME`) una vez confirmado el fin.
+
+        Un fallo solo deja la partida sin archivar: el fin ya está guardado y `archive_games`
+        la volverá a intentar.
+        """
+        try:
+            archive_game(partida_id)
+        except RegistroIncompleto:
+            logger.warning("No se archiva la partida %s", partida_id, exc_info=True)
+        except Exception:
+            logger.exception("Error archivando la partida %s", partida_id)
     
-    def _initialize_pieces(self, jugador, partida):
+    def _build_pieces(self, jugador, partida, orden_participacion):
         """
-        Inicializa las piezas para los jugadores en sus posiciones iniciales (puntas).
-        
-        Mapeo de puntas:
-        - Punta 0 (Arriba): filas 0-3
-        - Punta 1 (Izquierda-Arriba): filas 4-7
-        - Punta 2 (Derecha-Arriba): filas 4-7
-        - Punta 3 (Abajo): filas 13-16
-        - Punta 4 (Izquierda-Abajo): filas 9-12
-        - Punta 5 (Derecha-Abajo): filas 9-12
+        Construye (sin guardar) las piezas del jugador en las casillas de salida de su punta.
         """
-        posiciones_por_punta = {
-            0: ['0-0', '0-1', '1-1', '0-2', '1-2', '2-2', '0-3', '1-3', '2-3', '3-3'],
-            1: ['0-4', '0-5', '1-4', '1-5', '1-6', '2-4', '2-5', '3-4', '0-6', '0-7'],
-            2: ['12-4', '9-6', '11-4', '11-5', '10-6', '10-4', '10-5', '9-5', '9-4', '9-7'],
-            3: ['3-13', '2-13', '2-14', '1-13', '1-14', '1-15', '0-13', '0-14', '0-15', '0-16'],
-            4: ['0-9', '0-10', '2-12', '1-10', '1-11', '3-12', '2-11', '1-12', '0-11', '0-12'],
-            5: ['9-9', '9-10', '11-11', '10-10', '10-11', '10-12', '12-12', '11-12', '9-11', '9-12'],
-        }
-
-        colores_por_punta = {
-            0: 'Blanco',   
-            1: 'Azul', 
-            2: 'Verde', 
-            3: 'Negro',   
-            4: 'Rojo', 
-            5: 'Amarillo', 
-        }
-
-        participacion = JugadorPartida.objects.get(jugador=jugador, partida=partida)
-        punta_index = participacion.orden_participacion - 1
-        
-        puntas_activas_map = {
-            2: [0, 3],
-            3: [0, 4, 5],
-            4: [1, 2, 4, 5],
-            6: [0, 1, 2, 3, 4, 5],
-        }
-        
-        puntas_activas = puntas_activas_map.get(partida.numero_jugadores, [0, 3])
-        punta_asignada = puntas_activas[punta_index]
-        color_asignado = colores_por_punta.get(punta_asignada, '')
-        
-        posiciones = posiciones_por_punta.get(punta_asignada, posiciones_por_punta[0])
-        
-        for i, pos in enumerate(posiciones[:10]): 
-            Pieza.objects.create(
+        punta = punta_asignada(partida.numero_jugadores, orden_participacion)
+        color_asignado = COLORES_POR_PUNTA.get(punta, '')
+        posiciones = POSICIONES_POR_PUNTA.get(punta, POSICIONES_POR_PUNTA[0])
+        return [
+            Pieza(
                 id_pieza=f"P_{jugador.id_jugador}_{i}_{partida.id_partida}",
-                tipo=f"{punta_asignada}-{color_asignado}", 
-                posicion=pos, 
+                tipo=f"{punta}-{color_asignado}",
+                punta=punta,
+                posicion=pos,
                 jugador=jugador,
                 partida=partida
             )
+            for i, pos in enumerate(posiciones[:10])
+        ]
 
     def destroy(self, request, *args, **kwargs):
         """
         Elimina la partida y todos los jugadores asociados creados para ella.
         También elimina en cascada: piezas, movimientos, rondas, agentes Inteligentes y chatbots.
+        El borrado no exige `version`: no deja un estado sobre el que otra petición pueda jugar.
         """
         partida = self.get_object()
-        
-        jugadores_partida = JugadorPartida.objects.filter(partida=partida)
-        jugadores_ids = [jp.jugador.id_jugador for jp in jugadores_partida]
-        
-        partida.delete()
-
-        Jugador.objects.filter(id_jugador__in=jugadores_ids).delete()
+        # Borrado tabla a tabla sin cargar las filas dependientes (ver game/retention.py);
+        # también descarta sus búsquedas anticipadas
+        delete_games([partida.id_partida])
         
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class PiezaViewSet(viewsets.ModelViewSet):
+class PiezaViewSet(EscrituraVersionadaMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar piezas
     """
     queryset = Pieza.objects.all()
     serializer_class = PiezaSerializer
+
+    # Las ediciones directas de piezas reclaman la versión de su partida y recalculan su columna compacta
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            self.reclamar_escritura(serializer.validated_data.get('partida'))
+            pieza = serializer.save()
+            sync_board(pieza.partida_id)
+
+    def perform_update(self, serializer):
+        partida_anterior = serializer.instance.partida
+        partida_nueva = serializer.validated_data.get('partida', partida_anterior)
+        with transaction.atomic():
+            self.reclamar_escritura(partida_anterior or partida_nueva)
+            if partida_anterior is not None and partida_nueva is not None and partida_nueva.pk != partida_anterior.pk:
+                # El cliente solo conoce la versión de una partida: la otra avanza sin comprobarla
+                Partida.objects.filter(pk=partida_nueva.pk).update(version=F('version') + 1)
+            pieza = serializer.save()
+            sync_board(pieza.partida_id)
+            if partida_anterior is not None and partida_anterior.pk != pieza.partida_id:
+                sync_board(partida_anterior.pk)
+
+    def perform_destroy(self, instance):
+        partida_id = instance.partida_id
+        with transaction.atomic():
+            self.reclamar_escritura(instance.partida)
+            instance.delete()
+            sync_board(partida_id)
     
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('jugador')
         partida_id = self.request.query_params.get('partida_id')
         jugador_id = self.request.query_params.get('jugador_id')
         
@@ -907,41 +1713,113 @@ class PiezaViewSet(viewsets.ModelViewSet):
             
         return queryset
 
-class RondaViewSet(viewsets.ModelViewSet):
+def _entero_param(request, nombre):
+    valor = request.query_params.get(nombre)
+    if valor in (None, ''):
+        return None
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValidationError({nombre: 'Debe ser un entero'})
+
+
+class RondaViewSet(EscrituraVersionadaMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar rondas
     """
     queryset = Ronda.objects.all()
     serializer_class = RondaSerializer
+    pagination_class = CursorPaginacion
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            self.reclamar_escritura(serializer.validated_data.get('partida'))
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            self.reclamar_escritura(serializer.instance.partida)
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            self.reclamar_escritura(instance.partida)
+            instance.delete()
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        partida_id = self.request.query_params.get('partida_id')
-        if partida_id:
-            queryset = queryset.filter(partida_id=partida_id)
+        queryset = _rondas_lectura() if self.action in ('list', 'retrieve') else super().get_queryset()
+        params = self.request.query_params
+        if params.get('partida_id'):
+            queryset = queryset.filter(partida_id=params['partida_id'])
+        if params.get('jugador_id'):
+            queryset = queryset.filter(jugador_id=params['jugador_id'])
+        numero = _entero_param(self.request, 'numero')
+        if numero is not None:
+            queryset = queryset.filter(numero=numero)
+        if params.get('activa') in ('true', '1'):
+            queryset = queryset.filter(fin__isnull=True)
         return queryset
 
+    def get_cursor_ordering(self):
+        # Dentro de una partida se recorre el índice (partida, numero); sin partida, la clave primaria.
+        # `id_ronda` desempata rondas con el mismo número e inicio para que el orden sea total
+        if self.request.query_params.get('partida_id'):
+            return ('numero', 'inicio', 'id_ronda')
+        return ('id_ronda',)
+
 
-class MovimientoViewSet(viewsets.ModelViewSet):
+class MovimientoViewSet(EscrituraVersionadaMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar movimientos
     """
     queryset = Movimiento.objects.all()
     serializer_class = MovimientoSerializer
+    pagination_class = CursorPaginacion
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            self.reclamar_escritura(serializer.validated_data.get('partida'))
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            self.reclamar_escritura(serializer.instance.partida)
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            self.reclamar_escritura(instance.partida)
+            instance.delete()
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        ronda_id = self.request.query_params.get('ronda_id')
-        if ronda_id:
-            queryset = queryset.filter(ronda_id=ronda_id)
+        queryset = super().get_queryset().select_related('jugador', 'pieza')
+        params = self.request.query_params
+        if params.get('ronda_id'):
+            queryset = queryset.filter(ronda_id=params['ronda_id'])
+        if params.get('jugador_id'):
+            queryset = queryset.filter(jugador_id=params['jugador_id'])
+        if params.get('partida_id'):
+            # Repetición / sincronización incremental: recorrido por el índice (partida, ply)
+            queryset = queryset.filter(partida_id=params['partida_id'])
+            desde_ply = _entero_param(self.request, 'desde_ply')
+            hasta_ply = _entero_param(self.request, 'hasta_ply')
+            if desde_ply is not None:
+                queryset = queryset.filter(ply__gt=desde_ply)
+            if hasta_ply is not None:
+                queryset = queryset.filter(ply__lte=hasta_ply)
         return queryset
 
+    def get_cursor_ordering(self):
+        if self.request.query_params.get('partida_id'):
+            return ('ply',)
+        return ('id_movimiento',)
+
 
 class AgenteInteligenteViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar configuraciones de agente Inteligente
     """
-    queryset = AgenteInteligente.objects.all()
+    queryset = AgenteInteligente.objects.select_related('jugador')
     serializer_class = AgenteInteligenteSerializer
     lookup_field = 'pk'
     lookup_value_regex = '[^/]+'
@@ -957,7 +1835,6 @@ class AgenteInteligenteViewSet(viewsets.ModelViewSet):
         """
         agente_obj = self.get_object() 
         partida_id = request.data.get('partida_id')
-        permitir_simples_raw = request.data.get('permitir_simples', True)
 
         if not partida_id:
             return Response({'error': 'partida_id es requerido'}, status=status.HTTP_400_BAD_REQUEST)
@@ -968,37 +1845,33 @@ class AgenteInteligenteViewSet(viewsets.ModelViewSet):
         if str(ronda_actual.jugador_id) != str(agente_obj.jugador_id):
             return Response({'error': 'No es la ronda de este agente Inteligente'}, status=status.HTTP_409_CONFLICT)
 
-        allow_simple = bool(permitir_simples_raw) if isinstance(permitir_simples_raw, bool) else str(permitir_simples_raw).lower() != 'false'
+        allow_simple = _permite_simples(request)
 
         try:
             # Nivel 1: heurística Max (actual). Nivel 2: MCTS (DIFICIL).
-            if int(getattr(agente_obj, 'nivel', 1) or 1) >= 2:
-                iterations_raw = request.data.get('simulaciones', request.data.get('iterations', 250))
-                depth_raw = request.data.get('rollout_depth', 10)
+            nivel = int(getattr(agente_obj, 'nivel', 1) or 1)
+            iterations = DEFAULT_MCTS_ITERATIONS
+            rollout_depth = DEFAULT_MCTS_ROLLOUT_DEPTH
+            if nivel >= 2:
+                iterations_raw = request.data.get('simulaciones', request.data.get('iterations', DEFAULT_MCTS_ITERATIONS))
+                depth_raw = request.data.get('rollout_depth', DEFAULT_MCTS_ROLLOUT_DEPTH)
                 try:
                     iterations = int(iterations_raw)
                 except Exception:
-                    iterations = 250
+                    iterations = DEFAULT_MCTS_ITERATIONS
                 try:
                     rollout_depth = int(depth_raw)
                 except Exception:
-                    rollout_depth = 10
-
-                agent = MCTSAgent()
-                sugerencia = agent.suggest_move(
-                    partida_id=partida_id,
-                    jugador_id=agente_obj.jugador_id,
-                    allow_simple=allow_simple,
-                    iterations=max(1, min(iterations, 2000)),
-                    rollout_depth=max(1, min(rollout_depth, 60)),
-                )
-            else:
-                agent = MaxHeuristicAgent()
-                sugerencia = agent.suggest_move(
-                    partida_id=partida_id,
-                    jugador_id=agente_obj.jugador_id,
-                    allow_simple=allow_simple,
-                )
+                    rollout_depth = DEFAULT_MCTS_ROLLOUT_DEPTH
+
+            sugerencia = suggest_move_cached(
+                partida_id,
+                agente_obj.jugador_id,
+                nivel=nivel,
+                allow_simple=allow_simple,
+                iterations=max(1, min(iterations, 2000)),
+                rollout_depth=max(1, min(rollout_depth, 60)),
+            )
         except ValueError as exc:
             return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as exc: 
@@ -1675,12 +2548,13 @@ class ChatbotViewSet(viewsets.ModelViewSet):
 
         if wants_best:
             try:
-                agent = MCTSAgent()
-                sugerencia = agent.suggest_move(
-                    partida_id=str(partida_id),
-                    jugador_id=str(jugador_id),
+                sugerencia = suggest_move_cached(
+                    str(partida_id),
+                    str(jugador_id),
+                    nivel=2,
                     allow_simple=True,
-                    iterations=250,
+                    iterations=DEFAULT_MCTS_ITERATIONS,
+                    rollout_depth=DEFAULT_MCTS_ROLLOUT_DEPTH,
                 )
             except ValueError as exc:
                 if lang == 'en':
@@ -2004,7 +2878,7 @@ class JugadorPartidaViewSet(viewsets.ModelViewSet):
     serializer_class = JugadorPartidaSerializer
     
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('jugador')
         partida_id = self.request.query_params.get('partida_id')
         jugador_id = self.request.query_params.get('jugador_id')
         
@@ -121,6 +121,15 @@ function Game() {
   const [aiSeqIndex, setAiSeqIndex] = useState(0);
   const aiSeqTokenRef = useRef(null);
   const isPausedRef = useRef(false);
+  // Última `version` de la partida que devolvió el backend: toda escritura la reenvía, de modo que
+  // un reintento, un doble envío o una segunda pestaña reciben 409 en lugar de aplicarse dos veces.
+  const versionRef = useRef(null);
+
+  const recordarVersion = (data) => {
+    // La versión solo avanza: una lectura que llega tarde no debe retrasarla
+    if (Number.isInteger(data?.version)) versionRef.current = Math.max(versionRef.current ?? 0, data.version);
+    return data;
+  };
 
   void aiAutoFinishToken;
   void aiError;
@@ -257,6 +266,7 @@ function Game() {
         fetch(url)
           .then(res => res.json())
           .then(remote => {
+            recordarVersion(remote);
             const prev = Number(remote?.tiempo_sobrante || 0);
             const mergedSeconds = prev + Math.floor((Date.now() - pauseStartedAt) / 1000);
                // actualizar estado local con el valor merged
@@ -264,9 +274,11 @@ function Game() {
                return fetch(url, {
               method: 'PATCH',
               headers: { 'Content-Type': 'application/json' },
-              body: JSON.stringify({ tiempo_sobrante: mergedSeconds })
+              body: JSON.stringify({ tiempo_sobrante: mergedSeconds, version: versionRef.current })
             });
           })
+          .then(res => res.json())
+          .then(recordarVersion)
           .catch(err => console.error('Error actualizando tiempo_sobrante:', err));
       }
       setPauseStartedAt(null);
@@ -380,8 +392,11 @@ function Game() {
             fetch(url, {
               method: 'PATCH',
               headers: { 'Content-Type': 'application/json' },
-              body: JSON.stringify({ fecha_fin: new Date().toISOString(), estado: 'FINALIZADA' })
-            }).catch((err) => console.error('Error marcando partida finalizada:', err));
+              body: JSON.stringify({ fecha_fin: new Date().toISOString(), estado: 'FINALIZADA', version: versionRef.current })
+            })
+              .then(res => res.json())
+              .then(recordarVersion)
+              .catch((err) => console.error('Error marcando partida finalizada:', err));
           }
 
           setShowVictory(true);
@@ -430,25 +445,27 @@ function Game() {
   useEffect(() => {
     if (location.state?.partidaInicial) {
       const partidaData = location.state.partidaInicial;
+      recordarVersion(partidaData);
       setPartida(partidaData);
       setLoading(false);
       
       if (partidaData?.id_partida) {
         // Verificar si la partida ya tiene rondas; si no, inicializar posiciones
-        fetch(`http://localhost:8000/api/rondas/?partida_id=${partidaData.id_partida}`)
+        fetch(`http://localhost:8000/api/rondas/?partida_id=${partidaData.id_partida}&page_size=1`)
           .then(res => res.json())
-          .then(rondas => {
+          .then(data => {
+            const rondas = data?.results;
             const esPrimeraVez = !Array.isArray(rondas) || rondas.length === 0;
             
             if (esPrimeraVez) {
               // Solo actualizar posiciones iniciales si es la primera vez
               return fetch(`http://localhost:8000/api/partidas/${partidaData.id_partida}/actualizar_posiciones_iniciales/`, {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' }
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ version: versionRef.current })
               })
               .then(res => res.json())
-              .then(data => {
-              });
+              .then(recordarVersion);
             } else {
             }
           })
@@ -467,7 +484,7 @@ function Game() {
       try {
         const res = await fetch(`http://localhost:8000/api/partidas/${partida.id_partida}/`);
         if (!res.ok) return;
-        const data = await res.json();
+        const data = recordarVersion(await res.json());
         setPartida((prev) => prev ? { ...prev, tiempo_sobrante: data.tiempo_sobrante } : prev);
         setPausedAccumMs(Number(data.tiempo_sobrante || 0) * 1000);
         setPauseStartedAt(null);
@@ -585,13 +602,13 @@ function Game() {
   };
 
   const fetchPrimeraRonda = async (partidaId) => {
-    const res = await fetch(`http://localhost:8000/api/rondas/?partida_id=${partidaId}`);
+    // Ronda activa; si no la hay (partida terminada), la última ronda jugada
+    const res = await fetch(`http://localhost:8000/api/rondas/?partida_id=${partidaId}&activa=true&page_size=1`);
     const data = await res.json();
-    if (!Array.isArray(data) || data.length === 0) return null;
-    const current = data.find(t => !t.fin);
-    if (current) return current;
-    const sorted = data.sort((a, b) => (b.numero || 0) - (a.numero || 0));
-    return sorted[0] || null;
+    if (Array.isArray(data?.results) && data.results.length > 0) return data.results[0];
+    const resUltima = await fetch(`http://localhost:8000/api/rondas/?partida_id=${partidaId}&orden=desc&page_size=1`);
+    const ultima = await resUltima.json();
+    return (Array.isArray(ultima?.results) && ultima.results[0]) || null;
   };
 
   const fetchJugadoresPartida = async (partidaId) => {
@@ -726,13 +743,14 @@ function Game() {
       const res = await fetch(url, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ oldRound, newRoundCreated })
+        body: JSON.stringify({ oldRound, newRoundCreated, version: versionRef.current })
       });
+      // También los 409/428 traen la versión actual para resincronizarse
+      const data = recordarVersion(await res.json().catch(() => null));
       if (!res.ok) {
         console.error('Error al avanzar ronda:', res.status);
         return null;
       }
-      const data = await res.json();
       const nuevaRonda = data?.nueva_ronda || data;
       if (nuevaRonda?.id_ronda) {
         setActualRound({ id_ronda: nuevaRonda.id_ronda, numero: nuevaRonda.numero, inicio: nuevaRonda.inicio });
@@ -770,11 +788,11 @@ function Game() {
       const response = await fetch(url, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ movimientos })
+        body: JSON.stringify({ movimientos, version: versionRef.current })
       });
+      const data = recordarVersion(await response.json().catch(() => null));
       if (!response.ok) {
-        const text = await response.text();
-        console.error('Error al guardar movimientos:', response.status, text);
+        console.error('Error al guardar movimientos:', response.status, data);
       }
     } catch (error) {
       console.error('Error en saveMoveToDatabase:', error);